@@ -5,13 +5,18 @@ mkdir -p "$RESULTS_DIR" "$LOG_DIR" "$REPORTS_DIR" "$OBJECTS_DIR"
 
 echo "Running $2.tcl, stage $1"
 
+SAMPLER_CMD=""
+if [[ "${SAMPLE_RESOURCES:-0}" == "1" ]]; then
+  SAMPLER_CMD="\"$PYTHON_EXE\" \"$UTILS_DIR/resourceSampler.py\" -i ${SAMPLE_RESOURCES_INTERVAL:-1} -o \"$LOG_DIR/$1.resources.jsonl\" --"
+fi
+
 (
   trap 'mv "$LOG_DIR/$1.tmp.log" "$LOG_DIR/$1.log"' EXIT
 
   eval "$OPENROAD_EXE $OPENROAD_ARGS -exit \"$SCRIPTS_DIR/noop.tcl\"" \
     >"$LOG_DIR/$1.tmp.log" 2>&1
 
-  eval "$TIME_CMD $OPENROAD_CMD -no_splash \"$SCRIPTS_DIR/$2.tcl\" -metrics \"$LOG_DIR/$1.json\"" \
+  eval "$SAMPLER_CMD $TIME_CMD $OPENROAD_CMD -no_splash \"$SCRIPTS_DIR/$2.tcl\" -metrics \"$LOG_DIR/$1.json\"" \
     2>&1 | tee -a "$(realpath "$LOG_DIR/$1.tmp.log")"
 )
 
@@ -2,4 +2,8 @@
 set -u -eo pipefail
 mkdir -p $RESULTS_DIR $LOG_DIR $REPORTS_DIR $OBJECTS_DIR
 $YOSYS_EXE -V > $(realpath $2)
-eval "$TIME_CMD $YOSYS_EXE $YOSYS_FLAGS -c $1" 2>&1 | tee --append $(realpath $2)
+SAMPLER_CMD=""
+if [[ "${SAMPLE_RESOURCES:-0}" == "1" ]]; then
+  SAMPLER_CMD="\"$PYTHON_EXE\" \"$UTILS_DIR/resourceSampler.py\" -i ${SAMPLE_RESOURCES_INTERVAL:-1} -o \"${2%.log}.resources.jsonl\" --"
+fi
+eval "$SAMPLER_CMD $TIME_CMD $YOSYS_EXE $YOSYS_FLAGS -c $1" 2>&1 | tee --append $(realpath $2)
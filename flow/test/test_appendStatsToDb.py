@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+import unittest
+from unittest.mock import patch
+from io import StringIO
+import json
+import sys
+import os
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "util"))
+
+import appendStatsToDb
+
+
+class TestMetricsDb(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmp_dir.name, "master.db")
+
+    def metadata(self, uuid, platform, **metrics):
+        data = {
+            "run__flow__uuid": uuid,
+            "run__flow__platform": platform,
+            "run__flow__design": "gcd",
+            "run__flow__variant": "base",
+        }
+        data.update(metrics)
+        return data
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_append(self, mock_stdout):
+        db = appendStatsToDb.MetricsDb(self.db_file)
+        self.assertTrue(db.append(self.metadata("u1", "nangate45", a=1)))
+        self.assertFalse(db.append(self.metadata("u1", "nangate45", a=1)))
+        # New metric keys need no schema change
+        self.assertTrue(db.append(self.metadata("u2", "asap7", b=2.5)))
+        db.commit()
+        db.close()
+
+        db = appendStatsToDb.MetricsDb(self.db_file)
+        rows = list(db.query())
+        self.assertEqual([r["uuid"] for r in rows], ["u1", "u2"])
+        self.assertEqual((rows[0]["a"], rows[0]["b"]), (1, None))
+        rows = list(db.query(platform="asap7"))
+        self.assertEqual([(r["uuid"], r["b"]) for r in rows], [("u2", 2.5)])
+        db.close()
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_hier_and_csv(self, mock_stdout):
+        db = appendStatsToDb.MetricsDb(self.db_file)
+        db.append({"run": {"flow__uuid": "u3", "flow__platform": "sky130hd"}})
+        csv_file = os.path.join(self.tmp_dir.name, "master.csv")
+        db.export_csv(csv_file)
+        db.close()
+        with open(csv_file) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[1].split(",")[:3], ["u3", "sky130hd", "-"])
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_many_keys(self, mock_stdout):
+        # More keys than SQLite's default limit of 2000 columns per table
+        metrics = {"stage{}__metric".format(i): i for i in range(2500)}
+        db = appendStatsToDb.MetricsDb(self.db_file)
+        self.assertTrue(db.append(self.metadata("u1", "asap7", **metrics)))
+        db.commit()
+        db.close()
+
+        db = appendStatsToDb.MetricsDb(self.db_file)
+        (row,) = db.query(design="gcd")
+        self.assertEqual(row["stage2499__metric"], 2499)
+        self.assertEqual(db.columns[-1], "stage2499__metric")
+        db.close()
+
+    @patch("sys.stderr", new_callable=StringIO)
+    def test_legacy_master_needs_database(self, mock_stderr):
+        with self.assertRaises(SystemExit):
+            appendStatsToDb.parse_args(["-m", "masterTestList.json"])
+        self.assertIn("--database", mock_stderr.getvalue())
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_legacy_import(self, mock_stdout):
+        master = os.path.join(self.tmp_dir.name, "master.json")
+        with open(master, "w") as f:
+            json.dump(
+                {
+                    "fields": ["uuid", "platform", "design", "a"],
+                    "testcases": [
+                        {"uuid": "u1", "platform": "asap7", "design": "gcd", "a": 1}
+                    ],
+                },
+                f,
+            )
+        csv_file = os.path.join(self.tmp_dir.name, "master.csv")
+        appendStatsToDb.main(["-d", self.db_file, "-m", master, "--csv", csv_file])
+        with open(csv_file) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(
+            lines, ["uuid,platform,design,variant,commit,a", "u1,asap7,gcd,-,-,1"]
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -19,6 +19,9 @@ python3 -m unittest tools.AutoTuner.test.smoke_test_tune.${PLATFORM_WITHOUT_DASH
 echo "Running Autotuner smoke sweep test"
 python3 -m unittest tools.AutoTuner.test.smoke_test_sweep.${PLATFORM_WITHOUT_DASHES}SweepSmokeTest.test_sweep
 
+echo "Running Autotuner smoke screen test"
+python3 -m unittest tools.AutoTuner.test.smoke_test_screen.${PLATFORM_WITHOUT_DASHES}ScreenSmokeTest.test_screen
+
 echo "Running Autotuner smoke tests for --sample and --iteration."
 python3 -m unittest tools.AutoTuner.test.smoke_test_sample_iteration.${PLATFORM_WITHOUT_DASHES}SampleIterationSmokeTest.test_sample_iteration
 
@@ -26,6 +29,15 @@ echo "Running Autotuner smoke algorithm eval test"
 python3 -m unittest tools.AutoTuner.test.smoke_test_algo_eval.${PLATFORM_WITHOUT_DASHES}AlgoEvalSmokeTest.test_algo_eval
 
 if [ "$PLATFORM_WITHOUT_DASHES" == "asap7" ] && [ "$DESIGN_NAME" == "gcd" ]; then
+  echo "Running Autotuner batch Ax search test (only once)"
+  python3 -m unittest tools.AutoTuner.test.ax_search_test.BatchAxSearchTest
+
+  echo "Running Autotuner surrogate filter test (only once)"
+  python3 -m unittest tools.AutoTuner.test.surrogate_test.SurrogateFilterTest
+
+  echo "Running Autotuner PBT clone test (only once)"
+  python3 -m unittest tools.AutoTuner.test.clone_test.CloneFlowVariantTest
+
   echo "Running Autotuner ref file test (only once)"
   python3 -m unittest tools.AutoTuner.test.ref_file_check.RefFileCheck
 
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+import unittest
+from unittest.mock import patch
+from io import StringIO
+import json
+import sys
+import os
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "util"))
+
+import checkMetadata
+
+
+class TestCheckMetadata(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.rules = {
+            "a": {"value": 4, "compare": "<="},
+            "b": {"value": "12", "compare": "<="},
+            "c": {"value": 1, "compare": ">", "level": "warning"},
+            "d": {"value": 1, "compare": "=="},
+        }
+
+    def write(self, name, data):
+        path = os.path.join(self.tmp_dir.name, name)
+        with open(path, "w") as f:
+            f.write(data if isinstance(data, str) else json.dumps(data))
+        return path
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_check(self, mock_stdout):
+        rule_set = checkMetadata.RuleSet(self.rules)
+        results = checkMetadata.check({"a": 5, "b": "10", "c": 0}, rule_set)
+        self.assertEqual(
+            [(r["field"], r["status"]) for r in results],
+            [("a", "fail"), ("b", "pass"), ("c", "warn"), ("d", "fail")],
+        )
+        self.assertIn("[ERROR] Value not found for d.", mock_stdout.getvalue())
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_batch(self, mock_stdout):
+        rules = self.write("rules.json", self.rules)
+        good = self.write("good.json", {"a": 1, "b": 1, "c": 2, "d": 1})
+        os.mkdir(os.path.join(self.tmp_dir.name, "bad"))
+        bad = self.write(os.path.join("bad", "metadata.json"), "{")
+        designs = [
+            {"name": "bad", "metadata": bad, "rules": [rules]},
+            {"name": "good", "metadata": good, "rules": [rules]},
+        ]
+        self.assertEqual(checkMetadata.check_batch(designs), 1)
+        with open(os.path.join(self.tmp_dir.name, "metadata-check.json")) as f:
+            self.assertEqual(json.load(f)["errors"], 0)
+        with open(os.path.join(self.tmp_dir.name, "bad", "metadata-check.json")) as f:
+            self.assertEqual(json.load(f)["errors"], 1)
+        self.assertTrue(
+            os.path.isfile(os.path.join(self.tmp_dir.name, "metadata-check.xml"))
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+import unittest
+import argparse
+import json
+import sys
+import os
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "util"))
+
+import checkPerformance
+
+
+class TestCheckPerformance(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.args = argparse.Namespace(
+            min_history=3,
+            sigma=3.0,
+            runtime_margin=10.0,
+            runtime_floor=10.0,
+            mem_margin=10.0,
+            mem_floor=1024.0,
+        )
+        self.history = [
+            {"runtime": {"cts": t, "route": 5.0}, "mem": {"cts": 2e6}}
+            for t in [100.0, 104.0, 98.0, 102.0]
+        ]
+
+    def test_read_run(self):
+        path = os.path.join(self.tmp_dir.name, "metadata.json")
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "run__flow__platform": "nangate45",
+                    "run__flow__design": "gcd",
+                    "run__flow__variant": "base",
+                    "run__flow__uuid": "u1",
+                    "cts__elapsed_seconds": 12.5,
+                    "cts__mem__peak": 1000.0,
+                    "finish__mem__peak": "N/A",
+                    "total_elapsed_seconds": 20.0,
+                },
+                f,
+            )
+        name, uuid, samples = checkPerformance.read_run(path)
+        self.assertEqual((name, uuid), ("nangate45/gcd/base", "u1"))
+        self.assertEqual(
+            samples,
+            {"runtime": {"cts": 12.5, "total": 20.0}, "mem": {"cts": 1000.0}},
+        )
+
+    def test_check_run(self):
+        samples = {"runtime": {"cts": 110.0, "route": 14.0}, "mem": {"cts": 3e6}}
+        regressions = checkPerformance.check_run(
+            "gcd", samples, self.history, self.args
+        )
+        # route is within the absolute floor, cts runtime within the margin
+        self.assertEqual(
+            [(r["stage"], r["metric"]) for r in regressions], [("cts", "mem")]
+        )
+
+        samples = {"runtime": {"cts": 150.0}, "mem": {}}
+        regressions = checkPerformance.check_run(
+            "gcd", samples, self.history, self.args
+        )
+        self.assertEqual([r["stage"] for r in regressions], ["cts"])
+        self.assertGreater(regressions[0]["severity"], 1)
+
+        self.args.min_history = 5
+        self.assertEqual(
+            checkPerformance.check_run("gcd", samples, self.history, self.args), []
+        )
+
+    def test_no_allowed_deviation(self):
+        # Identical history, no margin and no floor
+        self.args.runtime_margin = 0.0
+        self.args.runtime_floor = 0.0
+        samples = {"runtime": {"cts": 110.0, "route": 6.0}, "mem": {}}
+        history = [{"runtime": {"cts": 100.0, "route": 5.0}}] * 4
+        regressions = checkPerformance.check_run("gcd", samples, history, self.args)
+        # Ranked on the relative excess over the median
+        self.assertEqual(
+            [(r["stage"], r["severity"]) for r in regressions],
+            [("cts", 0.1), ("route", 0.2)],
+        )
+
+    def write_run(self, uuid, cts):
+        path = os.path.join(self.tmp_dir.name, uuid + ".json")
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "run__flow__platform": "nangate45",
+                    "run__flow__design": "gcd",
+                    "run__flow__variant": "base",
+                    "run__flow__uuid": uuid,
+                    "cts__elapsed_seconds": cts,
+                },
+                f,
+            )
+        return path
+
+    def run_main(self, *args):
+        history = os.path.join(self.tmp_dir.name, "history.json")
+        with self.assertRaises(SystemExit) as cm:
+            checkPerformance.main(
+                ["--history", history, "--min-history", "3"] + list(args)
+            )
+        with open(history) as f:
+            runs = json.load(f)["nangate45/gcd/base"]
+        return cm.exception.code, [run["uuid"] for run in runs]
+
+    def test_history(self):
+        for i, cts in enumerate([100.0, 104.0, 98.0]):
+            self.assertEqual(self.run_main("-m", self.write_run(f"u{i}", cts))[0], 0)
+        # A flagged run does not become part of the baseline
+        code, uuids = self.run_main("-m", self.write_run("u3", 500.0))
+        self.assertEqual((code, uuids), (1, ["u0", "u1", "u2"]))
+        code, uuids = self.run_main("-m", self.write_run("u4", 500.0), "--accept")
+        self.assertEqual((code, uuids), (1, ["u0", "u1", "u2", "u4"]))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
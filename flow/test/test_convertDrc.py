@@ -4,6 +4,8 @@ import unittest
 from unittest.mock import MagicMock, patch
 import sys
 import os
+import io
+import json
 
 # Mock pya before importing convertDrc since it imports pya at module level
 sys.modules["pya"] = MagicMock()
@@ -42,9 +44,11 @@ _func_source = source[_func_start:_func_end]
 # Create a module with just the function
 _mod = types.ModuleType("convertDrc_test")
 _mod.__dict__["os"] = os
+_mod.__dict__["json"] = json
 _mod.__dict__["in_drc"] = "/tmp/test.drc"
 exec(compile(_func_source, _src_path, "exec"), _mod.__dict__)
 convert_drc = _mod.convert_drc
+write_compact_drc = _mod.write_compact_drc
 
 
 def make_mock_point(x, y):
@@ -251,5 +255,67 @@ class TestConvertDrc(unittest.TestCase):
         self.assertEqual(violation["comment"], "base comment: extra info")
 
 
+class TestCompactDrc(unittest.TestCase):
+    def make_rdb(self):
+        items = [
+            make_mock_item([make_box_value(0, 0, 10, 10)], tags_str="waived"),
+            make_mock_item(
+                [make_edge_value(10, 20, 30, 40), make_text_value("detail")],
+                is_visited=True,
+                comment="base",
+            ),
+        ]
+        cat = MagicMock()
+        cat.name.return_value = "rule1"
+        cat.description = "Rule 1"
+        cat.rdb_id.return_value = 1
+        cat.num_items.return_value = 2
+        empty = MagicMock()
+        empty.num_items.return_value = 0
+
+        rdb = MagicMock()
+        rdb.each_category.return_value = iter([cat, empty])
+        rdb.each_item_per_category.return_value = iter(items)
+        return rdb
+
+    def test_compact(self):
+        outfile = io.StringIO()
+        write_compact_drc(self.make_rdb(), outfile)
+        drc = json.loads(outfile.getvalue())["DRC"]
+
+        self.assertEqual(drc["format"], "compact")
+        self.assertEqual(drc["source"], os.path.abspath("/tmp/test.drc"))
+        self.assertEqual(list(drc["category"]), ["rule1"])
+        category = drc["category"]["rule1"]
+        self.assertEqual(category["description"], "Rule 1")
+        self.assertEqual(
+            category["violations"],
+            [
+                [0, 1, "", [["box", 0, 0, 10, 10]]],
+                [1, 0, "base: detail", [["line", 10, 20, 30, 40]]],
+            ],
+        )
+
+    def test_same_violations_as_legacy(self):
+        outfile = io.StringIO()
+        write_compact_drc(self.make_rdb(), outfile)
+        compact = json.loads(outfile.getvalue())["DRC"]["category"]["rule1"]
+        legacy = convert_drc(self.make_rdb())["category"]["rule1"]
+
+        for row, violation in zip(compact["violations"], legacy["violations"]):
+            visited, waived, comment, shapes = row
+            self.assertEqual(visited, violation["visited"])
+            self.assertEqual(waived, violation["waived"])
+            self.assertEqual(comment, violation.get("comment", ""))
+            self.assertEqual(
+                shapes,
+                [
+                    [shape["type"]]
+                    + [c for p in shape["points"] for c in (p["x"], p["y"])]
+                    for shape in violation["shape"]
+                ],
+            )
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import tempfile
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "util"))
+
+try:
+    import correlateRC
+except ImportError:
+    correlateRC = None
+
+NET_RC = """# stack: m1(routing) via1(2.0e+00) m2(routing)
+net1,signal,1.0e+00,2.0e-15,1.5e+00,2.5e-15,10.0,1,20.0
+net2,clock,3.0e+00,4.0e-15,0.0e+00,3.5e-15,0,0,5.5
+"""
+
+SEGMENT_RC = """# routing layers: m1 m2 m3
+net1,signal,m1,1.000e+01,1.000e+00,2.000e+00
+net1,signal,m2,2.000e+01,2.000e+00,4.000e+00
+net2,clock,m2,5.000e+00,5.000e-01,1.000e+00
+"""
+
+
+@unittest.skipIf(correlateRC is None, "requires numpy, scikit-learn and matplotlib")
+class TestLoadRcFiles(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp_dir.name, name)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def test_parse_stack(self):
+        self.assertEqual(
+            correlateRC.parse_stack("# stack: m1(routing) via1(2.0e+00) m2\n"),
+            [("m1", True, 0.0), ("via1", False, 2.0), ("m2", False, 0.0)],
+        )
+
+    def test_net(self):
+        rc_file = self.write("6_net_rc.csv", NET_RC)
+        headers, names, rows = correlateRC.parse_rc_file(rc_file, "net")
+        self.assertEqual(headers["stack"], NET_RC.splitlines(True)[0])
+        self.assertEqual(list(names), ["net1", "net2"])
+        self.assertEqual(list(rows["type"]), [b"signal", b"clock"])
+        self.assertEqual(list(rows["rcx_res"]), [1.5, 0.0])
+        self.assertEqual(rows["lengths"].tolist(), [[10, 1, 20], [0, 0, 5.5]])
+
+    def test_segment(self):
+        rc_file = self.write("6_segment_rc.csv", SEGMENT_RC)
+        headers, names, rows = correlateRC.parse_rc_file(rc_file, "segment")
+        self.assertEqual(headers["routing layers"], "# routing layers: m1 m2 m3\n")
+        self.assertEqual(list(rows["layer"]), [b"m1", b"m2", b"m2"])
+        self.assertEqual(list(rows["length"]), [10.0, 20.0, 5.0])
+
+    @patch("sys.stdout")
+    def test_cache(self, mock_stdout):
+        rc_file = self.write("6_net_rc.csv", NET_RC)
+        expected = correlateRC.load_rc_file(rc_file, "net")
+        self.assertTrue(os.path.isfile(correlateRC.cache_file(rc_file, "net")))
+        with patch.object(correlateRC, "parse_rc_file") as parse:
+            headers, names, rows = correlateRC.load_rc_file(rc_file, "net")
+            parse.assert_not_called()
+        self.assertEqual(headers, expected[0])
+        self.assertEqual(list(names), list(expected[1]))
+        self.assertEqual(rows.dtype, expected[2].dtype)
+        self.assertEqual(rows["lengths"].tolist(), expected[2]["lengths"].tolist())
+
+        # A changed file is parsed again
+        self.write("6_net_rc.csv", NET_RC.replace("net2", "net3"))
+        _, names, _ = correlateRC.load_rc_file(rc_file, "net")
+        self.assertEqual(list(names), ["net1", "net3"])
+
+    @patch("sys.stdout")
+    def test_load_rc_files(self, mock_stdout):
+        first = self.write("a.csv", NET_RC)
+        second = self.write("b.csv", NET_RC)
+        headers, designs, names, rows = correlateRC.load_rc_files(
+            [first, second, first], "net", use_cache=False
+        )
+        self.assertEqual(list(designs), [0, 0, 1, 1])
+        self.assertEqual(len(rows), 4)
+
+        other = self.write("c.csv", NET_RC.replace("m2(routing)", "m3(routing)"))
+        with self.assertRaises(SystemExit):
+            correlateRC.load_rc_files([first, other], "net", use_cache=False)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+
+@unittest.skipIf(correlateRC is None, "requires numpy, scikit-learn and matplotlib")
+class TestStreamingFit(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(1)
+        self.x = rng.random((200, 3)) * 100
+        # The last feature is always zero, like a layer without wires
+        self.x[:, 2] = 0
+        self.y = self.x @ [0.5, 0.25, 0] * rng.uniform(0.9, 1.1, 200)
+
+    def test_normal_equations(self):
+        from sklearn.linear_model import LinearRegression
+
+        model = LinearRegression(fit_intercept=False).fit(self.x, self.y)
+        equations = correlateRC.NormalEquations(3)
+        for chunk in range(0, 200, 30):
+            part = correlateRC.NormalEquations(3)
+            part.add(self.x[chunk : chunk + 30], self.y[chunk : chunk + 30])
+            equations.merge(part)
+        coef = equations.coef()
+        np.testing.assert_allclose(coef, model.coef_, atol=1e-12)
+        self.assertAlmostEqual(
+            equations.score(coef), model.score(self.x, self.y), places=10
+        )
+
+    def test_net_stats(self):
+        rc_file = os.path.join(self.tmp_dir.name, "6_net_rc.csv")
+        with open(rc_file, "w") as f:
+            f.write("# stack: m1(routing) via1(2.0e+00) m2(routing)\n")
+            for i, (lengths, y) in enumerate(zip(self.x, self.y)):
+                net_type = "clock" if i % 5 == 0 else "signal"
+                f.write(
+                    "n{},{},1,1e-15,{},{},{},{},{}\n".format(
+                        i, net_type, y, y * 1e-15, lengths[0], lengths[2], lengths[1]
+                    )
+                )
+        _, names, rows = correlateRC.parse_rc_file(rc_file, "net")
+        expected = correlateRC.NetStats(
+            correlateRC.parse_stack(correlateRC.read_headers(rc_file)["stack"])
+        )
+        expected.add(rows)
+        _, stats = correlateRC.accumulate_rc_file(rc_file, "net", chunk_rows=7)
+        np.testing.assert_allclose(stats.res.xtx, expected.res.xtx)
+        np.testing.assert_allclose(stats.cap.xty, expected.cap.xty)
+        self.assertEqual(sorted(stats.wire_res), ["clock", "signal"])
+        self.assertEqual(stats.wire_cap["clock"].n, 40)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
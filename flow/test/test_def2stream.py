@@ -4,6 +4,7 @@ import unittest
 from unittest.mock import MagicMock, patch, call
 import sys
 import os
+import tempfile
 
 sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "util"))
 
@@ -463,5 +464,119 @@ class TestGdsFileMerging(unittest.TestCase):
         self.assertEqual(len(read_calls), 4)  # 1 DEF + 3 GDS
 
 
+class TestLibraryCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp_dir.name, "cache")
+        self.files = []
+        for name in ["a.gds", "b.gds"]:
+            self.files.append(os.path.join(self.tmp_dir.name, name))
+            with open(self.files[-1], "w") as f:
+                f.write(name)
+
+    def read(self):
+        """Read the library into a mock layout, returns it and the mock pya."""
+        pya_mod = MagicMock()
+        library = pya_mod.Layout.return_value
+        library.write.side_effect = lambda path, options: open(path, "w").close()
+        layout = MagicMock()
+        layout.dbu = 0.001
+        def2stream.read_library(pya_mod, layout, self.files, self.cache_dir)
+        return layout, pya_mod
+
+    @patch("builtins.print")
+    def test_cache(self, mock_print):
+        layout, pya_mod = self.read()
+        library = pya_mod.Layout.return_value
+        self.assertEqual(library.read.call_args_list, [call(f) for f in self.files])
+        self.assertEqual(library.dbu, 0.001)
+        self.assertEqual(pya_mod.SaveLayoutOptions.return_value.format, "OASIS")
+        cache_file = def2stream.library_cache_file(self.cache_dir, self.files, 0.001)
+        layout.read.assert_called_once_with(cache_file)
+        self.assertEqual(os.listdir(self.cache_dir), [os.path.basename(cache_file)])
+
+        # The merged library is read instead of the files
+        layout, pya_mod = self.read()
+        pya_mod.Layout.assert_not_called()
+        layout.read.assert_called_once_with(cache_file)
+
+    def test_key(self):
+        key = def2stream.library_cache_file(self.cache_dir, self.files, 0.001)
+        self.assertNotEqual(
+            key, def2stream.library_cache_file(self.cache_dir, self.files, 0.0005)
+        )
+        self.assertNotEqual(
+            key, def2stream.library_cache_file(self.cache_dir, self.files[::-1], 0.001)
+        )
+        with open(self.files[0], "a") as f:
+            f.write("changed")
+        self.assertNotEqual(
+            key, def2stream.library_cache_file(self.cache_dir, self.files, 0.001)
+        )
+
+    @patch("builtins.print")
+    def test_no_cache_dir(self, mock_print):
+        pya_mod = MagicMock()
+        layout = MagicMock()
+        def2stream.read_library(pya_mod, layout, self.files)
+        self.assertEqual(layout.read.call_args_list, [call(f) for f in self.files])
+        pya_mod.Layout.assert_not_called()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+
+class TestReferencedOnly(unittest.TestCase):
+    def test_merge_referenced(self):
+        """Only the masters called by the top cell are merged from the library."""
+        top = make_mock_cell("test_design", cell_index=0, parent_cells=0)
+        inv = make_mock_cell("INV", cell_index=1)
+        via = make_mock_cell("VIA_M1M2", cell_index=2)
+        missing = make_mock_cell("MISSING", cell_index=3, is_empty=True)
+        stray = make_mock_cell("UNUSED_DEF_FILL", cell_index=4, parent_cells=0)
+        cells = [top, inv, via, missing, stray]
+        top.called_cells.return_value = [1, 2, 3]
+
+        pya_mod = MagicMock()
+        main_layout = MagicMock()
+        library = MagicMock()
+        pya_mod.Layout.side_effect = [main_layout, library]
+        main_layout.cell.side_effect = lambda key: next(
+            c for c in cells if key in (c.name, c.cell_index())
+        )
+        main_layout.top_cells.return_value = [top, stray]
+        # Before reading DEF, then the final layout
+        main_layout.each_cell.side_effect = [iter([]), iter([top, missing])]
+        library.has_cell.side_effect = lambda name: name == "INV"
+        library.cell.return_value.cell_index.return_value = 7
+
+        with patch("builtins.print"):
+            errors = def2stream.merge_gds(
+                pya_mod=pya_mod,
+                tech_file="/tmp/test.lyt",
+                layer_map="",
+                in_def="/tmp/test.def",
+                design_name="test_design",
+                in_files="/tmp/a.gds /tmp/b.gds",
+                seal_file="",
+                out_file="/tmp/out.gds",
+                referenced_only=True,
+            )
+
+        self.assertEqual(errors, 1)
+        inv.clear.assert_called_once()
+        missing.clear.assert_called_once()
+        via.clear.assert_not_called()
+        library.read.assert_has_calls([call("/tmp/a.gds"), call("/tmp/b.gds")])
+        pya_mod.CellMapping.return_value.for_multi_cells_full.assert_called_once_with(
+            main_layout, [1], library, [7]
+        )
+        main_layout.copy_tree_shapes.assert_called_once_with(
+            library, pya_mod.CellMapping.return_value
+        )
+        main_layout.prune_cell.assert_called_once_with(4, -1)
+        main_layout.write.assert_called_once_with("/tmp/out.gds")
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 
+import hashlib
+import json
 import unittest
 from unittest.mock import patch
 from io import StringIO
@@ -79,6 +81,83 @@ class TestElapsedTime(unittest.TestCase):
         genElapsedTime.scan_logs(["--logDir", str(self.tmp_dir.name), "--noHeader"])
         self.assertIn("No elapsed time found in", fake_err_output.getvalue())
 
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_hash_cache(self, mock_stdout):
+        log_dir = os.path.join(self.tmp_dir.name, "logs", "base")
+        result_dir = os.path.join(self.tmp_dir.name, "results", "base")
+        os.makedirs(log_dir)
+        os.makedirs(result_dir)
+        for stem in ["1_test", "2_test"]:
+            with open(os.path.join(log_dir, stem + ".log"), "w") as f:
+                f.write("Elapsed time: 0:10[h:]min:sec. Peak memory: 2048KB.\n")
+            with open(os.path.join(result_dir, stem + ".odb"), "wb") as f:
+                f.write(b"same content")
+        cache_file = os.path.join(log_dir, "hash-cache.json")
+        args = ["--logDir", log_dir, "--noHeader"]
+        genElapsedTime.scan_logs(args)
+        digest = hashlib.sha1(b"same content").hexdigest()[0:20]
+        expected_output = (
+            log_dir + f"\n1_test 10 2 {digest}\n2_test 10 2 {digest}\nTotal 20 2\n"
+        ).split()
+        self.assertEqual(mock_stdout.getvalue().split(), expected_output)
+        self.assertTrue(os.path.isfile(cache_file))
+        self.assertEqual(os.listdir(result_dir), ["1_test.odb", "2_test.odb"])
+
+        mock_stdout.truncate(0)
+        mock_stdout.seek(0)
+        with patch.object(genElapsedTime, "hash_file") as mock_hash:
+            genElapsedTime.scan_logs(args)
+        mock_hash.assert_not_called()
+        self.assertEqual(mock_stdout.getvalue().split(), expected_output)
+
+        # The entries of removed result files are dropped
+        os.remove(os.path.join(result_dir, "2_test.odb"))
+        with open(os.path.join(result_dir, "1_test.odb"), "wb") as f:
+            f.write(b"new content")
+        genElapsedTime.scan_logs(args)
+        with open(cache_file) as f:
+            self.assertEqual(
+                list(json.load(f)), [os.path.join(result_dir, "1_test.odb")]
+            )
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_match_skips_hash_cache(self, mock_stdout):
+        log_dir = os.path.join(self.tmp_dir.name, "logs", "base")
+        result_dir = os.path.join(self.tmp_dir.name, "results", "base")
+        os.makedirs(log_dir)
+        os.makedirs(result_dir)
+        with open(os.path.join(log_dir, "1_test.log"), "w") as f:
+            f.write("Elapsed time: 0:10[h:]min:sec. Peak memory: 2048KB.\n")
+        with open(os.path.join(result_dir, "1_test.odb"), "wb") as f:
+            f.write(b"content")
+        genElapsedTime.scan_logs(["--logDir", log_dir, "--match", "1_test"])
+        digest = hashlib.sha1(b"content").hexdigest()[0:20]
+        self.assertIn(digest, mock_stdout.getvalue())
+        self.assertEqual(os.listdir(log_dir), ["1_test.log"])
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_print_hash(self, mock_stdout):
+        log_dir = os.path.join(self.tmp_dir.name, "logs", "base")
+        result_dir = os.path.join(self.tmp_dir.name, "results", "base")
+        os.makedirs(log_dir)
+        os.makedirs(result_dir)
+        with open(os.path.join(log_dir, "1_test.log"), "w") as f:
+            f.write("Elapsed time: 0:10[h:]min:sec. Peak memory: 2048KB.\n")
+        with open(os.path.join(result_dir, "1_test.odb"), "wb") as f:
+            f.write(b"content")
+        cache_file = os.path.join(log_dir, "hash-cache.json")
+        args = genElapsedTime.argparse.Namespace(
+            match=None,
+            noHeader=False,
+            hash="blake2b",
+            noHashCache=False,
+        )
+        genElapsedTime.print_log_dir_times(log_dir, args)
+        output = mock_stdout.getvalue()
+        self.assertIn("b2sum .odb [0:20)", output)
+        self.assertIn(hashlib.blake2b(b"content").hexdigest()[0:20], output)
+        self.assertTrue(os.path.isfile(cache_file))
+
     def tearDown(self):
         self.tmp_dir.cleanup()
 
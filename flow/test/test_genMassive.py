@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+
+import unittest
+from unittest.mock import patch
+import argparse
+import sys
+import os
+import tempfile
+from io import StringIO
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "util"))
+
+import genMassive
+
+
+class TestSlots(unittest.TestCase):
+    @patch("genMassive.memTotalGB", return_value=None)
+    def test_cpus(self, mock_mem):
+        slots = genMassive.Slots(cpus=4, mem=None, cpusPerJob=2, memPerJob=0)
+        for _ in range(2):
+            self.assertTrue(slots.fits())
+            slots.acquire()
+        self.assertFalse(slots.fits())
+        slots.release()
+        self.assertTrue(slots.fits())
+
+    @patch("genMassive.memTotalGB", return_value=10)
+    def test_memory(self, mock_mem):
+        slots = genMassive.Slots(cpus=64, mem=100, cpusPerJob=1, memPerJob=40)
+        self.assertTrue(slots.fits())
+        slots.acquire()
+        self.assertFalse(slots.fits())
+        # A job larger than the machine still runs on its own
+        slots = genMassive.Slots(cpus=1, mem=8, cpusPerJob=2, memPerJob=16)
+        self.assertTrue(slots.fits())
+
+
+class TestPoints(unittest.TestCase):
+    knobs = {"PLATFORM_DESIGN": ["asap7-gcd"], "UTIL": [20, 30], "PD": [0.5, 0.6, 0.7]}
+
+    def test_point_at(self):
+        points = list(genMassive.productDict(self.knobs))
+        self.assertEqual(genMassive.numPoints(self.knobs), len(points))
+        for i, point in enumerate(points):
+            self.assertEqual(genMassive.pointAt(self.knobs, i), point)
+
+    def test_select(self):
+        shard = genMassive.parseShard("1/3")
+        self.assertEqual(list(genMassive.selectedIndexes(8, shard)), [1, 4, 7])
+        indexes = genMassive.parseIndexes("5-9,0,6")
+        self.assertEqual(
+            list(genMassive.selectedIndexes(8, indexes=indexes)), [0, 5, 6, 7]
+        )
+        self.assertEqual(list(genMassive.selectedIndexes(8, shard, indexes)), [7])
+        with self.assertRaises(argparse.ArgumentTypeError):
+            genMassive.parseShard("3/3")
+
+    def test_state_path(self):
+        self.assertEqual(
+            genMassive.statePath((1, 3), [(0, 99), (120, 120)]),
+            "./metrics/runMassive_state.1-of-3.0-99,120.jsonl",
+        )
+
+
+class TestRunMassive(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp_dir.name)
+        os.makedirs("metrics/metrics_runMassive")
+        os.makedirs("designs/asap7/gcd")
+        self.knobs = {k: ["empty"] for k in genMassive.SweepingAttributes}
+        self.knobs.update(PLATFORM_DESIGN=["asap7-gcd"], UTIL=[20, 30, 40])
+        self.generate()
+        # The first run was done by a previous run
+        with open(genMassive.statePath(), "w") as f:
+            genMassive.appendState(f, dict(index=0, status="running"))
+            genMassive.appendState(f, dict(index=0, status="done", returncode=0))
+        with open("make.sh", "w") as f:
+            f.write('case "$DESIGN_CONFIG" in *40*) exit 2;; esac\n')
+            f.write('echo "$(basename $DESIGN_CONFIG) $NUM_CORES"\n')
+
+    def generate(self, shard=None):
+        path = genMassive.manifestPath(shard)
+        for _ in genMassive.writeManifest(path, self.knobs, shard):
+            pass
+
+    def args(self, **kwargs):
+        args = dict(
+            jobs=2,
+            cpus=4,
+            cpus_per_job=2,
+            mem=None,
+            mem_per_job=0,
+            make="sh make.sh",
+            metrics=False,
+            retry_failed=False,
+            shard=None,
+            index=None,
+        )
+        args.update(kwargs)
+        return argparse.Namespace(**args)
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_run_and_resume(self, mock_stdout):
+        self.assertEqual(genMassive.runMassive(self.args()), 1)
+        state = genMassive.loadState(genMassive.statePath())
+        self.assertEqual(
+            [state[i]["status"] for i in range(3)], ["done", "done", "failed"]
+        )
+        self.assertEqual(state[1]["returncode"], 0)
+        self.assertEqual(state[2]["returncode"], 2)
+        # The configs are written when they are run
+        self.assertFalse(
+            os.path.exists("designs/asap7/gcd/chunks/chunk0/config-DoE-UTIL_20.mk")
+        )
+        log = "metrics/metrics_runMassive/asap7-gcd-UTIL_30.log"
+        with open(log) as f:
+            self.assertEqual(f.read(), "config-DoE-UTIL_30.mk 2\n")
+        self.assertIn("ETA", mock_stdout.getvalue())
+
+        # Resuming runs nothing unless failed runs are retried
+        self.assertEqual(genMassive.runMassive(self.args()), 0)
+        self.assertIn("3 runs, 2 already done, 0 to run", mock_stdout.getvalue())
+        self.assertEqual(genMassive.runMassive(self.args(retry_failed=True)), 1)
+        self.assertIn("3 runs, 2 already done, 1 to run", mock_stdout.getvalue())
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_shard(self, mock_stdout):
+        # Each host generates the manifest of its slice
+        self.generate((0, 2))
+        self.generate((1, 2))
+        args = self.args(shard=(1, 2))
+        self.assertEqual(genMassive.runMassive(args), 0)
+        self.assertIn("1 runs, 0 already done, 1 to run", mock_stdout.getvalue())
+        state = genMassive.loadState(genMassive.statePath(args.shard))
+        self.assertEqual(list(state), [1])
+        self.assertEqual(genMassive.runMassive(self.args(shard=(0, 2))), 1)
+        self.assertIn("2 runs, 0 already done, 2 to run", mock_stdout.getvalue())
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_slice_mismatch(self, mock_stdout):
+        os.replace(genMassive.manifestPath(), genMassive.manifestPath((0, 2)))
+        with self.assertRaises(SystemExit):
+            genMassive.runMassive(self.args(shard=(0, 2)))
+        self.assertIn("is of the slice", mock_stdout.getvalue())
+        with self.assertRaises(SystemExit):
+            genMassive.runMassive(self.args(shard=(1, 2)))
+        self.assertIn("generate the runs of this slice first", mock_stdout.getvalue())
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+
+import unittest
+from unittest.mock import patch
+from io import StringIO
+import sys
+import os
+import json
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "util"))
+
+import genMetrics
+
+
+def timePatterns(prefix, file):
+    return [
+        genMetrics.MetricPattern(
+            prefix + "__runtime__total",
+            file,
+            "^Elapsed time: (\\S+)\\[h:\\]min:sec.*",
+            optional=True,
+        ),
+        genMetrics.MetricPattern(
+            prefix + "__cpu__total",
+            file,
+            "^Elapsed time:.*CPU time: user (\\S+) .*",
+            optional=True,
+        ),
+        genMetrics.MetricPattern(
+            prefix + "__mem__peak",
+            file,
+            "^Elapsed time:.*Peak memory: (\\S+)KB.",
+            optional=True,
+        ),
+    ]
+
+
+class TestScanFiles(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.log_file = os.path.join(self.tmp_dir.name, "2_1_floorplan.log")
+        with open(self.log_file, "w") as f:
+            f.write("Some log entry\n")
+            f.write(
+                "Elapsed time: 0:04.12[h:]min:sec. CPU time: user 3.91 sys 0.20"
+                " (99%). Peak memory: 123456KB.\n"
+            )
+
+    def extract(self):
+        metrics = {}
+        patterns = timePatterns("floorplan", self.log_file)
+        with patch("builtins.open", wraps=open) as mock_open:
+            matches = genMetrics.scanFiles(patterns)
+        genMetrics.applyPatterns(metrics, patterns, matches)
+        return metrics, mock_open.call_count
+
+    def test_single_read(self):
+        metrics, reads = self.extract()
+        self.assertEqual(reads, 1)
+        self.assertEqual(
+            metrics,
+            {
+                "floorplan__runtime__total": "0:04.12",
+                "floorplan__cpu__total": 3.91,
+                "floorplan__mem__peak": 123456.0,
+            },
+        )
+
+    def test_mmap(self):
+        expected, _ = self.extract()
+        with patch.object(genMetrics, "MMAP_THRESHOLD", 0):
+            metrics, _ = self.extract()
+        self.assertEqual(metrics, expected)
+
+    def test_optional_missing_file(self):
+        os.remove(self.log_file)
+        metrics, _ = self.extract()
+        self.assertEqual(metrics, {})
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_missing_file(self, mock_stdout):
+        metrics = {}
+        genMetrics.extractTagFromFile(
+            "tag", metrics, "(\\S+)", os.path.join(self.tmp_dir.name, "missing")
+        )
+        self.assertEqual(metrics, {"tag": "ERR"})
+        self.assertIn("Failed to open file", mock_stdout.getvalue())
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_not_found(self, mock_stdout):
+        metrics = {}
+        genMetrics.extractTagFromFile("tag", metrics, "^Missing (\\S+)", self.log_file)
+        self.assertEqual(metrics, {"tag": "N/A"})
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_cache(self, mock_stdout):
+        cache_file = os.path.join(self.tmp_dir.name, "metrics-cache.json")
+        patterns = timePatterns("floorplan", self.log_file)
+        cache = genMetrics.MetricsCache(cache_file)
+        expected = genMetrics.scanFiles(patterns, cache)
+        cache.save()
+
+        cache = genMetrics.MetricsCache(cache_file)
+        with patch("builtins.open", wraps=open) as mock_open:
+            matches = genMetrics.scanFiles(patterns, cache)
+        self.assertEqual(mock_open.call_count, 0)
+        self.assertEqual(matches, expected)
+        self.assertEqual((cache.hits, cache.misses), (3, 0))
+
+        with open(self.log_file, "a") as f:
+            f.write("More log\n")
+        cache = genMetrics.MetricsCache(cache_file)
+        genMetrics.scanFiles(patterns, cache)
+        self.assertEqual((cache.hits, cache.misses), (0, 3))
+
+
+class TestExtractGnuTime(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.log_file = os.path.join(self.tmp_dir.name, "4_1_cts.log")
+
+    def write(self, footer):
+        with open(self.log_file, "w") as f:
+            f.write("Some log entry\n" * 1000)
+            f.write(footer)
+
+    def test_footer(self):
+        self.write(
+            "Elapsed time: 1:02:04.12[h:]min:sec. CPU time: user 30.91 sys 0.20"
+            " (99%). Peak memory: 723456KB.\n"
+        )
+        metrics = {}
+        genMetrics.extractGnuTime("cts", metrics, self.log_file)
+        self.assertEqual(
+            metrics,
+            {
+                "cts__runtime__total": "1:02:04.12",
+                "cts__cpu__total": 30.91,
+                "cts__mem__peak": 723456.0,
+            },
+        )
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_no_footer(self, mock_stdout):
+        self.write("")
+        metrics = {}
+        genMetrics.extractGnuTime("cts", metrics, self.log_file)
+        self.assertEqual(set(metrics.values()), {"N/A"})
+        self.assertIn("Tag cts__mem__peak not found", mock_stdout.getvalue())
+
+    def test_missing_log(self):
+        metrics = {}
+        genMetrics.extractGnuTime("cts", metrics, self.log_file)
+        self.assertEqual(metrics, {})
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+
+class TestExtractResources(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.samples = os.path.join(self.tmp_dir.name, "4_1_cts.resources.jsonl")
+
+    def test_summary(self):
+        with open(self.samples, "w") as f:
+            f.write(json.dumps({"version": 1, "num_cores": 8}) + "\n")
+            f.write("[1.0,1000,2.0,9,1]\n[2.0,3000,6.0,9,1]\n")
+        cache = genMetrics.MetricsCache(os.path.join(self.tmp_dir.name, "cache.json"))
+        for _ in range(2):
+            metrics = {}
+            genMetrics.extractResources("cts", metrics, self.samples, cache)
+            self.assertEqual(
+                metrics,
+                {
+                    "cts__mem__rss_p50": 1000,
+                    "cts__mem__rss_p95": 3000,
+                    "cts__cpu__average_cores": 4.0,
+                    "cts__cpu__parallel_efficiency": 0.5,
+                },
+            )
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_not_sampled(self):
+        metrics = {}
+        genMetrics.extractResources("cts", metrics, self.samples)
+        self.assertEqual(metrics, {})
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+
+class TestDiscoverRuns(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        for variant in ["base", "test"]:
+            os.makedirs(
+                os.path.join(self.tmp_dir.name, "logs", "nangate45", "gcd", variant)
+            )
+        # Stray files are not runs
+        open(os.path.join(self.tmp_dir.name, "logs", "nangate45", "gcd.log"), "w")
+
+    def test_discover(self):
+        runs = genMetrics.discover_runs(self.tmp_dir.name)
+        self.assertEqual(
+            [(r["platform"], r["design"], r["variant"]) for r in runs],
+            [("nangate45", "gcd", "base"), ("nangate45", "gcd", "test")],
+        )
+        self.assertEqual(
+            runs[0]["reports"],
+            os.path.join(self.tmp_dir.name, "reports", "nangate45", "gcd", "base"),
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+import unittest
+from unittest.mock import patch
+from io import StringIO
+import sys
+import os
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "util"))
+
+import genReport
+
+
+class TestScan(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp_dir.name)
+        self.write("logs/nangate45/gcd/base/2_1_floorplan.log", "Some log entry\n")
+        self.write(
+            "logs/nangate45/gcd/base/3_3_place_gp.log",
+            "[WARNING GPL-0302] Use a higher -density\n"
+            "Some log entry\n"
+            "[ERROR GPL-0305] RePlAce diverged\n",
+        )
+        self.write("logs/nangate45/gcd/base/6_report.log", "[warning] no clock\n")
+        self.write("reports/nangate45/gcd/base/metadata-generate.log", "")
+        self.write(
+            "reports/nangate45/gcd/base/metadata-check.log",
+            "[ERROR] finish__timing__setup__ws fails\n",
+        )
+        self.write("logs/asap7/aes/base/6_report.log", "Log entry [ERROR] inline\n")
+        self.write("reports/asap7/aes/base/metadata-generate.log", "")
+        self.write("reports/asap7/aes/base/metadata-check.log", "")
+        # AutoTuner variants are skipped
+        self.write("logs/asap7/aes/test-tune/6_report.log", "[ERROR] skipped\n")
+
+    def write(self, path, content, mode="w"):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, mode) as f:
+            f.write(content)
+
+    def serial_scan(self, designs):
+        return {
+            name: genReport._scan_design(log_dir, files, None)
+            for name, log_dir, files in designs
+        }
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_parallel_cached_scan(self, mock_stdout):
+        designs = genReport.find_designs()
+        self.assertEqual(
+            [d[0] for d in designs],
+            ["asap7 aes (base)", "nangate45 gcd (base)"],
+        )
+        expected = self.serial_scan(designs)
+        self.assertEqual(
+            expected["nangate45 gcd (base)"]["log_errors"],
+            ["[ERROR GPL-0305] RePlAce diverged"],
+        )
+        self.assertEqual(
+            expected["nangate45 gcd (base)"]["log_warnings"],
+            ["[WARNING GPL-0302] Use a higher -density", "[warning] no clock"],
+        )
+        self.assertEqual(expected["asap7 aes (base)"]["status"], genReport.STATUS_GREEN)
+
+        design_list, cache = genReport.scan_designs(designs, 2, dict())
+        self.assertEqual(design_list, expected)
+        self.assertIn("logs/nangate45/gcd/base/3_3_place_gp.log", cache)
+
+        # Cached files are not read again
+        with patch("builtins.open", wraps=open) as mock_open:
+            cached = {
+                name: genReport._scan_design(log_dir, files, dict(cache))
+                for name, log_dir, files in designs
+            }
+        self.assertEqual(cached, expected)
+        opened = [call.args[0] for call in mock_open.call_args_list]
+        self.assertNotIn("logs/nangate45/gcd/base/3_3_place_gp.log", opened)
+
+        design_list, _ = genReport.scan_designs(designs, 2, cache)
+        self.assertEqual(design_list, expected)
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_changed_log(self, mock_stdout):
+        designs = genReport.find_designs()
+        _, cache = genReport.scan_designs(designs, 2, dict())
+        self.write(
+            "logs/asap7/aes/base/6_report.log", "[ERROR ORD-0001] failed\n", mode="a"
+        )
+        design_list, cache = genReport.scan_designs(designs, 2, cache)
+        self.assertEqual(design_list, self.serial_scan(designs))
+        self.assertEqual(
+            design_list["asap7 aes (base)"]["log_errors"],
+            ["[ERROR ORD-0001] failed"],
+        )
+        self.assertEqual(
+            cache["logs/asap7/aes/base/6_report.log"]["errors"],
+            ["[ERROR ORD-0001] failed"],
+        )
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+
+import unittest
+from io import StringIO
+import json
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "util"))
+
+import genReportTable
+from genReportTable import GREEN, NO_CHANGE, ORANGE, RED
+
+
+class TestMetricClasses(unittest.TestCase):
+    def setUp(self):
+        self.classes = genReportTable.MetricClasses()
+
+    def test_is_used(self):
+        self.assertTrue(self.classes.isUsed("finish__timing__setup__ws"))
+        self.assertTrue(self.classes.isUsed("detailedroute__route__wirelength"))
+        self.assertFalse(self.classes.isUsed("commit"))
+        self.assertFalse(self.classes.isUsed("floorplan__runtime__total"))
+        self.assertFalse(self.classes.isUsed("run__flow__uuid"))
+        # Computed once per key
+        self.assertEqual(len(self.classes.used), 5)
+        self.classes.isUsed("commit")
+        self.assertEqual(len(self.classes.used), 5)
+
+    def test_is_higher_better(self):
+        self.assertTrue(self.classes.isHigherBetter("finish__timing__setup__ws"))
+        self.assertTrue(self.classes.isHigherBetter("cts__timing__hold__tns"))
+        self.assertTrue(
+            self.classes.isHigherBetter("finish__timing__drv__max_slew_limit")
+        )
+        self.assertFalse(
+            self.classes.isHigherBetter("detailedroute__route__wirelength")
+        )
+        self.assertFalse(self.classes.isHigherBetter("finish__design__instance__area"))
+
+
+class TestMetricsFrame(unittest.TestCase):
+    def setUp(self):
+        self.tests = ["p d1 base", "p d2 base"]
+        self.metrics = ["timing__ws", "area", "drc", "name"]
+        golds = [
+            {"timing__ws": -1.0, "area": 100, "drc": 0, "name": "top"},
+            None,
+        ]
+        runs = [
+            {"timing__ws": -0.5, "area": 110, "drc": 2, "name": "top"},
+            {"timing__ws": -2.0, "area": "90", "drc": 0},
+        ]
+        rules = [{"drc": {"compare": "<=", "value": 0}}, None]
+        self.frame = genReportTable.MetricsFrame(
+            self.tests,
+            self.metrics,
+            golds,
+            runs,
+            rules,
+            genReportTable.MetricClasses(),
+        )
+
+    def test_gold_and_run(self):
+        self.assertEqual(self.frame.gold[:, 0].tolist(), [-1.0, 100.0, 0.0, "top"])
+        self.assertEqual(self.frame.run[:, 0].tolist(), [-0.5, 110.0, 2.0, "top"])
+        # The golden metrics of the second test failed to parse
+        self.assertEqual(self.frame.gold[:, 1].tolist(), ["ERR"] * 4)
+        self.assertEqual(self.frame.run[:, 1].tolist(), [-2.0, "90", 0, "N/A"])
+        self.assertEqual(
+            self.frame.isNumber.tolist(),
+            [[True, False], [True, False], [True, False], [False, False]],
+        )
+
+    def test_diff(self):
+        self.assertEqual(self.frame.diff[:, 0].tolist(), [0.5, 10.0, 2.0, 0.0])
+        self.assertEqual(
+            self.frame.diffText[:, 0].tolist(),
+            ["+0.50 (50.00%)", "+10.00 (10.00%)", "+2.00 (#DIV/0!)", "-"],
+        )
+        self.assertEqual(self.frame.diffText[:, 1].tolist(), ["-"] * 4)
+
+    def test_style(self):
+        # Higher is better for timing__ws, lower for area and the rule fails drc
+        self.assertEqual(
+            self.frame.style[:, 0].tolist(), [GREEN, ORANGE, RED, NO_CHANGE]
+        )
+        self.assertEqual(self.frame.style[:, 1].tolist(), [NO_CHANGE] * 4)
+        self.assertEqual(
+            self.frame.styleCounts(0),
+            {"no_change": 1, "green": 1, "orange": 1, "red": 1},
+        )
+
+    def test_format_diff(self):
+        self.assertEqual(genReportTable.formatDiff(-0.001, 1.0), "-0.001 (0.10%)")
+        self.assertEqual(genReportTable.formatDiff(2.0, 0.0), "+2.00 (#DIV/0!)")
+
+
+class TestWriteJson(unittest.TestCase):
+    def setUp(self):
+        self.frame = genReportTable.MetricsFrame(
+            ["p d base"],
+            ["timing__ws", "name"],
+            [{"timing__ws": -1, "name": "</script>"}],
+            [{"timing__ws": 1, "name": "</script>"}],
+            [None],
+            genReportTable.MetricClasses(),
+        )
+
+    def test_write_json(self):
+        f = StringIO()
+        genReportTable.writeJson(f, "base", self.frame)
+        data = json.loads(f.getvalue())
+        self.assertEqual(data["variant"], "base")
+        self.assertEqual(data["styles"], genReportTable.STYLES)
+        self.assertEqual(data["tests"], ["p d base"])
+        self.assertEqual(
+            data["rows"],
+            [
+                ["timing__ws", [-1.0], [1.0], ["+2.00 (200.00%)"], [GREEN]],
+                ["name", ["</script>"], ["</script>"], ["-"], [NO_CHANGE]],
+            ],
+        )
+        # One metric per line
+        lines = [line.rstrip(",") for line in f.getvalue().splitlines()[5:7]]
+        self.assertEqual([json.loads(line) for line in lines], data["rows"])
+
+    def test_embedded_json(self):
+        f = StringIO()
+        genReportTable.writeJson(genReportTable.ScriptWriter(f), "base", self.frame)
+        self.assertNotIn("<", f.getvalue())
+        plain = StringIO()
+        genReportTable.writeJson(plain, "base", self.frame)
+        self.assertEqual(json.loads(f.getvalue()), json.loads(plain.getvalue()))
+
+
+if __name__ == "__main__":
+    unittest.main()
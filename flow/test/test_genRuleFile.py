@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "util"))
+
+import genRuleFile
+
+
+class TestMatchRules(unittest.TestCase):
+    def test_match(self):
+        keys = tuple(
+            sorted(
+                [
+                    "finish__timing__setup__ws",
+                    "cts__flow__warnings__count:STA-1",
+                    "synth__flow__warnings__count:YOS-2",
+                    "unknown__metric",
+                ]
+            )
+        )
+        matched = genRuleFile.match_rules(keys)
+        self.assertEqual(
+            [field for field, _ in matched],
+            [
+                "cts__flow__warnings__count__STA-1",
+                "synth__flow__warnings__count__YOS-2",
+                "finish__timing__setup__ws",
+            ],
+        )
+        self.assertEqual(matched[2][1]["mode"], "period_padding")
+
+        hits = genRuleFile.match_rules.cache_info().hits
+        self.assertIs(genRuleFile.match_rules(keys), matched)
+        self.assertEqual(genRuleFile.match_rules.cache_info().hits, hits + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
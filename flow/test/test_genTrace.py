@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import json
+import tempfile
+from io import StringIO
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "util"))
+
+import genTrace
+
+
+class TestGenTrace(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.log_dir = os.path.join(self.tmp_dir.name, "logs", "asap7", "gcd", "base")
+        os.makedirs(self.log_dir)
+
+    def write_log(self, name, end, elapsed, cpu=100, memory=102400):
+        path = os.path.join(self.log_dir, name + ".log")
+        with open(path, "w") as f:
+            f.write("Some log entry\n")
+            f.write(
+                f"Elapsed time: {elapsed}[h:]min:sec. CPU time: user 1.00 sys"
+                f" 0.10 ({cpu}%). Peak memory: {memory}KB.\n"
+            )
+        os.utime(path, (end, end))
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_trace(self, mock_stdout):
+        self.write_log("2_1_floorplan", 1000, "0:10.00", cpu=100)
+        self.write_log("2_2_floorplan_macro", 1010, "0:05.00", cpu=200)
+        self.write_log("2_3_floorplan_tapcell", 1008, "0:06.00", cpu=100)
+        self.write_log("3_1_place_gp", 1030, "0:10.00")
+        self.write_log("no_footer", 1000, "")
+        with open(os.path.join(self.log_dir, "2_1_floorplan.json"), "w") as f:
+            json.dump({"floorplan__design__instance__count": 42}, f)
+
+        trace = genTrace.build_trace([self.log_dir])
+        slices = {e["name"]: e for e in trace["traceEvents"] if e["ph"] == "X"}
+        self.assertEqual(
+            sorted(slices),
+            [
+                "2_1_floorplan",
+                "2_2_floorplan_macro",
+                "2_3_floorplan_tapcell",
+                "3_1_place_gp",
+            ],
+        )
+        floorplan = slices["2_1_floorplan"]
+        self.assertEqual((floorplan["ts"], floorplan["dur"]), (0, 10000000))
+        self.assertEqual(floorplan["args"]["floorplan__design__instance__count"], 42)
+        self.assertEqual(floorplan["args"]["peak_memory_KB"], 102400)
+
+        # Overlapping steps are put on separate tracks
+        self.assertEqual(slices["2_3_floorplan_tapcell"]["tid"], 0)
+        self.assertEqual(slices["2_2_floorplan_macro"]["tid"], 1)
+        self.assertEqual(slices["3_1_place_gp"]["tid"], 0)
+
+        cpu = [
+            (e["ts"], e["args"]["cores"])
+            for e in trace["traceEvents"]
+            if e["name"] == "CPU utilization"
+        ]
+        self.assertEqual(
+            cpu,
+            [
+                (0, 1.0),
+                (10000000, 0),
+                (12000000, 1.0),
+                (15000000, 3.0),
+                (18000000, 2.0),
+                (20000000, 0),
+                (30000000, 1.0),
+                (40000000, 0),
+            ],
+        )
+        self.assertIn(
+            "idle 2s between 2_1_floorplan and 2_3_floorplan_tapcell",
+            mock_stdout.getvalue(),
+        )
+        self.assertIn(
+            "idle 10s between 2_2_floorplan_macro and 3_1_place_gp",
+            mock_stdout.getvalue(),
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
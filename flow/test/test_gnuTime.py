@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "util"))
+
+import gnuTime
+
+FOOTER = (
+    "Elapsed time: 12:24.14[h:]min:sec. CPU time: user 5081.82 sys 170.18"
+    " (705%). Peak memory: 9667132KB.\n"
+)
+
+
+class TestGnuTime(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.log_file = os.path.join(self.tmp_dir.name, "5_3_route.log")
+
+    def write(self, *parts):
+        with open(self.log_file, "w") as f:
+            for part in parts:
+                f.write(part)
+
+    def test_parse(self):
+        self.assertEqual(
+            gnuTime.parse_footer(FOOTER.strip()),
+            gnuTime.GnuTime("12:24.14", 744.14, 5081.82, 170.18, 705, 9667132),
+        )
+        footer = gnuTime.parse_footer(
+            "Elapsed time: 01:30:00[h:]min:sec. Peak memory: 9667132KB."
+        )
+        self.assertEqual(footer.elapsed_seconds, 5400)
+        self.assertIsNone(footer.user)
+        self.assertIsNone(
+            gnuTime.parse_footer("Elapsed time: 4[h:]min:sec.").elapsed_seconds
+        )
+
+    def test_tail(self):
+        # the footer straddles a block boundary
+        padding = "x" * (gnuTime.BLOCK_SIZE - 20) + "\n"
+        self.write("Elapsed time: 0:01.00[h:]min:sec.\n", padding, FOOTER)
+        self.assertEqual(gnuTime.read_footer(self.log_file).elapsed, "12:24.14")
+        self.write(FOOTER)
+        self.assertEqual(gnuTime.read_footer(self.log_file).peak_memory, 9667132)
+        self.write("no footer\n")
+        self.assertIsNone(gnuTime.read_footer(self.log_file))
+
+    def test_forward_scan(self):
+        with patch.object(gnuTime, "MAX_TAIL", 1024):
+            self.write(FOOTER, "x" * 100 + "\n" * 2000)
+            self.assertEqual(gnuTime.read_footer(self.log_file).user, 5081.82)
+            self.write("x" * 100 + "\n" * 2000)
+            self.assertIsNone(gnuTime.read_footer(self.log_file))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+import unittest
+import sys
+import os
+import json
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "util"))
+
+import resourceSampler
+
+
+class TestResourceSampler(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.samples = os.path.join(self.tmp_dir.name, "3_3_place_gp.resources.jsonl")
+
+    def write_samples(self, samples, num_cores=4):
+        with open(self.samples, "w") as f:
+            f.write(json.dumps(dict(version=1, num_cores=num_cores)) + "\n")
+            for sample in samples:
+                f.write(json.dumps(sample) + "\n")
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(resourceSampler.percentile(values, 50), 50)
+        self.assertEqual(resourceSampler.percentile(values, 95), 95)
+        self.assertEqual(resourceSampler.percentile([7], 95), 7)
+
+    def test_summarize(self):
+        self.write_samples(
+            [
+                [i, rss, cores, 8, 1]
+                for i, (rss, cores) in enumerate(
+                    [(100, 1.0), (300, 3.0), (200, 2.0), (400, 4.0)]
+                )
+            ]
+        )
+        self.assertEqual(
+            resourceSampler.summarize(self.samples),
+            dict(
+                rss_p50=200, rss_p95=400, cores_average=2.5, parallel_efficiency=0.625
+            ),
+        )
+        self.write_samples([])
+        self.assertIsNone(resourceSampler.summarize(self.samples))
+
+    @unittest.skipUnless(os.path.isdir("/proc/self"), "requires /proc")
+    def test_run(self):
+        returncode = resourceSampler.run(
+            [sys.executable, "-c", "import time; time.sleep(0.5); exit(3)"],
+            self.samples,
+            0.1,
+            2,
+        )
+        self.assertEqual(returncode, 3)
+        header, samples = resourceSampler.read_samples(self.samples)
+        self.assertEqual(header["columns"], resourceSampler.COLUMNS)
+        self.assertEqual(header["num_cores"], 2)
+        self.assertGreater(len(samples), 0)
+        self.assertTrue(all(s[1] > 0 and s[4] == 1 for s in samples))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,43 +1,252 @@
-#!/usr/bin/env python2
+#!/usr/bin/env python3
 
-# This scripts appends the test metadata to the master json
+# This scripts appends the test metadata to the master database
 # -------------------------------------------------------------------------
+#
+# The database is a SQLite file with one row per test case in the testcases
+# table, with the indexed columns below, and one row per metric of a test
+# case in the metrics table (uuid, key, value). Ingestion is append-only:
+# test cases whose uuid is already present are skipped, and new metric keys
+# need no schema change. A CSV view of (a filtered subset of) the database
+# can be exported on demand.
 
 import argparse  # argument parsing
 import json  # json parsing
 import sys
-import re
 import os  # filesystem manipulation
 
 import csv
-import datetime
-import uuid
+import sqlite3
 from collections import OrderedDict
+from itertools import groupby
 
-# Parse and validate arguments
-# ==============================================================================
-parser = argparse.ArgumentParser(description="Appends test metadata to master database")
-parser.add_argument(
-    "--masterTestListPath",
-    "-m",
-    default="masterTestList.json",
-    required=False,
-    help="Path to Master Metadata",
-)
-parser.add_argument(
-    "--testMetadataPaths", "-t", required=True, help="Path to Json Metadata", nargs="+"
+TABLE = "testcases"
+METRICS_TABLE = "metrics"
+KEYS_TABLE = "metric_keys"
+DEFAULT_DATABASE = "masterTestList.db"
+
+# Columns indexed for queries, with the metadata keys they are read from in
+# the flat (new) and legacy formats.
+INDEXED_COLUMNS = OrderedDict(
+    [
+        ("uuid", ["run__flow__uuid", "uuid"]),
+        ("platform", ["run__flow__platform", "platform"]),
+        ("design", ["run__flow__design", "design"]),
+        ("variant", ["run__flow__variant"]),
+        ("commit", ["run__flow__scripts_commit"]),
+    ]
 )
-args = parser.parse_args()
 
-# Open master file
-if os.path.isfile(args.masterTestListPath):
-    with open(args.masterTestListPath) as f:
-        masterJson = json.load(f, object_pairs_hook=OrderedDict)
-else:
-    masterJson = {"fields": [], "testcases": []}
+epilog = """
+Migrating from the master JSON: -m used to name the master JSON that was
+read and rewritten together with a CSV of the same name on every append.
+The master is now the SQLite database given with -d, -m only imports a
+legacy master JSON into it and the CSV is only written with --csv. Replace
+'-m masterTestList.json -t ...' by
+'-d masterTestList.db -m masterTestList.json --csv masterTestList.csv -t ...'
+once, and drop -m afterwards.
+"""
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Appends test metadata to master database",
+        epilog=epilog,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--database",
+        "-d",
+        required=False,
+        help="Path to the master SQLite database (default: {})".format(
+            DEFAULT_DATABASE
+        ),
+    )
+    parser.add_argument(
+        "--masterTestListPath",
+        "-m",
+        required=False,
+        help="Legacy master JSON to import into the database given with -d,"
+        " it is not written anymore",
+    )
+    parser.add_argument(
+        "--testMetadataPaths", "-t", default=[], help="Path to Json Metadata", nargs="+"
+    )
+    parser.add_argument(
+        "--csv", required=False, help="Export the (filtered) test cases to CSV"
+    )
+    for column in INDEXED_COLUMNS:
+        if column == "uuid":
+            continue
+        parser.add_argument(
+            "--" + column, required=False, help="Only export this " + column
+        )
+    args = parser.parse_args(argv)
+    if args.masterTestListPath is not None and args.database is None:
+        # The master JSON would silently stop being updated
+        parser.error(
+            "-m/--masterTestListPath only imports a legacy master JSON and no"
+            " longer updates it, give the database with -d/--database (and"
+            " --csv to export it), see the help"
+        )
+    if args.database is None:
+        args.database = DEFAULT_DATABASE
+    return args
+
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+class MetricsDb:
+    """Append-only SQLite store of test metadata."""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        columns = ", ".join(
+            quote(c) + (" TEXT UNIQUE NOT NULL" if c == "uuid" else " TEXT")
+            for c in INDEXED_COLUMNS
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS {} ({})".format(quote(TABLE), columns)
+        )
+        for column in INDEXED_COLUMNS:
+            if column == "uuid":
+                continue
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS {} ON {} ({})".format(
+                    quote("idx_" + column), quote(TABLE), quote(column)
+                )
+            )
+        # The value column has no type so that numbers stay numbers
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS {} (uuid TEXT NOT NULL, key TEXT NOT NULL,"
+            " value, PRIMARY KEY (uuid, key)) WITHOUT ROWID".format(
+                quote(METRICS_TABLE)
+            )
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS {} ON {} (key)".format(
+                quote("idx_" + METRICS_TABLE + "_key"), quote(METRICS_TABLE)
+            )
+        )
+        # Metric keys in the order they were first seen, for the CSV columns
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS {} (key TEXT UNIQUE NOT NULL)".format(
+                quote(KEYS_TABLE)
+            )
+        )
+        self.columns = list(INDEXED_COLUMNS) + [
+            row[0]
+            for row in self.conn.execute(
+                "SELECT key FROM {} ORDER BY rowid".format(quote(KEYS_TABLE))
+            )
+        ]
+        self.known = set(self.columns)
+
+    def _add_keys(self, keys):
+        for key in keys:
+            if key in self.known:
+                continue
+            self.conn.execute(
+                "INSERT INTO {} (key) VALUES (?)".format(quote(KEYS_TABLE)), [key]
+            )
+            self.columns.append(key)
+            self.known.add(key)
+            print("Updating fields with", key)
+
+    @staticmethod
+    def _row(designJson):
+        # Flatten metadata written with genMetrics.py --hier
+        flat = OrderedDict()
+        for key, value in designJson.items():
+            if isinstance(value, dict):
+                for subkey, subvalue in value.items():
+                    flat[key + "__" + subkey] = subvalue
+            else:
+                flat[key] = value
+        designJson = flat
+
+        row = OrderedDict()
+        for column, keys in INDEXED_COLUMNS.items():
+            row[column] = next(
+                (str(designJson[k]) for k in keys if k in designJson), None
+            )
+        for key, value in designJson.items():
+            if key in row:
+                continue
+            if isinstance(value, (dict, list)):
+                value = json.dumps(value)
+            row[key] = value
+        return row
+
+    def append(self, designJson):
+        """Insert a test case, returns False if its uuid is already present."""
+        row = self._row(designJson)
+        if row["uuid"] is None:
+            raise ValueError("metadata has no uuid")
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO {} ({}) VALUES ({})".format(
+                quote(TABLE),
+                ", ".join(quote(c) for c in INDEXED_COLUMNS),
+                ", ".join("?" * len(INDEXED_COLUMNS)),
+            ),
+            [row[c] for c in INDEXED_COLUMNS],
+        )
+        if cursor.rowcount != 1:
+            return False
+        metrics = [(k, v) for k, v in row.items() if k not in INDEXED_COLUMNS]
+        self._add_keys(k for k, _ in metrics)
+        self.conn.executemany(
+            "INSERT INTO {} (uuid, key, value) VALUES (?, ?, ?)".format(
+                quote(METRICS_TABLE)
+            ),
+            [(row["uuid"], k, v) for k, v in metrics],
+        )
+        return True
+
+    def query(self, **filters):
+        """Yield the test cases matching the indexed column filters."""
+        where = [(k, v) for k, v in filters.items() if v is not None]
+        sql = "SELECT t.rowid, {}, m.key, m.value FROM {} t LEFT JOIN {} m".format(
+            ", ".join("t." + quote(c) for c in INDEXED_COLUMNS),
+            quote(TABLE),
+            quote(METRICS_TABLE),
+        )
+        sql += " ON m.uuid = t.uuid"
+        if where:
+            sql += " WHERE " + " AND ".join("t." + quote(k) + " = ?" for k, _ in where)
+        cursor = self.conn.execute(sql + " ORDER BY t.rowid", [v for _, v in where])
+        for _, values in groupby(cursor, key=lambda values: values[0]):
+            values = list(values)
+            testcase = OrderedDict(zip(INDEXED_COLUMNS, values[0][1:-2]))
+            testcase.update((v[-2], v[-1]) for v in values if v[-2] is not None)
+            yield OrderedDict((c, testcase.get(c)) for c in self.columns)
+
+    def export_csv(self, csvFilePath, **filters):
+        with open(csvFilePath, "w") as csvfile:
+            writer = csv.DictWriter(
+                csvfile,
+                fieldnames=self.columns,
+                restval="-",
+                extrasaction="ignore",
+                dialect="excel",
+            )
+
+            writer.writeheader()
+            for testcase in self.query(**filters):
+                writer.writerow(
+                    {k: "-" if v is None else v for k, v in testcase.items()}
+                )
+
+    def commit(self):
+        self.conn.commit()
 
+    def close(self):
+        self.conn.close()
 
-for testMetadata in args.testMetadataPaths:
+
+def load_metadata(testMetadata):
     if not os.path.isfile(testMetadata):
         print("Error: testMetadataPath does not exist")
         print("Path: " + testMetadata)
@@ -46,49 +255,37 @@ for testMetadata in args.testMetadataPaths:
     # Open test metadata
     try:
         with open(testMetadata) as f:
-            designJson = json.load(f, object_pairs_hook=OrderedDict)
+            return json.load(f, object_pairs_hook=OrderedDict)
     except ValueError as e:
         print("Error occured opening or loading json file.")
         print("Exception: %s" % str(e), file=sys.stderr)
         sys.exit(1)
 
-    if not designJson["uuid"] in [d["uuid"] for d in masterJson["testcases"]]:
-        masterJson["testcases"].append(designJson)
-
-        # Update Headers if necessary
-        for key in list(designJson):
-            if not key in masterJson["fields"]:
-                masterJson["fields"].append(key)
-                print("Updating fields with", key)
-    else:
-        print(
-            "Skipping "
-            + designJson["platform"]
-            + "/"
-            + designJson["design"]
-            + " ("
-            + designJson["uuid"]
-            + ") already in masterDB"
-        )
 
+def main(argv=None):
+    args = parse_args(argv)
+    db = MetricsDb(args.database)
 
-# Dump JSON
-with open(args.masterTestListPath, "w") as f:
-    json.dump(masterJson, f, indent=2)
+    testcases = []
+    if args.masterTestListPath is not None:
+        testcases += load_metadata(args.masterTestListPath)["testcases"]
+    testcases += [load_metadata(path) for path in args.testMetadataPaths]
 
+    for designJson in testcases:
+        if not db.append(designJson):
+            row = db._row(designJson)
+            print(
+                "Skipping {}/{} ({}) already in masterDB".format(
+                    row["platform"], row["design"], row["uuid"]
+                )
+            )
+    db.commit()
+
+    if args.csv is not None:
+        filters = {c: getattr(args, c) for c in INDEXED_COLUMNS if c != "uuid"}
+        db.export_csv(args.csv, **filters)
+    db.close()
 
-# Dump CSV
-csvFilePath = os.path.splitext(args.masterTestListPath)[0] + ".csv"
-with open(csvFilePath, "w") as csvfile:
-    fieldnames = list(masterJson["fields"])
-    writer = csv.DictWriter(
-        csvfile,
-        fieldnames=fieldnames,
-        restval="-",
-        extrasaction="ignore",
-        dialect="excel",
-    )
 
-    writer.writeheader()
-    for testcase in masterJson["testcases"]:
-        writer.writerow(testcase)
+if __name__ == "__main__":
+    main()
@@ -20,35 +20,56 @@ field is the name of a field in the metadata file
 value is the reference value to compare to
 operator can be one of "<", ">", "<=", ">=", "==", "!=".
 The value is converted to a float for comparison if possible
+
+In batch mode (--batch or --discover) all designs are checked in a single
+process. Each design gets a metadata-check.log, a metadata-check.json and
+a JUnit metadata-check.xml next to its metadata file, and a design whose
+files are missing or broken is reported as failed without stopping the
+batch.
 """
 
+from collections import namedtuple
+from glob import glob
 from os.path import isfile
 import argparse
+import contextlib
+import io
 import json
 import operator
+import os
 import sys
+import xml.etree.ElementTree as ET
 
-parser = argparse.ArgumentParser(
-    description="Checks metadata from OpenROAD flow against a set of rules"
-)
-parser.add_argument("--metadata", "-m", required=True, help="The metadata file")
-parser.add_argument("--rules", "-r", required=True, nargs="+", help="The rules file")
-args = parser.parse_args()
-
-with open(args.metadata) as metadataFile:
-    metadata = json.load(metadataFile)
-
-rules = dict()
-for filePath in args.rules:
-    if isfile(filePath):
-        with open(filePath) as rulesFile:
-            rules.update(json.load(rulesFile))
-    else:
-        print(f"[WARN] File {filePath} not found")
 
-if len(rules) == 0:
-    print("No rules")
-    sys.exit(1)
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Checks metadata from OpenROAD flow against a set of rules"
+    )
+    parser.add_argument("--metadata", "-m", help="The metadata file")
+    parser.add_argument("--rules", "-r", nargs="+", help="The rules file")
+    parser.add_argument("--json", help="Write the check results to a JSON file")
+    parser.add_argument("--junit", help="Write the check results as JUnit XML")
+    batch = parser.add_argument_group("batch mode")
+    batch.add_argument(
+        "--batch",
+        help="JSON file with a list of designs, each with the keys metadata,"
+        " rules (list of files) and optionally name",
+    )
+    batch.add_argument(
+        "--discover",
+        metavar="FLOW_DIR",
+        help="Check every FLOW_DIR/reports/<platform>/<design>/<variant>"
+        "/metadata.json against the rules-<variant>.json of its design",
+    )
+    args = parser.parse_args()
+
+    if args.batch is None and args.discover is None:
+        if args.metadata is None or args.rules is None:
+            parser.error(
+                "--metadata and --rules are required unless --batch or"
+                " --discover is used"
+            )
+    return args
 
 
 def try_number(string):
@@ -61,6 +82,15 @@ def try_number(string):
         return string
 
 
+def as_int(value):
+    """
+    Convert to integer if possible
+    """
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
 ops = {
     "<": operator.lt,
     ">": operator.gt,
@@ -70,61 +100,242 @@ ops = {
     "!=": operator.ne,
 }
 
-ERRORS = 0
-WARNS = 0
-
-# Check for new warnings
-for field, build_value in metadata.items():
-    if field not in rules.keys() and "__warnings__count:" in field:
-        print(f"[WARN] {field} fail test: {build_value} (New warning)")
-        WARNS += 1
-
-# Check for rules
-for field, rule in rules.items():
-    compare = rule["compare"]
-    op = ops[compare]
-    rule_value = try_number(rule["value"])
-
-    if field in metadata.keys():
-        build_value = try_number(metadata[field])
-    elif "__warnings__count:" in field:
-        # Metric is a warning count. If the value is missing,
-        # there were zero warnings
-        build_value = 0.0
+Rule = namedtuple("Rule", ["field", "compare", "op", "value", "warning", "is_count"])
+
+
+class RuleSet:
+    """
+    Rules compiled once: operators are resolved and reference values
+    converted up front, so checking a design only converts its own values.
+    """
+
+    def __init__(self, rules):
+        self.fields = set(rules.keys())
+        self.rules = [
+            Rule(
+                field,
+                rule["compare"],
+                ops[rule["compare"]],
+                as_int(try_number(rule["value"])),
+                rule.get("level") == "warning",
+                "__warnings__count:" in field,
+            )
+            for field, rule in rules.items()
+        ]
+
+    def __len__(self):
+        return len(self.rules)
+
+
+def load_rules(paths):
+    rules = dict()
+    for filePath in paths:
+        if isfile(filePath):
+            with open(filePath) as rulesFile:
+                rules.update(json.load(rulesFile))
+        else:
+            print(f"[WARN] File {filePath} not found")
+    return rules
+
+
+def check(metadata, ruleSet):
+    """
+    Check metadata against a compiled rule set. Prints one line per check
+    and returns the list of results, each a dict with the field, status
+    (pass, warn or fail) and the compared values.
+    """
+    results = list()
+
+    # Check for new warnings
+    for field, build_value in metadata.items():
+        if field not in ruleSet.fields and "__warnings__count:" in field:
+            print(f"[WARN] {field} fail test: {build_value} (New warning)")
+            results.append(
+                dict(
+                    field=field, status="warn", value=build_value, message="New warning"
+                )
+            )
+
+    # Check for rules
+    for rule in ruleSet.rules:
+        if rule.field in metadata:
+            build_value = as_int(try_number(metadata[rule.field]))
+        elif rule.is_count:
+            # Metric is a warning count. If the value is missing,
+            # there were zero warnings
+            build_value = 0
+        else:
+            print(f"[ERROR] Value not found for {rule.field}.")
+            results.append(
+                dict(field=rule.field, status="fail", message="Value not found")
+            )
+            continue
+
+        try:
+            if rule.op(build_value, rule.value):
+                PRE, CHECK, status = "[INFO]", "pass", "pass"
+            elif rule.warning:
+                PRE, CHECK, status = "[WARN]", "pass", "warn"
+            else:
+                PRE, CHECK, status = "[ERROR]", "fail", "fail"
+        except TypeError:
+            # Handle cases where types are not comparable (e.g., string vs. number)
+            PRE, CHECK, status = "[ERROR]", "fail", "fail"
+        print(PRE, rule.field, CHECK, "test:", build_value, rule.compare, rule.value)
+        results.append(
+            dict(
+                field=rule.field,
+                status=status,
+                value=build_value,
+                compare=rule.compare,
+                reference=rule.value,
+            )
+        )
+
+    return results
+
+
+def summarize(results, numRules):
+    errors = sum(1 for r in results if r["status"] == "fail")
+    warns = sum(1 for r in results if r["status"] == "warn")
+    print(f"Metadata check warnings: {warns}")
+    if errors == 0:
+        print(f"All metadata rules passed ({numRules} rules)")
     else:
-        print(f"[ERROR] Value not found for {field}.")
-        sys.exit(1)
+        print(f"Failed metadata checks: {errors} out of {numRules}")
+    return errors, warns
 
-    # Convert to integer if possible
-    if isinstance(rule_value, float) and rule_value.is_integer():
-        rule_value = int(rule_value)
-    if isinstance(build_value, float) and build_value.is_integer():
-        build_value = int(build_value)
 
-    try:
-        if op(build_value, rule_value):
-            PRE = "[INFO]"
-            CHECK = "pass"
-        elif rule.get("level") == "warning":
-            PRE = "[WARN]"
-            CHECK = "pass"
-            WARNS += 1
+def write_json(path, name, results, errors, warns):
+    with open(path, "w") as f:
+        json.dump(
+            dict(name=name, errors=errors, warnings=warns, checks=results),
+            f,
+            indent=2,
+        )
+
+
+def write_junit(path, name, results, errors):
+    suite = ET.Element(
+        "testsuite",
+        name=name,
+        tests=str(len(results)),
+        failures=str(errors),
+        errors="0",
+    )
+    for result in results:
+        case = ET.SubElement(suite, "testcase", classname=name, name=result["field"])
+        if "message" in result:
+            text = f"{result['field']}: {result.get('value', '')} {result['message']}"
         else:
-            PRE = "[ERROR]"
-            CHECK = "fail"
-            ERRORS += 1
-    except TypeError:
-        # Handle cases where types are not comparable (e.g., string vs. number)
-        PRE = "[ERROR]"
-        CHECK = "fail"
-        ERRORS += 1
-    print(PRE, field, CHECK, "test:", build_value, compare, rule_value)
-
-print(f"Metadata check warnings: {WARNS}")
-
-if ERRORS == 0:
-    print(f"All metadata rules passed ({len(rules)} rules)")
-else:
-    print(f"Failed metadata checks: {ERRORS} out of {len(rules)}")
-
-sys.exit(1 if ERRORS else 0)
+            text = "{field}: {value} {compare} {reference}".format(**result)
+        if result["status"] == "fail":
+            ET.SubElement(case, "failure", message=text)
+        elif result["status"] == "warn":
+            ET.SubElement(case, "system-out").text = "[WARN] " + text
+    root = ET.Element("testsuites", tests=suite.get("tests"), failures=str(errors))
+    root.append(suite)
+    ET.ElementTree(root).write(path, encoding="utf-8", xml_declaration=True)
+
+
+def discover_designs(flow_dir):
+    """
+    Find the metadata of every run under flow_dir/reports, with the rules of
+    the design directory recorded in design-dir.txt.
+    """
+    designs = list()
+    reports = os.path.join(flow_dir, "reports")
+    for path in sorted(glob(os.path.join(reports, "*", "*", "*", "metadata.json"))):
+        reportDir = os.path.dirname(path)
+        platform, design, variant = os.path.relpath(reportDir, reports).split(os.sep)
+        try:
+            with open(os.path.join(reportDir, "design-dir.txt")) as f:
+                designDir = os.path.join(flow_dir, f.read().strip())
+        except IOError:
+            designDir = os.path.join(flow_dir, "designs", platform, design)
+        designs.append(
+            dict(
+                name=f"{platform} {design} ({variant})",
+                metadata=path,
+                rules=[os.path.join(designDir, f"rules-{variant}.json")],
+            )
+        )
+    return designs
+
+
+def check_batch(designs):
+    """
+    Check all designs, compiling each distinct set of rule files once.
+    Returns the number of designs that failed.
+    """
+    ruleSets = dict()
+    failed = 0
+    for design in designs:
+        name = design.get("name", design["metadata"])
+        outDir = os.path.dirname(os.path.abspath(design["metadata"]))
+        output = io.StringIO()
+        results = list()
+        numRules = 0
+        with contextlib.redirect_stdout(output):
+            try:
+                key = tuple(design["rules"])
+                if key not in ruleSets:
+                    ruleSets[key] = RuleSet(load_rules(key))
+                if len(ruleSets[key]) == 0:
+                    raise ValueError("No rules")
+                numRules = len(ruleSets[key])
+                with open(design["metadata"]) as metadataFile:
+                    metadata = json.load(metadataFile)
+                results = check(metadata, ruleSets[key])
+            except Exception as e:
+                print(f"[ERROR] Failed to check {name}: {type(e).__name__}: {e}")
+                results.append(dict(field="metadata", status="fail", message=str(e)))
+            errors, warns = summarize(results, numRules)
+        with open(os.path.join(outDir, "metadata-check.log"), "w") as f:
+            f.write(output.getvalue())
+        write_json(
+            os.path.join(outDir, "metadata-check.json"), name, results, errors, warns
+        )
+        write_junit(os.path.join(outDir, "metadata-check.xml"), name, results, errors)
+        print(
+            f"{'FAIL' if errors else 'PASS'} {name} ({errors} errors, {warns} warnings)"
+        )
+        if errors:
+            failed += 1
+    print(f"Metadata check: {failed} of {len(designs)} designs failed")
+    return failed
+
+
+def main():
+    args = parse_args()
+
+    if args.batch is not None or args.discover is not None:
+        designs = list()
+        if args.batch is not None:
+            with open(args.batch) as batchFile:
+                designs += json.load(batchFile)
+        if args.discover is not None:
+            designs += discover_designs(args.discover)
+        sys.exit(1 if check_batch(designs) else 0)
+
+    with open(args.metadata) as metadataFile:
+        metadata = json.load(metadataFile)
+
+    rules = load_rules(args.rules)
+    if len(rules) == 0:
+        print("No rules")
+        sys.exit(1)
+
+    ruleSet = RuleSet(rules)
+    results = check(metadata, ruleSet)
+    errors, warns = summarize(results, len(ruleSet))
+    if args.json is not None:
+        write_json(args.json, args.metadata, results, errors, warns)
+    if args.junit is not None:
+        write_junit(args.junit, args.metadata, results, errors)
+
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+
+"""
+This script checks the per stage runtime and peak memory of flow runs
+against a rolling history of previous runs of the same design, and flags
+stages that became significantly slower or use more memory.
+
+The history is a JSON file keeping the last --window runs of every
+platform/design/variant. A stage is flagged when its value exceeds the
+median of its history by more than the largest of
+  - --sigma robust standard deviations (1.4826 * median absolute deviation),
+  - a relative margin (--runtime-margin, --mem-margin) of the median,
+  - an absolute floor (--runtime-floor seconds, --mem-floor KB),
+so that short or noisy stages do not trigger on scheduling jitter.
+Stages with less than --min-history samples are not checked.
+
+Flagged stages are printed ranked by how far they are above their
+threshold, and the script exits with an error if any stage was flagged.
+Runs with a flagged stage are not added to the history unless --accept is
+given, so that a regression does not become the new baseline.
+"""
+
+from glob import glob
+import argparse
+import json
+import os
+import statistics
+import sys
+
+METRICS = {
+    # name: (metadata key suffix, unit)
+    "runtime": ("__elapsed_seconds", "s"),
+    "mem": ("__mem__peak", "KB"),
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Checks flow runtime and memory against previous runs"
+    )
+    parser.add_argument(
+        "--metadata", "-m", nargs="+", default=[], help="Metadata files"
+    )
+    parser.add_argument(
+        "--discover",
+        metavar="FLOW_DIR",
+        help="Check every FLOW_DIR/reports/<platform>/<design>/<variant>"
+        "/metadata.json",
+    )
+    parser.add_argument(
+        "--history", default="perf-history.json", help="Rolling history file"
+    )
+    parser.add_argument(
+        "--window", type=int, default=20, help="Runs kept per design in the history"
+    )
+    parser.add_argument(
+        "--min-history",
+        type=int,
+        default=5,
+        help="Runs needed in the history before a stage is checked",
+    )
+    parser.add_argument(
+        "--sigma", type=float, default=3.0, help="Robust standard deviations allowed"
+    )
+    parser.add_argument(
+        "--runtime-margin",
+        type=float,
+        default=10.0,
+        help="Runtime increase always allowed, in percent of the median",
+    )
+    parser.add_argument(
+        "--runtime-floor",
+        type=float,
+        default=10.0,
+        help="Runtime increase always allowed, in seconds",
+    )
+    parser.add_argument(
+        "--mem-margin",
+        type=float,
+        default=10.0,
+        help="Memory increase always allowed, in percent of the median",
+    )
+    parser.add_argument(
+        "--mem-floor",
+        type=float,
+        default=100 * 1024,
+        help="Memory increase always allowed, in KB",
+    )
+    parser.add_argument("--json", help="Write the regressions to a JSON file")
+    parser.add_argument(
+        "--no-update",
+        dest="update",
+        action="store_false",
+        help="Do not add the checked runs to the history",
+    )
+    parser.add_argument(
+        "--accept",
+        action="store_true",
+        help="Also add the runs with regressions to the history, making them"
+        " part of the baseline",
+    )
+    args = parser.parse_args(argv)
+    if not args.metadata and args.discover is None:
+        parser.error("one of --metadata or --discover is required")
+    return args
+
+
+def flatten(metadata):
+    """Flatten metadata written with genMetrics.py --hier."""
+    flat = dict()
+    for key, value in metadata.items():
+        if isinstance(value, dict):
+            for subkey, subvalue in value.items():
+                flat[key + "__" + subkey] = subvalue
+        else:
+            flat[key] = value
+    return flat
+
+
+def read_run(path):
+    """
+    Returns (name, uuid, samples) of a metadata file, where samples maps
+    each metric name to a dict of stage to value.
+    """
+    with open(path) as f:
+        metadata = flatten(json.load(f))
+    name = "/".join(
+        str(metadata.get("run__flow__" + key, "N/A"))
+        for key in ["platform", "design", "variant"]
+    )
+    samples = {metric: dict() for metric in METRICS}
+    for key, value in metadata.items():
+        if key == "total_elapsed_seconds":
+            key = "total__elapsed_seconds"
+        for metric, (suffix, _) in METRICS.items():
+            if not key.endswith(suffix):
+                continue
+            try:
+                samples[metric][key[: -len(suffix)]] = float(value)
+            except (TypeError, ValueError):
+                pass
+    return name, metadata.get("run__flow__uuid"), samples
+
+
+def threshold(values, sigma, margin, floor):
+    """Returns (median, largest allowed value) of a stage history."""
+    median = statistics.median(values)
+    mad = statistics.median(abs(v - median) for v in values)
+    allowed = max(sigma * 1.4826 * mad, margin / 100 * median, floor)
+    return median, median + allowed
+
+
+def severity(value, median, limit):
+    """
+    How far a value is above its threshold, relative to the allowed
+    deviation, used to rank the regressions. Without an allowed deviation,
+    the relative excess over the median, or the excess over a zero median.
+    """
+    if limit > median:
+        return (value - median) / (limit - median)
+    if median:
+        return (value - median) / abs(median)
+    return value - median
+
+
+def check_run(name, samples, history, args):
+    """Returns the regressions of one run against its history."""
+    limits = {
+        "runtime": (args.runtime_margin, args.runtime_floor),
+        "mem": (args.mem_margin, args.mem_floor),
+    }
+    regressions = list()
+    for metric, stages in samples.items():
+        margin, floor = limits[metric]
+        for stage, value in stages.items():
+            values = [
+                run[metric][stage] for run in history if stage in run.get(metric, {})
+            ]
+            if len(values) < args.min_history:
+                continue
+            median, limit = threshold(values, args.sigma, margin, floor)
+            if value <= limit:
+                continue
+            regressions.append(
+                dict(
+                    run=name,
+                    stage=stage,
+                    metric=metric,
+                    value=value,
+                    median=median,
+                    limit=limit,
+                    severity=severity(value, median, limit),
+                    samples=len(values),
+                )
+            )
+    return regressions
+
+
+def format_report(regressions):
+    format_str = "| {:30} | {:20} | {:7} | {:>12} | {:>12} | {:>8} |\n"
+    text = format_str.format("Run", "Stage", "Metric", "Value", "Median", "Increase")
+    text += format_str.format("---", "-----", "------", "-----", "------", "--------")
+    for r in regressions:
+        unit = METRICS[r["metric"]][1]
+        increase = (
+            "{:+.1f}%".format((r["value"] / r["median"] - 1) * 100)
+            if r["median"]
+            else "N/A"
+        )
+        text += format_str.format(
+            r["run"],
+            r["stage"],
+            r["metric"],
+            "{:.1f}{}".format(r["value"], unit),
+            "{:.1f}{}".format(r["median"], unit),
+            increase,
+        )
+    return text
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    paths = list(args.metadata)
+    if args.discover is not None:
+        paths += sorted(
+            glob(os.path.join(args.discover, "reports", "*", "*", "*", "metadata.json"))
+        )
+
+    history = dict()
+    if os.path.isfile(args.history):
+        with open(args.history) as f:
+            history = json.load(f)
+
+    regressions = list()
+    for path in paths:
+        try:
+            name, uuid, samples = read_run(path)
+        except (IOError, ValueError) as e:
+            print(f"[WARN] Failed to read {path}: {e}")
+            continue
+        runs = history.setdefault(name, list())
+        if uuid is not None and any(run.get("uuid") == uuid for run in runs):
+            print(f"[INFO] Run {uuid} of {name} already in history, skipping.")
+            continue
+        run_regressions = check_run(name, samples, runs, args)
+        regressions += run_regressions
+        if run_regressions and args.update and not args.accept:
+            print(f"[INFO] Run {uuid} of {name} not added to history, see --accept.")
+        elif args.update:
+            runs.append(dict(uuid=uuid, **samples))
+            del runs[: -args.window]
+
+    regressions.sort(key=lambda r: r["severity"], reverse=True)
+    if regressions:
+        print(f"[ERROR] {len(regressions)} runtime or memory regressions found:")
+        print(format_report(regressions))
+    else:
+        print(f"No runtime or memory regressions in {len(paths)} runs.")
+
+    if args.json is not None:
+        with open(args.json, "w") as f:
+            json.dump(regressions, f, indent=2)
+
+    if args.update:
+        tmp = f"{args.history}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(history, f, indent=1)
+        os.replace(tmp, args.history)
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,17 @@
 # This is a KLayout script to load a RVE DRC rpt file
 # and write out a json the DRC viewer can read.
-
+#
+# DRC_JSON_FORMAT=compact writes the violations as they are read in a
+# compact schema, where each category has an array of violations
+#
+#   [visited, waived, comment, [[type, x0, y0, x1, y1, ...], ...]]
+#
+# with flat coordinate arrays per shape, instead of building the whole
+# legacy JSON in memory. The DRC viewer of the OpenROAD GUI only reads the
+# legacy schema, compact output needs a reader of its own. An out_file
+# ending in .gz, as written by make convert_rve_gz, is written gzipped.
+
+import gzip
 import os
 import pya
 import json
@@ -32,87 +43,124 @@ def convert_drc(rdb):
 
             ordb_category["violations"].append(violation)
 
-            shapes = []
-            violation["shape"] = shapes
-
-            text = []
-
-            for value in item.each_value():
-                if value.is_box():
-                    shapes.append(
-                        {
-                            "type": "box",
-                            "points": [
-                                {"x": value.box().left, "y": value.box().bottom},
-                                {"x": value.box().right, "y": value.box().top},
-                            ],
-                        }
-                    )
-                elif value.is_edge():
-                    shapes.append(
-                        {
-                            "type": "line",
-                            "points": [
-                                {"x": value.edge().p1.x, "y": value.edge().p1.y},
-                                {"x": value.edge().p2.x, "y": value.edge().p2.y},
-                            ],
-                        }
-                    )
-                elif value.is_edge_pair():
-                    edge1 = value.edge_pair().first
-                    edge2 = value.edge_pair().second
-
-                    shapes.append(
-                        {
-                            "type": "line",
-                            "points": [
-                                {"x": edge1.p1.x, "y": edge1.p1.y},
-                                {"x": edge1.p2.x, "y": edge1.p2.y},
-                            ],
-                        }
-                    )
-                    shapes.append(
-                        {
-                            "type": "line",
-                            "points": [
-                                {"x": edge2.p1.x, "y": edge2.p1.y},
-                                {"x": edge2.p2.x, "y": edge2.p2.y},
-                            ],
-                        }
-                    )
-                elif value.is_polygon():
-                    points = []
-                    for edge in value.polygon().each_edge():
-                        points.append({"x": edge.p1.x, "y": edge.p1.y})
-                    points.append({"x": edge.p2.x, "y": edge.p2.y})
-                    shapes.append({"type": "polygon", "points": points})
-                elif value.is_path():
-                    points = []
-                    for edge in value.path().polygon().each_edge():
-                        points.append({"x": edge.p1.x, "y": edge.p1.y})
-                    points.append({"x": edge.p2.x, "y": edge.p2.y})
-                    shapes.append({"type": "polygon", "points": points})
-                elif value.is_text():
-                    text.append(value.text())
-                elif value.is_string():
-                    text.append(value.string())
-                else:
-                    print("[WARN] Unknown violation shape:", value)
-
-            comment = ""
-            if hasattr(item, "comment"):
-                comment = item.comment
-            if text:
-                if comment:
-                    comment += ": "
-                comment += ", ".join(text)
-
+            shapes, text = violation_shapes(item)
+            violation["shape"] = [
+                {
+                    "type": shape_type,
+                    "points": [
+                        {"x": x, "y": y} for x, y in zip(coords[::2], coords[1::2])
+                    ],
+                }
+                for shape_type, coords in shapes
+            ]
+
+            comment = violation_comment(item, text)
             if comment:
                 violation["comment"] = comment
 
     return ordb
 
 
+def edge_coords(edge):
+    return [edge.p1.x, edge.p1.y, edge.p2.x, edge.p2.y]
+
+
+def polygon_coords(polygon):
+    coords = []
+    for edge in polygon.each_edge():
+        coords += [edge.p1.x, edge.p1.y]
+    coords += [edge.p2.x, edge.p2.y]
+    return coords
+
+
+def violation_shapes(item):
+    """
+    Returns the shapes of a violation as (type, [x0, y0, x1, y1, ...]) and
+    its texts.
+    """
+    shapes = []
+    text = []
+
+    for value in item.each_value():
+        if value.is_box():
+            box = value.box()
+            shapes.append(("box", [box.left, box.bottom, box.right, box.top]))
+        elif value.is_edge():
+            shapes.append(("line", edge_coords(value.edge())))
+        elif value.is_edge_pair():
+            shapes.append(("line", edge_coords(value.edge_pair().first)))
+            shapes.append(("line", edge_coords(value.edge_pair().second)))
+        elif value.is_polygon():
+            shapes.append(("polygon", polygon_coords(value.polygon())))
+        elif value.is_path():
+            shapes.append(("polygon", polygon_coords(value.path().polygon())))
+        elif value.is_text():
+            text.append(value.text())
+        elif value.is_string():
+            text.append(value.string())
+        else:
+            print("[WARN] Unknown violation shape:", value)
+
+    return shapes, text
+
+
+def violation_comment(item, text):
+    comment = ""
+    if hasattr(item, "comment"):
+        comment = item.comment
+    if text:
+        if comment:
+            comment += ": "
+        comment += ", ".join(text)
+    return comment
+
+
+def write_compact_drc(rdb, outfile):
+    """Write the violations of rdb to outfile in the compact schema."""
+    source = os.path.abspath(in_drc)
+
+    def dumps(obj):
+        return json.dumps(obj, separators=(",", ":"))
+
+    outfile.write(
+        '{"DRC":{"format":"compact","version":1,"source":%s,'
+        '"description":"KLayout DRC conversion",'
+        '"fields":["visited","waived","comment","shapes"],"category":{' % dumps(source)
+    )
+
+    first_category = True
+    for category in rdb.each_category():
+        if category.num_items() == 0:
+            # ignore categories with no data
+            continue
+
+        if not first_category:
+            outfile.write(",")
+        first_category = False
+        outfile.write(
+            '%s:{"description":%s,"source":%s,"violations":['
+            % (dumps(category.name()), dumps(category.description), dumps(source))
+        )
+
+        first_item = True
+        for item in rdb.each_item_per_category(category.rdb_id()):
+            shapes, text = violation_shapes(item)
+            violation = [
+                int(item.is_visited()),
+                int("waived" in item.tags_str),
+                violation_comment(item, text),
+                [[shape_type] + coords for shape_type, coords in shapes],
+            ]
+            if not first_item:
+                outfile.write(",")
+            first_item = False
+            outfile.write(dumps(violation))
+
+        outfile.write("]}")
+
+    outfile.write("}}}")
+
+
 app = pya.Application.instance()
 win = app.main_window()
 
@@ -124,10 +172,17 @@ rdb_id = layout_view.create_rdb("ASCII")
 rdb = layout_view.rdb(rdb_id)
 rdb.load(in_drc)
 
-ordb = {}
-ordb["DRC"] = convert_drc(rdb)
-
-with open(out_file, "w") as outfile:
-    json.dump(ordb, outfile)
+if out_file.endswith(".gz"):
+    outfile = gzip.open(out_file, "wt")
+else:
+    outfile = open(out_file, "w")
+
+with outfile:
+    if os.environ.get("DRC_JSON_FORMAT", "legacy") == "compact":
+        write_compact_drc(rdb, outfile)
+    else:
+        ordb = {}
+        ordb["DRC"] = convert_drc(rdb)
+        json.dump(ordb, outfile)
 
 app.exit(0)
@@ -3,14 +3,24 @@
 # Script for generating and comparing per-layer parasitics values.
 # These values are used by set_layer_rc and will be the base
 # values for the parasitics estimations across the flow.
+#
+# Each rc file is loaded at once into NumPy structured arrays, one row per
+# net (or segment), and the arrays are cached next to the rc file in a .npz
+# file keyed on the hash of its content, so that files are only parsed once.
+#
+# With -stream the fits are computed from the normal equations (XᵀX, Xᵀy and
+# the sums needed for R²), accumulated in chunks of rows while reading each
+# file. Files are read in parallel and their sums are merged, so any number
+# of rc files can be fitted together in constant memory.
 
 import os
 from sys import exit, stderr
-from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
-import traceback
-import collections
 import argparse
+import hashlib
+import itertools
 import re
 import numpy as np
 from sklearn.linear_model import LinearRegression
@@ -18,6 +28,22 @@ import matplotlib.pyplot as plt
 
 LAYER_HEADER_RE = re.compile("^([^\\(]+)\\(([^\\)]+)\\)$")
 
+# Bump when the layout of the cached arrays changes
+CACHE_VERSION = 1
+
+# Rows parsed at a time by the streaming fits
+CHUNK_ROWS = 100000
+
+SEGMENT_DTYPE = np.dtype(
+    [
+        ("type", "S16"),
+        ("layer", "S64"),
+        ("length", "f8"),
+        ("res", "f8"),
+        ("cap", "f8"),
+    ]
+)
+
 # Parse and validate arguments
 # =============================================================================
 
@@ -46,6 +72,27 @@ def parse_args():
         default=False,
         help="Plot grt/rcx resistance differences",
     )
+    parser.add_argument(
+        "-no_cache",
+        required=False,
+        action="store_true",
+        default=False,
+        help="Do not read or write the .npz cache of the rc files",
+    )
+    parser.add_argument(
+        "-stream",
+        required=False,
+        action="store_true",
+        default=False,
+        help="Fit in constant memory by streaming the rc files",
+    )
+    parser.add_argument(
+        "-jobs",
+        required=False,
+        type=int,
+        default=None,
+        help="rc files read in parallel by -stream",
+    )
     parser.add_argument(
         "--mode",
         required=False,
@@ -57,208 +104,191 @@ def parse_args():
         "rc_file", nargs="+", help="rc csv file written by make compare_rc"
     )
     args = parser.parse_args()
+    if args.stream and (args.plot_cap or args.plot_res):
+        parser.error("-plot_cap and -plot_res need all nets, not -stream")
 
     return args
 
 
-args = parse_args()
-
-# kohm/ff nangate45, asap7
-# kohm/pf sky130hd, sky130hs
-
-res_unit = args.res_unit
-if res_unit == "ohm":
-    res_scale = 1
-elif res_unit == "kohm":
-    res_scale = 1e3
-else:
-    print("unknown resistance unit")
-    exit(1)
-
-cap_unit = args.cap_unit
-if cap_unit == "ff":
-    cap_scale = 1e-15
-elif cap_unit == "pf":
-    cap_scale = 1e-12
-else:
-    print("unknown capacitance unit")
-    exit(1)
-
-
-def makeDict():
-    return collections.defaultdict(makeDict)
+# Reading of the rc files
+# =============================================================================
 
 
-data = makeDict()
+def net_dtype(num_layers):
+    return np.dtype(
+        [
+            ("type", "S16"),
+            ("grt_res", "f8"),
+            ("grt_cap", "f8"),
+            ("rcx_res", "f8"),
+            ("rcx_cap", "f8"),
+            ("lengths", "f8", (num_layers,)),
+        ]
+    )
 
-stack = []
-stack_line = None
 
-# For segment mode.
-layer_segments = defaultdict(
-    lambda: {"lengths": [], "resistances": [], "capacitances": []}
-)
-layer_net_type_length = defaultdict(lambda: defaultdict(float))
-routing_layers = []
-routing_layers_line = None
+def parse_stack(line):
+    """Returns the (name, is_routing, via_resist) of the layers of a stack."""
+    stack = []
+    for layer in line.removeprefix("# stack: ").strip().split(" "):
+        name = layer
+        is_routing = False
+        via_resist = 0.0
+        if layer.endswith(")"):
+            # layer name has extra data
+            match = LAYER_HEADER_RE.match(layer)
+            assert match
+            name = match.group(1)
+            if match.group(2) == "routing":
+                is_routing = True
+            else:
+                via_resist = float(match.group(2))
+        stack.append((name, is_routing, via_resist))
+    return stack
 
-# indices of relevant layers (routable layers or via layers)
-active_layers = set()
 
-# Parse the cap CSV file generated by compare_rc_script.tcl
-for rc_file in args.rc_file:
-    design = rc_file
-    print("reading", design)
+def read_headers(rc_file):
+    """Returns the stack and routing layers header lines of an rc file."""
+    headers = {"stack": "", "routing layers": ""}
     with open(rc_file) as f:
-        nonGrtNets = 0
         for line in f:
-            if line.startswith("# routing layers: "):
-                if routing_layers_line is not None and routing_layers_line != line:
-                    print(f"layer stack inconsistent", file=stderr)
-                    exit(1)
-                elif routing_layers_line is None:
-                    routing_layers = (
-                        line.removeprefix("# routing layers: ").strip().split(" ")
-                    )
-                    routing_layers_line = line
-                continue
-
-            if line.startswith("# stack: "):
-                if stack_line is not None and stack_line != line:
-                    print(f"layer stack inconsistent", file=stderr)
-                    exit(1)
-                elif stack_line is None:
-                    for layer in line.removeprefix("# stack: ").strip().split(" "):
-                        name = layer
-                        is_routing = False
-                        via_resist = 0.0
-                        if layer.endswith(")"):
-                            # layer name has extra data
-                            match = LAYER_HEADER_RE.match(layer)
-                            assert match
-                            name = match.group(1)
-                            if match.group(2) == "routing":
-                                is_routing = True
-                            else:
-                                via_resist = float(match.group(2))
-                        stack.append((name, is_routing, via_resist))
-                    stack_line = line
-                continue
-
-            tokens = line.strip().split(",")
-
-            if args.mode == "segment":
-                layer_segments[tokens[2]]["lengths"].append(float(tokens[3]))
-                layer_segments[tokens[2]]["resistances"].append(float(tokens[4]))
-                layer_segments[tokens[2]]["capacitances"].append(float(tokens[5]))
-                layer_net_type_length[tokens[2]][tokens[1]] += float(tokens[3])
-            else:
-                netName = tokens[0]
-
-                data[design][netName] = {
-                    "type": tokens[1],
-                    "grt_res": float(tokens[2]),
-                    "grt_cap": float(tokens[3]),
-                    "rcx_res": float(tokens[4]),
-                    "rcx_cap": float(tokens[5]),
+            if not line.startswith("#"):
+                break
+            for key in headers:
+                if line.startswith("# {}: ".format(key)):
+                    headers[key] = line
+    return headers
+
+
+def row_dtype(mode, headers):
+    if mode == "segment":
+        return SEGMENT_DTYPE
+    return net_dtype(len(parse_stack(headers["stack"])))
+
+
+def parse_rc_file(rc_file, mode):
+    """
+    Returns the headers, net names and rows of an rc file. In net mode the
+    rows have the net type, grt/rcx resistance and capacitance and the
+    length on each layer of the stack, in segment mode the net type, layer,
+    length, resistance and capacitance of each segment.
+    """
+    headers = read_headers(rc_file)
+    dtype = np.dtype([("name", "O")] + row_dtype(mode, headers).descr)
+    data = np.loadtxt(rc_file, dtype=dtype, delimiter=",", comments="#", ndmin=1)
+    names = data["name"].astype(str)
+    rows = np.empty(len(data), dtype=dtype.descr[1:])
+    for field in rows.dtype.names:
+        rows[field] = data[field]
+    return headers, names, rows
+
+
+def file_digest(path):
+    hasher = hashlib.blake2b()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(16 * 1024 * 1024)
+            if not chunk:
+                break
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def cache_file(rc_file, mode):
+    return "{}.{}.npz".format(rc_file, mode)
+
+
+def load_rc_file(rc_file, mode, use_cache=True):
+    """
+    Returns the headers, net names and rows of an rc file, from the .npz
+    cache if it was written for the same content.
+    """
+    if not use_cache:
+        return parse_rc_file(rc_file, mode)
+
+    key = "{}:{}:{}".format(CACHE_VERSION, mode, file_digest(rc_file))
+    cache = cache_file(rc_file, mode)
+    try:
+        with np.load(cache) as cached:
+            if str(cached["key"]) == key:
+                headers = {
+                    "stack": str(cached["stack"]),
+                    "routing layers": str(cached["routing_layers"]),
                 }
-
-                layer_lengths = [float(tok) for tok in tokens[6:]]
-                for i, length in enumerate(layer_lengths):
-                    if length > 0:
-                        active_layers.add(i)
-
-                data[design][netName]["layer_lengths"] = layer_lengths
-                data[design][netName]["routable_layer_lengths"] = [
-                    length
-                    for i, length in enumerate(layer_lengths)
-                    # ignore non-routable layers
-                    if stack[i][1]
-                ]
-                data[design][netName]["wire_length"] = sum(
-                    length
-                    for i, length in enumerate(layer_lengths)
-                    # ignore non-routable layers
-                    if stack[i][1]
-                )
-                data[design][netName]["grt_via_res"] = sum(
-                    (length * stack[i][2])
-                    for i, length in enumerate(layer_lengths)
-                    if not stack[i][1]
-                )
-
-################################################################
-
-if args.mode == "net" and args.plot_cap:
-    # Compare the GRT cap estimate vs. OpenRCX SPEF cap
-
-    diff_x = []
-    diff_percent_x = []
-    for design in data:
-        for net in data[design]:
-            grt_cap = data[design][net]["grt_cap"]
-            rcx_cap = data[design][net]["rcx_cap"]
-            diff = grt_cap - rcx_cap
-            if abs(diff) > 1e-12:
-                print("large discrapancy:", design, net, diff)
-            if rcx_cap != 0.0:
-                normDiff = (diff / rcx_cap) * 100
-                diff_x.append(diff / cap_scale)
-                diff_percent_x.append(normDiff)
-
-    # Generate histograms
-    num_bins = 200
-    fig = plt.figure()
-    fig.suptitle("Difference between GRT est. Cap and RCX Cap")
-    plt.subplot(2, 2, 1)
-    plt.hist(diff_x, num_bins, facecolor="blue", alpha=0.5)
-    plt.ylabel("# Nets")
-    plt.xlabel(
-        "Capacitance ({})\n\nMean: {:.3f}{}\nStd. dev: {:.3f}fF".format(
-            cap_unit, np.mean(diff_x), cap_unit, np.std(diff_x)
+                return headers, cached["names"], cached["rows"]
+    except (OSError, KeyError, ValueError):
+        pass
+
+    headers, names, rows = parse_rc_file(rc_file, mode)
+    # np.savez appends .npz to names without it, write to a .npz temporary
+    tmp = "{}.{}.tmp.npz".format(cache, os.getpid())
+    try:
+        np.savez(
+            tmp,
+            key=key,
+            stack=headers["stack"],
+            routing_layers=headers["routing layers"],
+            names=names,
+            rows=rows,
         )
+        os.replace(tmp, cache)
+    except OSError:
+        print("[WARN] Failed to write cache", cache, file=stderr)
+    return headers, names, rows
+
+
+def load_rc_files(rc_files, mode, use_cache=True):
+    """
+    Load the rc files, checking that they have the same layer stack.
+    Returns the headers, and the design (index in rc_files), name and row
+    of every net or segment.
+    """
+    headers = {"stack": None, "routing layers": None}
+    designs, names, rows = [], [], []
+    loaded = set()
+    for i, rc_file in enumerate(rc_files):
+        print("reading", rc_file)
+        if mode == "net" and rc_file in loaded:
+            # Nets are identified by design and name, a file given twice
+            # does not add nets
+            continue
+        loaded.add(rc_file)
+        file_headers, file_names, file_rows = load_rc_file(rc_file, mode, use_cache)
+        for key, line in file_headers.items():
+            if not line:
+                continue
+            if headers[key] is not None and headers[key] != line:
+                print(f"layer stack inconsistent", file=stderr)
+                exit(1)
+            headers[key] = line
+        designs.append(np.full(len(file_rows), i))
+        names.append(file_names)
+        rows.append(file_rows)
+
+    dtype = row_dtype(mode, {"stack": headers["stack"] or ""})
+    return (
+        headers,
+        np.concatenate(designs) if designs else np.empty(0, int),
+        np.concatenate(names) if names else np.empty(0, str),
+        np.concatenate(rows) if rows else np.empty(0, dtype),
     )
 
-    plt.subplot(2, 2, 2)
-    plt.hist(diff_percent_x, num_bins, range={-1000, 1000}, facecolor="blue", alpha=0.5)
-    plt.ylabel("# Nets")
-    plt.xlabel(
-        "%\n\nMean: {:.3f}%\nStd. dev: {:.3f}%".format(
-            np.mean(diff_percent_x), np.std(diff_percent_x)
-        )
-    )
-    plt.show()
 
-################################################################
-
-if args.mode == "net" and args.plot_res:
-    # Compare the GRT res estimate vs. OpenRCX SPEF res
-
-    diff_x = []
-    diff_percent_x = []
-    for design in data:
-        for net in data[design]:
-            grt_res = data[design][net]["grt_res"]
-            rcx_res = data[design][net]["rcx_res"]
-            if grt_res > 0 and rcx_res > 0:
-                diff = grt_res - rcx_res
-                if abs(diff) > 1e3:
-                    print("large discrapancy:", design, net, diff)
-                if rcx_res != 0.0:
-                    normDiff = (diff / rcx_res) * 100
-                    diff_x.append(diff / res_scale)
-                    diff_percent_x.append(normDiff)
+# Plots and fits
+# =============================================================================
+
 
+def plot_differences(title, unit, diff_x, diff_percent_x):
     # Generate histograms
     num_bins = 200
     fig = plt.figure()
-    fig.suptitle("Difference between GRT est. Res and RCX Res")
+    fig.suptitle(title)
     plt.subplot(2, 2, 1)
     plt.hist(diff_x, num_bins, facecolor="blue", alpha=0.5)
     plt.ylabel("# Nets")
     plt.xlabel(
-        "Resistance ({})\n\nMean: {:.3f}{}\nStd. dev: {:.3f}fF".format(
-            res_unit, np.mean(diff_x), res_unit, np.std(diff_x)
+        "{}\n\nMean: {:.3f}{}\nStd. dev: {:.3f}fF".format(
+            unit[0], np.mean(diff_x), unit[1], np.std(diff_x)
         )
     )
 
@@ -272,52 +302,47 @@ if args.mode == "net" and args.plot_res:
     )
     plt.show()
 
-################################################################
 
-if args.mode == "net":
-    # Use linear regression to find updated layer resistances.
+def print_discrepancies(rc_files, designs, names, diff, large):
+    for i in np.flatnonzero(large):
+        print("large discrapancy:", rc_files[designs[i]], names[i], float(diff[i]))
 
-    x = []
-    y = []
-    for design in data:
-        for net in data[design]:
-            rcx_res = data[design][net]["rcx_res"]
-            if rcx_res > 0:
-                x.append(data[design][net]["routable_layer_lengths"])
-                y.append(rcx_res - data[design][net]["grt_via_res"])
 
-    x = np.array(x)
-    y = np.array(y)
+def net_arrays(stack, rows):
+    """
+    Returns the lengths on the routable layers, the wire length and the via
+    resistance estimated by grt of every net.
+    """
+    routable = np.array([layer[1] for layer in stack], dtype=bool)
+    via_resist = np.array([layer[2] for layer in stack])
 
-    res_model = LinearRegression(fit_intercept=False).fit(x, y)
-    r_sq = res_model.score(x, y)
-    print("# Resistance coefficient of determination: {:.4f}".format(r_sq))
-
-    ################################################################
-
-    # Use linear regression to find updated layer capacitances.
+    # ignore non-routable layers
+    routable_lengths = rows["lengths"][:, routable]
+    wire_length = routable_lengths.sum(axis=1)
+    grt_via_res = rows["lengths"][:, ~routable] @ via_resist[~routable]
+    return routable_lengths, wire_length, grt_via_res
 
-    x = []
-    y = []
-    for design in data:
-        for net in data[design]:
-            x.append(data[design][net]["routable_layer_lengths"])
-            y.append(data[design][net]["rcx_cap"])
 
-    x = np.array(x)
-    y = np.array(y)
-
-    cap_model = LinearRegression(fit_intercept=False).fit(x, y)
-    r_sq = cap_model.score(x, y)
+def print_net_fits(args, res_scale, cap_scale, stack, res_fit, cap_fit, wire_fit):
+    """
+    Print the layer and wire rc. res_fit and cap_fit are the (coefficients,
+    R²) of the per layer fits and wire_fit returns the (resistance,
+    capacitance) per length of the nets of the given types.
+    """
+    res_coef, r_sq = res_fit
+    print("# Resistance coefficient of determination: {:.4f}".format(r_sq))
+    cap_coef, r_sq = cap_fit
     print("# Capacitance coefficient of determination: {:.4f}".format(r_sq))
     print(
-        "# Updated layer resistance {}/um capacitance {}/um".format(res_unit, cap_unit)
+        "# Updated layer resistance {}/um capacitance {}/um".format(
+            args.res_unit, args.cap_unit
+        )
     )
 
     routable_layers = [layer for layer in stack if layer[1]]
     for i, layer in enumerate(routable_layers):
-        res_coeff = res_model.coef_[i]
-        cap_coeff = cap_model.coef_[i]
+        res_coeff = res_coef[i]
+        cap_coeff = cap_coef[i]
         if res_coeff != 0.0 or cap_coeff != 0.0:
             print(
                 "set_layer_rc -layer {} -resistance {:.5E} -capacitance {:.5E}".format(
@@ -325,39 +350,8 @@ if args.mode == "net":
                 )
             )
 
-    ################################################################
-
     def generic_rc_fit(type_sieve):
-        x = []
-        y = []
-        for design in data:
-            for net in data[design]:
-                net_type = data[design][net]["type"]
-                wire_res = data[design][net]["rcx_res"]
-                wire_length = data[design][net]["wire_length"]
-                if net_type in type_sieve and wire_res != 0.0:
-                    x.append([wire_length])
-                    y.append(wire_res)
-        x = np.array(x)
-        y = np.array(y)
-        wire_res_model = LinearRegression(fit_intercept=False).fit(x, y)
-        wire_res = wire_res_model.coef_[0]
-
-        x = []
-        y = []
-        for design in data:
-            for net in data[design]:
-                net_type = data[design][net]["type"]
-                if net_type in type_sieve:
-                    wire_length = data[design][net]["wire_length"]
-                    wire_cap = data[design][net]["rcx_cap"]
-                    x.append([wire_length])
-                    y.append(wire_cap)
-        x = np.array(x)
-        y = np.array(y)
-        wire_cap_model = LinearRegression(fit_intercept=False).fit(x, y)
-        wire_cap = wire_cap_model.coef_[0]
-
+        wire_res, wire_cap = wire_fit(type_sieve)
         return "-resistance {:.5E} -capacitance {:.5E}".format(
             wire_res / res_scale, wire_cap / cap_scale
         )
@@ -369,65 +363,116 @@ if args.mode == "net":
     print("set_wire_rc -signal " + generic_rc_fit(["signal"]))
     print("set_wire_rc -clock " + generic_rc_fit(["clock"]))
 
-################################################################
 
-if args.mode == "segment":
-    print("\nUnits: resistance [{}/um], capacitance [{}/um]".format(res_unit, cap_unit))
+def net_mode(args, rc_files, res_scale, cap_scale, headers, designs, names, rows):
+    stack = parse_stack(headers["stack"] or "")
+    routable_lengths, wire_length, grt_via_res = net_arrays(stack, rows)
 
-    # Note that the .csv data comes from ODB which stores capacitance in fF.
-    cap_ff_to_f = 1e-15
+    grt_res, grt_cap = rows["grt_res"], rows["grt_cap"]
+    rcx_res, rcx_cap = rows["rcx_res"], rows["rcx_cap"]
 
-    layer_models = {}
-    for layer_name in routing_layers:
-        # There may be routing layers with no segments, so we check if the
-        # layer exists in the dict.
-        if layer_name not in layer_segments:
-            continue
+    ################################################################
 
-        # sklearn requires the input to be 2D, so we reshape to add a dimension
-        # to the list.
-        lengths = np.array(layer_segments[layer_name]["lengths"]).reshape(-1, 1)
-        resistances = np.array(layer_segments[layer_name]["resistances"])
-        capacitances_ff = np.array(layer_segments[layer_name]["capacitances"])
+    if args.plot_cap:
+        # Compare the GRT cap estimate vs. OpenRCX SPEF cap
+        diff = grt_cap - rcx_cap
+        print_discrepancies(rc_files, designs, names, diff, np.abs(diff) > 1e-12)
+        nonzero = rcx_cap != 0.0
+        plot_differences(
+            "Difference between GRT est. Cap and RCX Cap",
+            ("Capacitance ({})".format(args.cap_unit), args.cap_unit),
+            diff[nonzero] / cap_scale,
+            (diff[nonzero] / rcx_cap[nonzero]) * 100,
+        )
 
-        res_model = LinearRegression(fit_intercept=False).fit(lengths, resistances)
-        cap_model = LinearRegression(fit_intercept=False).fit(lengths, capacitances_ff)
-        layer_models[layer_name] = (
-            res_model,
-            cap_model,
-            lengths,
-            resistances,
-            capacitances_ff,
+    ################################################################
+
+    if args.plot_res:
+        # Compare the GRT res estimate vs. OpenRCX SPEF res
+        valid = (grt_res > 0) & (rcx_res > 0)
+        diff = grt_res - rcx_res
+        print_discrepancies(
+            rc_files, designs, names, diff, valid & (np.abs(diff) > 1e3)
         )
+        plot_differences(
+            "Difference between GRT est. Res and RCX Res",
+            ("Resistance ({})".format(args.res_unit), args.res_unit),
+            diff[valid] / res_scale,
+            (diff[valid] / rcx_res[valid]) * 100,
+        )
+
+    ################################################################
+
+    # Use linear regression to find updated layer resistances.
+
+    valid = rcx_res > 0
+    x = routable_lengths[valid]
+    y = rcx_res[valid] - grt_via_res[valid]
+
+    res_model = LinearRegression(fit_intercept=False).fit(x, y)
+    res_fit = (res_model.coef_, res_model.score(x, y))
+
+    ################################################################
+
+    # Use linear regression to find updated layer capacitances.
+
+    x = routable_lengths
+    y = rcx_cap
+
+    cap_model = LinearRegression(fit_intercept=False).fit(x, y)
+    cap_fit = (cap_model.coef_, cap_model.score(x, y))
+
+    ################################################################
+
+    def wire_fit(type_sieve):
+        in_sieve = np.isin(rows["type"], [t.encode() for t in type_sieve])
+
+        valid = in_sieve & (rcx_res != 0.0)
+        x = wire_length[valid].reshape(-1, 1)
+        wire_res_model = LinearRegression(fit_intercept=False).fit(x, rcx_res[valid])
+
+        x = wire_length[in_sieve].reshape(-1, 1)
+        wire_cap_model = LinearRegression(fit_intercept=False).fit(x, rcx_cap[in_sieve])
+        return wire_res_model.coef_[0], wire_cap_model.coef_[0]
+
+    print_net_fits(args, res_scale, cap_scale, stack, res_fit, cap_fit, wire_fit)
+
+
+def routing_layer_names(headers):
+    if not headers["routing layers"]:
+        return []
+    return headers["routing layers"].removeprefix("# routing layers: ").strip().split()
+
+
+def print_segment_fits(args, res_scale, cap_scale, layer_fits, type_lengths):
+    """
+    Print the layer and wire rc. layer_fits has the (resistance coefficient,
+    capacitance coefficient, resistance R², capacitance R²) of each layer,
+    and type_lengths the length of each net type on each layer.
+    """
+    print(
+        "\nUnits: resistance [{}/um], capacitance [{}/um]".format(
+            args.res_unit, args.cap_unit
+        )
+    )
+
+    # Note that the .csv data comes from ODB which stores capacitance in fF.
+    cap_ff_to_f = 1e-15
 
     # Print R² table
     print("{:<13s} | {:>8s} | {:>8s}".format("\nLayer", "Res R²", "Cap R²"))
     print("-" * 34)
-    for layer_name, (
-        res_model,
-        cap_model,
-        lengths,
-        resistances,
-        capacitances_ff,
-    ) in layer_models.items():
-        r_sq_res = res_model.score(lengths, resistances)
-        r_sq_cap = cap_model.score(lengths, capacitances_ff)
+    for layer_name, (_, _, r_sq_res, r_sq_cap) in layer_fits.items():
         print("{:<12s} | {:>8.4f} | {:>8.4f}".format(layer_name, r_sq_res, r_sq_cap))
     print("-" * 34)
     print("")
 
-    for layer_name, (
-        res_model,
-        cap_model,
-        lengths,
-        resistances,
-        capacitances_ff,
-    ) in layer_models.items():
+    for layer_name, (res_coef, cap_coef, _, _) in layer_fits.items():
         print(
             "set_layer_rc -layer {} -resistance {:.5E} -capacitance {:.5E}".format(
                 layer_name,
-                res_model.coef_[0] / res_scale,
-                cap_model.coef_[0] * cap_ff_to_f / cap_scale,
+                res_coef / res_scale,
+                cap_coef * cap_ff_to_f / cap_scale,
             )
         )
     print("")
@@ -437,17 +482,15 @@ if args.mode == "segment":
         total_resistance = 0.0
         total_capacitance = 0.0
 
-        for layer_name, (res_model, cap_model, lengths, _, _) in layer_models.items():
-            if target_net_type is not None:
-                layer_length = sum(
-                    layer_net_type_length[layer_name][net_type]
-                    for net_type in target_net_type
-                )
-            else:
-                layer_length = float(lengths.sum())
+        for layer_name, (res_coef, cap_coef, _, _) in layer_fits.items():
+            layer_length = sum(
+                length
+                for net_type, length in type_lengths[layer_name].items()
+                if target_net_type is None or net_type in target_net_type
+            )
 
-            total_resistance += res_model.coef_[0] * layer_length
-            total_capacitance += cap_model.coef_[0] * layer_length
+            total_resistance += res_coef * layer_length
+            total_capacitance += cap_coef * layer_length
             total_length += layer_length
 
         if total_length == 0.0:
@@ -481,3 +524,320 @@ if args.mode == "segment":
             )
         )
     print("")
+
+
+def type_lengths_of(net_types, lengths):
+    """Returns the total length of each net type."""
+    return {
+        net_type.decode(): float(lengths[net_types == net_type].sum())
+        for net_type in np.unique(net_types)
+    }
+
+
+def segment_mode(args, res_scale, cap_scale, headers, rows):
+    layer_fits = {}
+    type_lengths = {}
+    for layer_name in routing_layer_names(headers):
+        on_layer = rows["layer"] == layer_name.encode()
+        # There may be routing layers with no segments
+        if not on_layer.any():
+            continue
+
+        # sklearn requires the input to be 2D, so we reshape to add a dimension
+        # to the list.
+        lengths = rows["length"][on_layer].reshape(-1, 1)
+        resistances = rows["res"][on_layer]
+        capacitances_ff = rows["cap"][on_layer]
+
+        res_model = LinearRegression(fit_intercept=False).fit(lengths, resistances)
+        cap_model = LinearRegression(fit_intercept=False).fit(lengths, capacitances_ff)
+        layer_fits[layer_name] = (
+            res_model.coef_[0],
+            cap_model.coef_[0],
+            res_model.score(lengths, resistances),
+            cap_model.score(lengths, capacitances_ff),
+        )
+        type_lengths[layer_name] = type_lengths_of(
+            rows["type"][on_layer], lengths[:, 0]
+        )
+
+    print_segment_fits(args, res_scale, cap_scale, layer_fits, type_lengths)
+
+
+# Streaming fits
+# =============================================================================
+
+
+class NormalEquations:
+    """
+    Sums of a least squares fit y = X b without intercept, accumulated chunk
+    by chunk. The sums of separate chunks or files merge exactly by
+    addition, and give the same coefficients and R² as a fit of all rows.
+    """
+
+    def __init__(self, num_features):
+        self.xtx = np.zeros((num_features, num_features))
+        self.xty = np.zeros(num_features)
+        self.yty = 0.0
+        self.y_sum = 0.0
+        self.n = 0
+
+    def add(self, x, y):
+        x = np.asarray(x, dtype=float).reshape(len(y), -1)
+        self.xtx += x.T @ x
+        self.xty += x.T @ y
+        self.yty += float(y @ y)
+        self.y_sum += float(y.sum())
+        self.n += len(y)
+        return self
+
+    def merge(self, other):
+        self.xtx += other.xtx
+        self.xty += other.xty
+        self.yty += other.yty
+        self.y_sum += other.y_sum
+        self.n += other.n
+        return self
+
+    def coef(self):
+        # Minimum norm solution like sklearn, features that are always zero
+        # (e.g. layers without any wire) get a zero coefficient
+        return np.linalg.lstsq(self.xtx, self.xty, rcond=None)[0]
+
+    def score(self, coef):
+        """R² of the fit, defined like sklearn for constant targets."""
+        ss_res = max(self.yty - 2 * coef @ self.xty + coef @ self.xtx @ coef, 0.0)
+        ss_tot = self.yty - self.y_sum**2 / self.n if self.n else 0.0
+        if ss_tot <= 0.0:
+            return 1.0 if ss_res == 0.0 else 0.0
+        return 1 - ss_res / ss_tot
+
+
+def merge_by_key(stats, other, num_features=1):
+    for key, equations in other.items():
+        stats.setdefault(key, NormalEquations(num_features)).merge(equations)
+
+
+class NetStats:
+    """Normal equations of the net mode fits, per net type for wire rc."""
+
+    def __init__(self, stack):
+        self.stack = stack
+        num_routable = sum(1 for layer in stack if layer[1])
+        self.res = NormalEquations(num_routable)
+        self.cap = NormalEquations(num_routable)
+        self.wire_res = {}
+        self.wire_cap = {}
+
+    def add(self, rows):
+        routable_lengths, wire_length, grt_via_res = net_arrays(self.stack, rows)
+        rcx_res, rcx_cap = rows["rcx_res"], rows["rcx_cap"]
+
+        valid = rcx_res > 0
+        self.res.add(routable_lengths[valid], rcx_res[valid] - grt_via_res[valid])
+        self.cap.add(routable_lengths, rcx_cap)
+
+        for net_type in np.unique(rows["type"]):
+            of_type = rows["type"] == net_type
+            valid = of_type & (rcx_res != 0.0)
+            name = net_type.decode()
+            self.wire_res.setdefault(name, NormalEquations(1)).add(
+                wire_length[valid], rcx_res[valid]
+            )
+            self.wire_cap.setdefault(name, NormalEquations(1)).add(
+                wire_length[of_type], rcx_cap[of_type]
+            )
+
+    def merge(self, other):
+        self.res.merge(other.res)
+        self.cap.merge(other.cap)
+        merge_by_key(self.wire_res, other.wire_res)
+        merge_by_key(self.wire_cap, other.wire_cap)
+
+
+class SegmentStats:
+    """Normal equations of the segment mode fits of each layer."""
+
+    def __init__(self):
+        self.res = {}
+        self.cap = {}
+        self.type_lengths = {}
+
+    def add(self, rows):
+        for layer in np.unique(rows["layer"]):
+            on_layer = rows["layer"] == layer
+            name = layer.decode()
+            lengths = rows["length"][on_layer]
+            self.res.setdefault(name, NormalEquations(1)).add(
+                lengths, rows["res"][on_layer]
+            )
+            self.cap.setdefault(name, NormalEquations(1)).add(
+                lengths, rows["cap"][on_layer]
+            )
+            layer_lengths = self.type_lengths.setdefault(name, {})
+            for net_type, length in type_lengths_of(
+                rows["type"][on_layer], lengths
+            ).items():
+                layer_lengths[net_type] = layer_lengths.get(net_type, 0.0) + length
+
+    def merge(self, other):
+        merge_by_key(self.res, other.res)
+        merge_by_key(self.cap, other.cap)
+        for name, lengths in other.type_lengths.items():
+            layer_lengths = self.type_lengths.setdefault(name, {})
+            for net_type, length in lengths.items():
+                layer_lengths[net_type] = layer_lengths.get(net_type, 0.0) + length
+
+
+def read_chunks(rc_file, mode, headers, chunk_rows=CHUNK_ROWS):
+    """Yield the rows of an rc file, at most chunk_rows at a time."""
+    dtype = row_dtype(mode, headers)
+    # The net name is not needed for the fits
+    num_columns = sum(int(np.prod(dtype[name].shape)) for name in dtype.names)
+    with open(rc_file) as f:
+        while True:
+            lines = list(itertools.islice(f, chunk_rows))
+            if not lines:
+                break
+            lines = [line for line in lines if not line.startswith("#")]
+            if lines:
+                yield np.loadtxt(
+                    lines,
+                    dtype=dtype,
+                    delimiter=",",
+                    usecols=range(1, 1 + num_columns),
+                    ndmin=1,
+                )
+
+
+def accumulate_rc_file(rc_file, mode, chunk_rows=CHUNK_ROWS):
+    """Returns the headers and the fit statistics of an rc file."""
+    headers = read_headers(rc_file)
+    if mode == "segment":
+        stats = SegmentStats()
+    else:
+        stats = NetStats(parse_stack(headers["stack"]))
+    for rows in read_chunks(rc_file, mode, headers, chunk_rows):
+        stats.add(rows)
+    return headers, stats
+
+
+def accumulate_rc_files(rc_files, mode, jobs=None):
+    """
+    Accumulate the fit statistics of the rc files in parallel, one file per
+    process, and merge them. Returns the headers and the merged statistics.
+    """
+    if mode == "net":
+        # Nets are identified by design and name, a file given twice does
+        # not add nets
+        rc_files = list(dict.fromkeys(rc_files))
+    for rc_file in rc_files:
+        print("reading", rc_file)
+
+    headers = {"stack": None, "routing layers": None}
+    stats = None
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for file_headers, file_stats in executor.map(
+            accumulate_rc_file, rc_files, repeat(mode)
+        ):
+            for key, line in file_headers.items():
+                if not line:
+                    continue
+                if headers[key] is not None and headers[key] != line:
+                    print(f"layer stack inconsistent", file=stderr)
+                    exit(1)
+                headers[key] = line
+            if stats is None:
+                stats = file_stats
+            else:
+                stats.merge(file_stats)
+    return headers, stats
+
+
+def net_mode_stream(args, res_scale, cap_scale, headers, stats):
+    stack = parse_stack(headers["stack"] or "")
+    res_coef = stats.res.coef()
+    cap_coef = stats.cap.coef()
+
+    def wire_fit(type_sieve):
+        res = NormalEquations(1)
+        cap = NormalEquations(1)
+        for net_type in type_sieve:
+            if net_type in stats.wire_res:
+                res.merge(stats.wire_res[net_type])
+                cap.merge(stats.wire_cap[net_type])
+        return res.coef()[0], cap.coef()[0]
+
+    print_net_fits(
+        args,
+        res_scale,
+        cap_scale,
+        stack,
+        (res_coef, stats.res.score(res_coef)),
+        (cap_coef, stats.cap.score(cap_coef)),
+        wire_fit,
+    )
+
+
+def segment_mode_stream(args, res_scale, cap_scale, headers, stats):
+    layer_fits = {}
+    for layer_name in routing_layer_names(headers):
+        # There may be routing layers with no segments
+        if layer_name not in stats.res:
+            continue
+        res, cap = stats.res[layer_name], stats.cap[layer_name]
+        res_coef, cap_coef = res.coef(), cap.coef()
+        layer_fits[layer_name] = (
+            res_coef[0],
+            cap_coef[0],
+            res.score(res_coef),
+            cap.score(cap_coef),
+        )
+    print_segment_fits(args, res_scale, cap_scale, layer_fits, stats.type_lengths)
+
+
+def main():
+    args = parse_args()
+
+    # kohm/ff nangate45, asap7
+    # kohm/pf sky130hd, sky130hs
+
+    if args.res_unit == "ohm":
+        res_scale = 1
+    elif args.res_unit == "kohm":
+        res_scale = 1e3
+    else:
+        print("unknown resistance unit")
+        exit(1)
+
+    if args.cap_unit == "ff":
+        cap_scale = 1e-15
+    elif args.cap_unit == "pf":
+        cap_scale = 1e-12
+    else:
+        print("unknown capacitance unit")
+        exit(1)
+
+    if args.stream:
+        headers, stats = accumulate_rc_files(args.rc_file, args.mode, args.jobs)
+        if args.mode == "segment":
+            segment_mode_stream(args, res_scale, cap_scale, headers, stats)
+        else:
+            net_mode_stream(args, res_scale, cap_scale, headers, stats)
+        return
+
+    # Parse the cap CSV file generated by compare_rc_script.tcl
+    headers, designs, names, rows = load_rc_files(
+        args.rc_file, args.mode, not args.no_cache
+    )
+
+    if args.mode == "segment":
+        segment_mode(args, res_scale, cap_scale, headers, rows)
+    else:
+        net_mode(
+            args, args.rc_file, res_scale, cap_scale, headers, designs, names, rows
+        )
+
+
+if __name__ == "__main__":
+    main()
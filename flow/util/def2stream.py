@@ -3,11 +3,159 @@ try:
 except ImportError:
     pya = None
 
+import hashlib
 import re
 import sys
 import os
 
 
+def file_digest(path):
+    """Returns the blake2b hex digest of the contents of a file."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def library_cache_file(cache_dir, files, dbu):
+    """
+    Returns the path of the pre-merged library of files, keyed on their
+    contents and order and on the database unit they are merged at.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr(dbu).encode())
+    for fil in files:
+        h.update(file_digest(fil).encode())
+    return os.path.join(cache_dir, "library-{0}.oas".format(h.hexdigest()))
+
+
+def read_library(pya_mod, layout, files, cache_dir=""):
+    """Read the GDS/OAS files into layout.
+
+    With a cache_dir the files are merged once into a compressed OASIS file
+    in cache_dir, which is read instead of the files on later runs.
+    """
+    if not cache_dir or not files:
+        for fil in files:
+            print("\t{0}".format(fil))
+            layout.read(fil)
+        return
+
+    cache_file = library_cache_file(cache_dir, files, layout.dbu)
+    if os.path.isfile(cache_file):
+        print("[INFO] Reading cached library '{0}'".format(cache_file))
+    else:
+        print("[INFO] Merging library into '{0}'".format(cache_file))
+        library = pya_mod.Layout()
+        library.dbu = layout.dbu
+        for fil in files:
+            print("\t{0}".format(fil))
+            library.read(fil)
+        options = pya_mod.SaveLayoutOptions()
+        options.format = "OASIS"
+        options.oasis_compression_level = 10
+        os.makedirs(cache_dir, exist_ok=True)
+        # Flows of other designs may be merging the same library
+        tmp = "{0}.{1}.tmp".format(cache_file, os.getpid())
+        library.write(tmp, options)
+        os.replace(tmp, cache_file)
+    layout.read(cache_file)
+
+
+def is_lef_cell(name):
+    """
+    True for the LEF macros of the DEF, whose contents come from the GDS/OAS
+    files. KLayout prepends VIA_ to the LEF vias instantiated by the DEF.
+    """
+    return not name.startswith("VIA_") and not name.endswith("_DEF_FILL")
+
+
+def merge_referenced(pya_mod, main_layout, design_name, files, cache_dir=""):
+    """Merge only the library cells referenced by the design into main_layout.
+
+    The library is read into its own layout, the subtrees of the masters
+    called by the top cell are copied into main_layout and the cells that
+    are not part of the top cell tree are deleted.
+    """
+    top = main_layout.cell(design_name)
+    masters = dict()
+    for cell_index in top.called_cells():
+        cell = main_layout.cell(cell_index)
+        if is_lef_cell(cell.name):
+            cell.clear()
+            masters[cell.name] = cell_index
+    print("[INFO] Design references {0} library cells".format(len(masters)))
+
+    library = pya_mod.Layout()
+    library.dbu = main_layout.dbu
+    read_library(pya_mod, library, files, cache_dir)
+
+    targets, sources = [], []
+    for name, cell_index in masters.items():
+        if library.has_cell(name):
+            targets.append(cell_index)
+            sources.append(library.cell(name).cell_index())
+    if targets:
+        cell_mapping = pya_mod.CellMapping()
+        cell_mapping.for_multi_cells_full(main_layout, targets, library, sources)
+        main_layout.copy_tree_shapes(library, cell_mapping)
+    library._destroy()
+
+    for cell_index in [
+        cell.cell_index()
+        for cell in main_layout.top_cells()
+        if cell.cell_index() != top.cell_index()
+    ]:
+        main_layout.prune_cell(cell_index, -1)
+
+
+def check_cells(layout, design_name, allow_empty=""):
+    """Report the empty and orphan cells of layout in a single pass.
+
+    Returns:
+        Number of errors encountered.
+    """
+    regex = re.compile(allow_empty) if allow_empty else None
+    empty_cells = []
+    orphan_cells = []
+    for i in layout.each_cell():
+        if i.is_empty():
+            empty_cells.append(i.name)
+        if i.name != design_name and i.parent_cells() == 0:
+            orphan_cells.append(i.name)
+
+    errors = 0
+    if allow_empty:
+        print(f"[INFO] GDS_ALLOW_EMPTY={allow_empty}")
+
+    for name in empty_cells:
+        if regex is not None and regex.match(name):
+            print(
+                "[WARNING] LEF Cell '{0}' ignored. Matches GDS_ALLOW_EMPTY.".format(
+                    name
+                )
+            )
+        else:
+            print(
+                "[ERROR] LEF Cell '{0}' has no matching GDS/OAS cell."
+                " Cell will be empty.".format(name)
+            )
+            errors += 1
+
+    if not empty_cells:
+        print("[INFO] All LEF cells have matching GDS/OAS cells")
+
+    for name in orphan_cells:
+        print("[ERROR] Found orphan cell '{0}'".format(name))
+        errors += 1
+
+    if not orphan_cells:
+        print("[INFO] No orphan cells in the final layout")
+
+    return errors
+
+
 def merge_gds(
     pya_mod,
     tech_file,
@@ -18,6 +166,8 @@ def merge_gds(
     seal_file,
     out_file,
     allow_empty="",
+    cache_dir="",
+    referenced_only=False,
 ):
     """Merge DEF and GDS/OAS files into a single stream file.
 
@@ -31,12 +181,15 @@ def merge_gds(
         seal_file: Path to seal ring GDS/OAS file (empty string if none).
         out_file: Path to output GDS/OAS file.
         allow_empty: Regex pattern for cells allowed to be empty.
+        cache_dir: Directory of the pre-merged libraries (empty string to
+            read the GDS/OAS files every time).
+        referenced_only: Merge only the library cells referenced by the DEF
+            into the DEF layout instead of copying the top cell tree of the
+            fully merged layout.
 
     Returns:
         Number of errors encountered.
     """
-    errors = 0
-
     # Load technology file
     tech = pya_mod.Technology()
     tech.load(tech_file)
@@ -52,61 +205,32 @@ def merge_gds(
 
     main_layout.read(in_def, layout_options)
 
-    # Clear cells
-    top_cell_index = main_layout.cell(design_name).cell_index()
+    if referenced_only:
+        merge_referenced(pya_mod, main_layout, design_name, in_files.split(), cache_dir)
+        top_only_layout = main_layout
+        top = main_layout.cell(design_name)
+    else:
+        # Clear cells
+        top_cell_index = main_layout.cell(design_name).cell_index()
 
-    # remove orphan cell BUT preserve cell with VIA_
-    #  - KLayout is prepending VIA_ when reading DEF that instantiates LEF's via
-    for i in main_layout.each_cell():
-        if i.cell_index() != top_cell_index:
-            if not i.name.startswith("VIA_") and not i.name.endswith("_DEF_FILL"):
-                i.clear()
-
-    # Load in the gds to merge
-    for fil in in_files.split():
-        print("\t{0}".format(fil))
-        main_layout.read(fil)
-
-    # Copy the top level only to a new layout
-    top_only_layout = pya_mod.Layout()
-    top_only_layout.dbu = main_layout.dbu
-    top = top_only_layout.create_cell(design_name)
-    top.copy_tree(main_layout.cell(design_name))
-
-    missing_cell = False
-    regex = re.compile(allow_empty) if allow_empty else None
-
-    if allow_empty:
-        print(f"[INFO] GDS_ALLOW_EMPTY={allow_empty}")
-
-    for i in top_only_layout.each_cell():
-        if i.is_empty():
-            missing_cell = True
-            if regex is not None and regex.match(i.name):
-                print(
-                    "[WARNING] LEF Cell '{0}' ignored. Matches GDS_ALLOW_EMPTY.".format(
-                        i.name
-                    )
-                )
-            else:
-                print(
-                    "[ERROR] LEF Cell '{0}' has no matching GDS/OAS cell."
-                    " Cell will be empty.".format(i.name)
-                )
-                errors += 1
+        # remove orphan cell BUT preserve cell with VIA_
+        #  - KLayout is prepending VIA_ when reading DEF that instantiates
+        #    LEF's via
+        for i in main_layout.each_cell():
+            if i.cell_index() != top_cell_index:
+                if is_lef_cell(i.name):
+                    i.clear()
 
-    if not missing_cell:
-        print("[INFO] All LEF cells have matching GDS/OAS cells")
+        # Load in the gds to merge
+        read_library(pya_mod, main_layout, in_files.split(), cache_dir)
 
-    orphan_cell = False
-    for i in top_only_layout.each_cell():
-        if i.name != design_name and i.parent_cells() == 0:
-            orphan_cell = True
-            print("[ERROR] Found orphan cell '{0}'".format(i.name))
-            errors += 1
+        # Copy the top level only to a new layout
+        top_only_layout = pya_mod.Layout()
+        top_only_layout.dbu = main_layout.dbu
+        top = top_only_layout.create_cell(design_name)
+        top.copy_tree(main_layout.cell(design_name))
 
-    if not orphan_cell:
-        print("[INFO] No orphan cells in the final layout")
+    errors = check_cells(top_only_layout, design_name, allow_empty)
 
     if seal_file:
         top_cell = top_only_layout.top_cell()
@@ -144,6 +268,8 @@ if pya is not None:
                 seal_file=seal_file,  # noqa: F821
                 out_file=out_file,  # noqa: F821
                 allow_empty=os.environ.get("GDS_ALLOW_EMPTY", ""),
+                cache_dir=os.environ.get("GDS_LIBRARY_CACHE_DIR", ""),
+                referenced_only=os.environ.get("GDS_MERGE_REFERENCED_ONLY", "0") == "1",
             )
         )
     except NameError:
@@ -8,13 +8,4 @@ fi
 
 cd "$(dirname $(readlink -f $0))/../"
 
-for variant in base hier_rtlmp
-do
-    for f in $(find . -name "rules-${variant}.json")
-    do
-        dir="$(dirname $f)"
-        echo "${dir/.\/designs\//} $variant"
-        ./util/genRuleFile.py "$dir" --variant "$variant" "$@"
-        echo
-    done
-done
+./util/genRuleFile.py --discover . --variant base,hier_rtlmp --in-place "$@"
@@ -4,17 +4,25 @@
 # in the flow and prints it in a table
 # ---------------------------------------------------------------------------
 
+from concurrent.futures import ThreadPoolExecutor
 import argparse
 import hashlib
+import json
 import pathlib
 import os
 import sys
 
+import gnuTime
+
 # Parse and validate arguments
 # ==============================================================================
 
 
-def get_hash(f):
+HASH_CACHE_FILENAME = "hash-cache.json"
+HASH_HEADERS = {"sha1": "sha1sum", "blake2b": "b2sum"}
+
+
+def get_result_file(f):
     # content hash for the result file alongside .log file is useful to
     # debug divergent results under what should be identical
     # builds(such as local and CI builds)
@@ -23,23 +31,129 @@ def get_hash(f):
             str(f).replace("logs/", "results/").replace(".log", ext)
         )
         if result_file.exists():
-            hasher = hashlib.sha1()
-            with open(result_file, "rb") as odb_f:
-                while True:
-                    chunk = odb_f.read(16 * 1024 * 1024)
-                    if not chunk:
-                        break
-                    hasher.update(chunk)
-            return hasher.hexdigest()
-    return "N/A"
-
-
-def print_log_dir_times(logdir, args):
-    first = True
-    totalElapsed = 0
-    total_max_memory = 0
-    if not args.match:
-        print(logdir)
+            return result_file
+    return None
+
+
+def hash_file(result_file, algorithm="sha1"):
+    hasher = hashlib.new(algorithm)
+    with open(result_file, "rb") as odb_f:
+        while True:
+            chunk = odb_f.read(16 * 1024 * 1024)
+            if not chunk:
+                break
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class HashCache:
+    """
+    Digests of the result files of a log directory, stored in a cache file of
+    that directory and keyed on the absolute path, inode, size and mtime_ns
+    of each file, so that unchanged results are not hashed again.
+    """
+
+    def __init__(self, path, algorithm):
+        self.path = path
+        self.algorithm = algorithm
+        self.entries = self._load()
+        self.dirty = set()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return dict()
+
+    @staticmethod
+    def _stamp(result_file):
+        st = os.stat(result_file)
+        return [st.st_ino, st.st_size, st.st_mtime_ns]
+
+    def get(self, result_file):
+        entry = self.entries.get(os.path.abspath(result_file))
+        if entry is None or entry["stamp"] != self._stamp(result_file):
+            return None
+        return entry.get(self.algorithm)
+
+    def put(self, result_file, digest):
+        name = os.path.abspath(result_file)
+        stamp = self._stamp(result_file)
+        if name not in self.entries or self.entries[name]["stamp"] != stamp:
+            self.entries[name] = {"stamp": stamp}
+        self.entries[name][self.algorithm] = digest
+        self.dirty.add(name)
+
+    def save(self):
+        if not self.dirty:
+            return
+        # Keep the entries saved by other runs since this one loaded the cache
+        # and drop the entries of removed result files
+        entries = self._load()
+        entries.update({name: self.entries[name] for name in self.dirty})
+        entries = {
+            name: entry for name, entry in entries.items() if os.path.isfile(name)
+        }
+        tmp = "{}.{}.tmp".format(self.path, os.getpid())
+        try:
+            with open(tmp, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp, self.path)
+        except IOError:
+            pass
+
+
+def open_cache(logdir, args):
+    """
+    Returns the digest cache of a log directory, or None if disabled. The
+    per step --match runs skip it, the result of the step is always new.
+    """
+    if args.noHashCache or args.match:
+        return None
+    return HashCache(os.path.join(logdir, HASH_CACHE_FILENAME), args.hash)
+
+
+def hash_files(result_files, algorithm="sha1", caches=None, jobs=None):
+    """
+    Returns a dict from result file to digest, hashing each distinct file
+    once and the files missing from their cache in parallel. caches maps
+    each result file to its HashCache.
+    """
+    caches = caches or dict()
+    digests = dict()
+    missing = list()
+    for result_file in set(result_files):
+        cache = caches.get(result_file)
+        digest = None if cache is None else cache.get(result_file)
+        if digest is None:
+            missing.append(result_file)
+        else:
+            digests[result_file] = digest
+    # hashlib releases the GIL while hashing large buffers, so threads suffice
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for result_file, digest in zip(
+            missing, executor.map(lambda r: hash_file(r, algorithm), missing)
+        ):
+            digests[result_file] = digest
+            if caches.get(result_file) is not None:
+                caches[result_file].put(result_file, digest)
+    return digests
+
+
+def get_hash(f, algorithm="sha1"):
+    result_file = get_result_file(f)
+    if result_file is None:
+        return "N/A"
+    return hash_file(result_file, algorithm)
+
+
+def parse_log_dir(logdir, args):
+    """
+    Returns a row (stem, elapsed time, peak memory, result file) for every
+    log file of logdir that has an elapsed time line.
+    """
+    rows = list()
 
     # Loop on all log files in the directory
     for f in sorted(pathlib.Path(logdir).glob("**/*.log")):
@@ -49,49 +163,46 @@ def print_log_dir_times(logdir, args):
         stem = os.path.splitext(os.path.basename(str(f)))[0]
         if args.match and args.match != stem:
             continue
-        with open(str(f)) as logfile:
-            found = False
-            for line in logfile:
-                elapsedTime = None
-                peak_memory = None
-
-                # Example line:
-                # Elapsed time: 0:04.26[h:]min:sec. CPU time: user 4.08 sys 0.17 (99%). Peak memory: 671508KB.
-                if "Elapsed time" in line:
-                    found = True
-                    # Extract the portion that has the time
-                    timePor = line.strip().replace("Elapsed time: ", "")
-                    # Remove the units from the time portion
-                    timePor = timePor.split("[h:]", 1)[0]
-                    # Remove any fraction of a second
-                    timePor = timePor.split(".", 1)[0]
-                    # Calculate elapsed time that has this format 'h:m:s'
-                    timeList = timePor.split(":")
-                    if len(timeList) == 2:
-                        # Only minutes and seconds are present
-                        elapsedTime = int(timeList[0]) * 60 + int(timeList[1])
-                    elif len(timeList) == 3:
-                        # Hours, minutes, and seconds are present
-                        elapsedTime = (
-                            int(timeList[0]) * 3600
-                            + int(timeList[1]) * 60
-                            + int(timeList[2])
-                        )
-                    else:
-                        print(
-                            "Elapsed time not understood in", str(line), file=sys.stderr
-                        )
-                    # Find Peak Memory
-                    peak_memory = int(
-                        int(line.split("Peak memory: ")[1].split("KB")[0]) / 1024
-                    )
-                    break
+        footer = gnuTime.read_footer(str(f))
+        if footer is None:
+            print("No elapsed time found in", str(f), file=sys.stderr)
+            continue
+
+        elapsedTime = None
+        if footer.elapsed_seconds is not None:
+            # Remove any fraction of a second
+            elapsedTime = int(footer.elapsed_seconds)
+        else:
+            print("Elapsed time not understood in", str(f), file=sys.stderr)
+        peak_memory = None
+        if footer.peak_memory is not None:
+            peak_memory = int(footer.peak_memory / 1024)
+
+        rows.append((stem, elapsedTime, peak_memory, get_result_file(f)))
 
-            odb_hash = get_hash(f)
+    return rows
 
-            if not found:
-                print("No elapsed time found in", str(f), file=sys.stderr)
-                continue
+
+def print_log_dir_times(logdir, args, rows=None, digests=None):
+    first = True
+    totalElapsed = 0
+    total_max_memory = 0
+    if not args.match:
+        print(logdir)
+
+    if rows is None:
+        rows = parse_log_dir(logdir, args)
+    if digests is None:
+        cache = open_cache(logdir, args)
+        result_files = [r[3] for r in rows if r[3] is not None]
+        digests = hash_files(
+            result_files, args.hash, dict.fromkeys(result_files, cache)
+        )
+        if cache is not None:
+            cache.save()
+
+    for stem, elapsedTime, peak_memory, result_file in rows:
+        odb_hash = digests.get(result_file, "N/A")
 
         # Print the name of the step and the corresponding elapsed time
         format_str = "%-25s %10s %14s %20s"
@@ -99,7 +210,12 @@ def print_log_dir_times(logdir, args):
             if first and not args.noHeader:
                 print(
                     format_str
-                    % ("Log", "Elapsed/s", "Peak Memory/MB", "sha1sum .odb [0:20)")
+                    % (
+                        "Log",
+                        "Elapsed/s",
+                        "Peak Memory/MB",
+                        "%s .odb [0:20)" % HASH_HEADERS[args.hash],
+                    )
                 )
                 first = False
             print(
@@ -132,6 +248,22 @@ def scan_logs(args):
         "--logDir", "-d", required=True, nargs="+", help="Log files directories"
     )
     parser.add_argument("--noHeader", action="store_true", help="Skip the header")
+    parser.add_argument(
+        "--hash",
+        choices=list(HASH_HEADERS),
+        default="sha1",
+        help="Digest of the result files, blake2b is faster than sha1",
+    )
+    parser.add_argument(
+        "--noHashCache",
+        action="store_true",
+        help="Do not use the digest cache, {} of each log directory".format(
+            HASH_CACHE_FILENAME
+        ),
+    )
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=None, help="Result files hashed in parallel"
+    )
     args = parser.parse_args(args)
 
     if not args.logDir:
@@ -139,8 +271,20 @@ def scan_logs(args):
         parser.print_help()
         sys.exit(1)
 
-    for log_dir in args.logDir:
-        print_log_dir_times(log_dir, args)
+    # Hash the result files of all directories at once so that distinct
+    # files are hashed in parallel
+    rows = [parse_log_dir(log_dir, args) for log_dir in args.logDir]
+    caches = [open_cache(log_dir, args) for log_dir in args.logDir]
+    cache_of = dict()
+    for dir_rows, cache in zip(rows, caches):
+        cache_of.update((r[3], cache) for r in dir_rows if r[3] is not None)
+    digests = hash_files(list(cache_of), args.hash, cache_of, args.jobs)
+    for cache in caches:
+        if cache is not None:
+            cache.save()
+
+    for log_dir, dir_rows in zip(args.logDir, rows):
+        print_log_dir_times(log_dir, args, dir_rows, digests)
 
 
 if __name__ == "__main__":
@@ -3,13 +3,43 @@
 # This scripts attempts to generate massive design of experiment runscripts.
 # and save it into a "runMassive.sh" and "doe.log".
 # -------------------------------------------------------------------------------
-
+#
+# Usage: genMassive.py [clean|run] [options]
+#
+# Without "clean" or "run" a manifest of the runs is written, one JSON line
+# per point of the design of experiments, along with the configs of all
+# runs, runMassive.sh and the metrics collect script. With --lazy only the
+# manifest is written and the config of a run is written when it is run.
+#
+# Points are numbered in the order of the cartesian product of the knobs and
+# computed from their index, so the product is never held in memory.
+# --shard K/N selects the points whose index modulo N is K, and --index a
+# list of indexes or ranges (e.g. 0-99,120), so that host K of N generates
+# and runs only its slice. The manifest and state files are named after the
+# slice (e.g. runMassive_manifest.1-of-4.jsonl), so hosts sharing ./metrics
+# do not overwrite each other's, and "run" must be given the same slice as
+# the generation.
+#
+# "run" executes the selected runs with a local executor: up to --jobs
+# flows run at once, each reserving --cpus-per-job cores (passed to the flow
+# as NUM_CORES) and --mem-per-job GB of memory out of the machine's
+# resources. The state of each run is appended to a state file of the
+# slice, so an interrupted "run" resumes where it stopped, and the metrics
+# of each run are collected as soon as it finishes.
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+import argparse
+import json
 import os
 import sys
 import os.path
 import re
 import itertools
 import glob
+import shlex
+import subprocess
+import time
 
 PUBLIC = ["nangate45", "sky130hd", "sky130hs", "asap7"]
 
@@ -28,6 +58,9 @@ OriginalSDC = "constraint.sdc"
 ShellName = "runMassive"
 # for metrics collect script (with '.sh') file name
 MetricsShellName = "%s_metrics_collect.sh" % (ShellName)
+# for the manifest of the runs and their state (in ./metrics)
+ManifestName = "%s_manifest" % (ShellName)
+StateName = "%s_state" % (ShellName)
 
 
 ##################
@@ -184,33 +217,22 @@ def assignEmptyAttrs(dicts):
     return knobs
 
 
-def writeDoeLog(dicts, ProductDicts):
+def writeDoeLog(dicts):
     fo = open("./doe.log", "w")
     numRuns = 1
+    knobNames = []
     for k, v in dicts.items():
         if len(v) > 0:
             print("%s has %s number of values" % (k, len(v)))
             fo.write("%s has %s number of values\n" % (k, len(v)))
             numRuns = numRuns * len(v)
+            knobNames.append(str(k))
     fo.write("\nTotal Number of Runs = %s\n\n" % numRuns)
     print("\nTotal Number of Runs = %s\n\n" % numRuns)
 
-    knobValuesList = []
-    knobNamesList = []
-    for CurAttrs in ProductAttrs:
-        knobValues = []
-        knobNames = []
-        for k, v in CurAttrs.items():
-            if v == "empty":
-                continue
-            else:
-                knobNames.append(str(k))
-                knobValues.append(str(v))
-        knobValuesList.append(knobValues)
-        knobNamesList.append(knobNames)
-    fo.write(str(knobNamesList[0]) + "\n")
-    for knobSet in knobValuesList:
-        fo.write(str(knobSet) + "\n")
+    # The values of each run are in the manifest
+    fo.write(str(knobNames) + "\n")
+    fo.write("Runs are listed in ./metrics/%s*.jsonl\n" % ManifestName)
 
     fo.close()
 
@@ -219,6 +241,83 @@ def productDict(dicts):
     return (dict(zip(dicts, x)) for x in itertools.product(*dicts.values()))
 
 
+def numPoints(knobs):
+    numRuns = 1
+    for v in knobs.values():
+        numRuns = numRuns * len(v)
+    return numRuns
+
+
+def pointAt(knobs, index):
+    """
+    Returns the point at index in the order of productDict, where the last
+    knob changes fastest.
+    """
+    values = []
+    for v in reversed(list(knobs.values())):
+        index, i = divmod(index, len(v))
+        values.append(v[i])
+    return dict(zip(knobs, reversed(values)))
+
+
+def parseShard(shard):
+    """Parse a K/N shard selector."""
+    try:
+        k, n = (int(x) for x in shard.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected K/N, got %s" % shard)
+    if n < 1 or not 0 <= k < n:
+        raise argparse.ArgumentTypeError("expected 0 <= K < N, got %s" % shard)
+    return k, n
+
+
+def parseIndexes(indexes):
+    """Parse a list of indexes and inclusive ranges, e.g. 0-99,120."""
+    ranges = []
+    try:
+        for item in indexes.split(","):
+            first, _, last = item.partition("-")
+            ranges.append((int(first), int(last or first)))
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected e.g. 0-99,120, got %s" % indexes)
+    return ranges
+
+
+def selectedIndexes(total, shard=None, indexes=None):
+    """Yield the indexes of the points selected by shard and indexes."""
+    k, n = shard or (0, 1)
+    if indexes is None:
+        candidates = range(k, total, n)
+    else:
+        candidates = (
+            i
+            for first, last in sorted(indexes)
+            for i in range(max(first, 0), min(last + 1, total))
+        )
+    seen = set() if indexes is not None else None
+    for i in candidates:
+        if i % n != k:
+            continue
+        if seen is not None:
+            # Ranges may overlap
+            if i in seen:
+                continue
+            seen.add(i)
+        yield i
+
+
+def chunkOf(index):
+    return index // NumFilesPerChunk
+
+
+def variantNameOf(CurAttrs):
+    variantName = ""
+    for k, v in CurAttrs.items():
+        if v != "empty" and k != "PLATFORM_DESIGN":
+            variantName = variantName + "-" + str(k) + "_" + str(v)
+    return variantName[1:]
+
+
 def adjustFastRoute(filedata, adjSet, GrOverflow):
     if adjSet[0] != "empty":
         filedata = re.sub(
@@ -304,13 +403,6 @@ def writeConfigs(CurAttrs, CurChunkNum):
     if not os.path.isdir(CurChunkDir):
         os.mkdir(CurChunkDir)
 
-    if MakeArg == "clean":
-        fileList = glob.glob("%s/*-DoE-*" % (CurChunkDir))
-        if fileList is not None:
-            for file in fileList:
-                os.remove(file)
-        return
-
     # print(CurPlatform, CurDesign)
     # print(CurClkPeriod, CurAbcClkPeriod, CurFlatten, CurCoreUtil)
     # print(CurAspectRatio, CurCoreDieMargin, CurGpPad, CurDpPad)
@@ -321,11 +413,7 @@ def writeConfigs(CurAttrs, CurChunkNum):
     # print(CurGrOverflow)
 
     # print(CurAttrs.items())
-    variantName = ""
-    for k, v in CurAttrs.items():
-        if v != "empty" and k != "PLATFORM_DESIGN":
-            variantName = variantName + "-" + str(k) + "_" + str(v)
-    variantName = variantName[1:]
+    variantName = variantNameOf(CurAttrs)
     # fileName = 'config-%s-%s-'%(CurPlatform, CurDesign)+variantName + '.mk'
     fileName = "config-DoE-" + variantName + ".mk"
 
@@ -443,41 +531,421 @@ def writeConfigs(CurAttrs, CurChunkNum):
 
     fo.close()
 
-    frun = open("./%s.sh" % ShellName, "a")
-    RunName = "DESIGN_CONFIG=%s/%s make\n" % (CurChunkDir, fileName)
-    frun.write(RunName)
-    frun.close()
+    return "%s/%s" % (CurChunkDir, fileName)
+
+
+def cleanConfigs():
+    """Remove the generated files from the chunk directories of all designs."""
+    for platformDesign in PLATFORM_DESIGN:
+        CurPlatform, CurDesign = platformDesign.split("-")
+        for file in glob.glob(
+            "./designs/%s/%s/chunks/chunk*/*-DoE-*" % (CurPlatform, CurDesign)
+        ):
+            os.remove(file)
+
+
+##################################
+#  local executor
+##################################
 
-    with open("./metrics/%s" % MetricsShellName, "a") as fcollect:
-        CollectName = (
-            "python util/genMetrics.py -x -p %s -d %s -v %s -o metrics/metrics_%s/%s.json\n"
-            % (CurPlatform, CurDesign, variantName, ShellName, variantName)
+
+def sliceName(name, shard=None, indexes=None):
+    """Name of a file of a slice, so that hosts sharing ./metrics do not collide."""
+    if shard is not None:
+        name += ".%d-of-%d" % shard
+    if indexes is not None:
+        name += "." + ",".join(
+            str(first) if first == last else "%d-%d" % (first, last)
+            for first, last in indexes
+        )
+    return "./metrics/%s.jsonl" % name
+
+
+def manifestPath(shard=None, indexes=None):
+    return sliceName(ManifestName, shard, indexes)
+
+
+def statePath(shard=None, indexes=None):
+    return sliceName(StateName, shard, indexes)
+
+
+def writeManifest(path, knobs, shard=None, indexes=None):
+    """
+    Write the manifest of the points of a slice: a header with the knobs and
+    the slice, then one JSON line per point, which only has the knobs that
+    are set. Yields the points as they are written.
+    """
+    total = numPoints(knobs)
+    with open(path, "w") as f:
+        header = {"knobs": knobs, "total": total, "shard": shard, "index": indexes}
+        f.write(json.dumps(header) + "\n")
+        for index in selectedIndexes(total, shard, indexes):
+            CurAttrs = pointAt(knobs, index)
+            platform, design = CurAttrs["PLATFORM_DESIGN"].split("-")
+            row = {
+                "index": index,
+                "platform": platform,
+                "design": design,
+                "variant": variantNameOf(CurAttrs),
+                "point": {k: v for k, v in CurAttrs.items() if v != "empty"},
+            }
+            f.write(json.dumps(row, separators=(",", ":")) + "\n")
+            yield CurAttrs, row
+
+
+def readManifest(path):
+    """Returns the header of a manifest and an iterator over its points."""
+    f = open(path)
+    header = json.loads(f.readline())
+
+    def rows():
+        with f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    return header, rows()
+
+
+def loadState(path):
+    """Returns the latest record of each point of a state file by index."""
+    state = {}
+    if os.path.isfile(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Partial line of an interrupted write
+                    continue
+                state[record["index"]] = record
+    return state
+
+
+def appendState(f, record):
+    f.write(json.dumps(record, separators=(",", ":")) + "\n")
+    f.flush()
+
+
+def memTotalGB(field="MemTotal"):
+    """Returns a /proc/meminfo field in GB, or None if not available."""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024 / 1024
+    except (IOError, ValueError, IndexError):
+        pass
+    return None
+
+
+def formatSeconds(seconds):
+    return str(timedelta(seconds=int(seconds)))
+
+
+def runJob(job, args):
+    """
+    Run the flow of a job, then collect its metrics. Returns the exit code
+    of the flow.
+    """
+    env = dict(os.environ)
+    env["DESIGN_CONFIG"] = job["config"]
+    env["NUM_CORES"] = str(args.cpus_per_job)
+    with open(job["log"], "w") as log:
+        returncode = subprocess.call(
+            shlex.split(args.make), env=env, stdout=log, stderr=subprocess.STDOUT
         )
-        fcollect.write(CollectName)
+        if args.metrics:
+            subprocess.call(
+                [
+                    sys.executable,
+                    "util/genMetrics.py",
+                    "-x",
+                    "-p",
+                    job["platform"],
+                    "-d",
+                    job["design"],
+                    "-v",
+                    job["variant"],
+                    "-o",
+                    job["metrics"],
+                ],
+                stdout=log,
+                stderr=subprocess.STDOUT,
+            )
+    return returncode
+
+
+class Slots:
+    """
+    CPU and memory reservations of the running jobs. A job starts when its
+    reservation fits in what is left, and, on Linux, when the memory
+    actually available is at least its reservation.
+    """
+
+    def __init__(self, cpus, mem, cpusPerJob, memPerJob):
+        self.cpus = cpus
+        self.mem = mem
+        self.cpusPerJob = cpusPerJob
+        self.memPerJob = memPerJob
+        self.running = 0
+
+    def fits(self):
+        if self.running == 0:
+            # Always run a job, even one that needs more than the machine
+            return True
+        if (self.running + 1) * self.cpusPerJob > self.cpus:
+            return False
+        if self.mem is not None and (self.running + 1) * self.memPerJob > self.mem:
+            return False
+        available = memTotalGB("MemAvailable")
+        return available is None or available >= self.memPerJob
+
+    def acquire(self):
+        self.running += 1
+
+    def release(self):
+        self.running -= 1
+
+
+def runMassive(args):
+    path = manifestPath(args.shard, args.index)
+    if not os.path.isfile(path):
+        print("[ERROR] No manifest %s, generate the runs of this slice first." % path)
+        sys.exit(1)
+    header, rows = readManifest(path)
+    # JSON has no tuples
+    if json.loads(json.dumps([args.shard, args.index])) != [
+        header.get("shard"),
+        header.get("index"),
+    ]:
+        print(
+            "[ERROR] Manifest %s is of the slice --shard %s --index %s."
+            % (path, header.get("shard"), header.get("index"))
+        )
+        sys.exit(1)
+    knobs = header["knobs"]
+    selected = set(selectedIndexes(header["total"], args.shard, args.index))
+
+    state = loadState(statePath(args.shard, args.index))
+    rerun = ["running"] + (["failed"] if args.retry_failed else [])
+
+    def toRun(row):
+        if row["index"] not in selected:
+            return False
+        return row["index"] not in state or state[row["index"]]["status"] in rerun
+
+    numRuns = 0
+    numDone = 0
+    numToRun = 0
+    for row in rows:
+        if row["index"] in selected:
+            numRuns += 1
+            numDone += state.get(row["index"], {}).get("status") == "done"
+            numToRun += toRun(row)
+    print("%d runs, %d already done, %d to run" % (numRuns, numDone, numToRun))
+    # The points are read again as they are run
+    _, rows = readManifest(path)
+    pending = (row for row in rows if toRun(row))
+
+    slots = Slots(args.cpus, args.mem, args.cpus_per_job, args.mem_per_job)
+    running = {}
+    finished = 0
+    failed = 0
+    start = time.time()
+    fstate = open(statePath(args.shard, args.index), "a")
+    try:
+        with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+            job = next(pending, None)
+            while job is not None or running:
+                while job is not None and len(running) < args.jobs and slots.fits():
+                    # The config is written only when it is run
+                    CurAttrs = {k: job["point"].get(k, "empty") for k in knobs}
+                    job["config"] = writeConfigs(CurAttrs, chunkOf(job["index"]))
+                    job["start"] = time.time()
+                    # Variants of different designs may have the same name
+                    name = "%s-%s-%s" % (job["platform"], job["design"], job["variant"])
+                    job["log"] = "./metrics/metrics_%s/%s.log" % (ShellName, name)
+                    job["metrics"] = "./metrics/metrics_%s/%s.json" % (ShellName, name)
+                    slots.acquire()
+                    running[executor.submit(runJob, job, args)] = job
+                    appendState(
+                        fstate,
+                        {
+                            "index": job["index"],
+                            "status": "running",
+                            "start": job["start"],
+                        },
+                    )
+                    job = next(pending, None)
+
+                # Check the available memory again from time to time
+                done, _ = wait(running, timeout=30, return_when=FIRST_COMPLETED)
+                for future in done:
+                    run = running.pop(future)
+                    slots.release()
+                    run["end"] = time.time()
+                    try:
+                        run["returncode"] = future.result()
+                    except OSError as e:
+                        print("[ERROR] Failed to run %s: %s" % (run["config"], e))
+                        run["returncode"] = None
+                    run["status"] = "done" if run["returncode"] == 0 else "failed"
+                    appendState(
+                        fstate,
+                        {
+                            k: run[k]
+                            for k in ["index", "status", "start", "end", "returncode"]
+                        },
+                    )
+
+                    finished += 1
+                    if run["status"] == "failed":
+                        failed += 1
+                    wall = time.time() - start
+                    throughput = finished / wall * 3600
+                    eta = (numToRun - finished) * wall / finished
+                    print(
+                        "[%d/%d] %s %s in %s, %.1f runs/h, ETA %s"
+                        % (
+                            finished,
+                            numToRun,
+                            run["status"],
+                            run["variant"],
+                            formatSeconds(run["end"] - run["start"]),
+                            throughput,
+                            formatSeconds(eta),
+                        )
+                    )
+    except KeyboardInterrupt:
+        # The flows are interrupted too, the runs left running in the state
+        # file are run again when resuming
+        print("Interrupted, run again to resume.")
+        sys.exit(130)
+    finally:
+        fstate.close()
+
+    print(
+        "Finished %d runs in %s, %d failed"
+        % (finished, formatSeconds(time.time() - start), failed)
+    )
+    return failed
+
+
+def parseArgs():
+    parser = argparse.ArgumentParser(
+        description="Generates and runs a design of experiments"
+    )
+    parser.add_argument(
+        "action",
+        nargs="?",
+        default="generate",
+        help="clean: remove the generated configs, run: execute the generated"
+        " runs, otherwise generate the configs",
+    )
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=1, help="Flows run at the same time"
+    )
+    parser.add_argument(
+        "--cpus",
+        type=int,
+        default=os.cpu_count(),
+        help="Cores available to the runs",
+    )
+    parser.add_argument(
+        "--cpus-per-job", type=int, default=1, help="Cores reserved for each run"
+    )
+    parser.add_argument(
+        "--mem",
+        type=float,
+        default=memTotalGB(),
+        help="Memory available to the runs in GB",
+    )
+    parser.add_argument(
+        "--mem-per-job",
+        type=float,
+        default=0,
+        help="Memory reserved for each run in GB",
+    )
+    parser.add_argument(
+        "--make", default="make", help="Command running the flow of a config"
+    )
+    parser.add_argument(
+        "--no-metrics",
+        dest="metrics",
+        action="store_false",
+        help="Do not collect the metrics of each run when it finishes",
+    )
+    parser.add_argument(
+        "--retry-failed", action="store_true", help="Run the failed runs again"
+    )
+    parser.add_argument(
+        "--shard",
+        type=parseShard,
+        help="K/N, generate and run only the points whose index modulo N is K",
+    )
+    parser.add_argument(
+        "--index",
+        type=parseIndexes,
+        help="Generate and run only the points at these indexes, e.g. 0-99,120",
+    )
+    parser.add_argument(
+        "--lazy",
+        action="store_true",
+        help="Only write the manifest, the config of a run is written when it"
+        " is run",
+    )
+    return parser.parse_args()
 
 
-MakeArg = sys.argv[1]
+def main():
+    args = parseArgs()
 
+    if not os.path.isdir("./metrics"):
+        os.mkdir("./metrics")
+    if not os.path.isdir("./metrics/metrics_%s" % ShellName):
+        os.mkdir("./metrics/metrics_%s" % ShellName)
 
-if not os.path.isdir("./metrics"):
-    os.mkdir("./metrics")
-if not os.path.isdir("./metrics/metrics_%s" % ShellName):
-    os.mkdir("./metrics/metrics_%s" % ShellName)
+    if args.action == "run":
+        sys.exit(1 if runMassive(args) else 0)
 
-knobs = assignEmptyAttrs(SweepingAttributes)
-ProductAttrs = list(productDict(knobs))
-writeDoeLog(SweepingAttributes, ProductAttrs)
-if os.path.isfile("./%s.sh" % ShellName):
-    os.remove("./%s.sh" % ShellName)
-if os.path.isfile("./metrics/%s" % MetricsShellName):
-    os.remove("./metrics/%s" % MetricsShellName)
-CurChunkNum = 0
-for i, CurAttrs in enumerate(ProductAttrs, 1):
-    if i % NumFilesPerChunk == 0:
-        writeConfigs(CurAttrs, CurChunkNum)
-        CurChunkNum = CurChunkNum + 1
-    else:
-        writeConfigs(CurAttrs, CurChunkNum)
+    if os.path.isfile("./%s.sh" % ShellName):
+        os.remove("./%s.sh" % ShellName)
+    if os.path.isfile("./metrics/%s" % MetricsShellName):
+        os.remove("./metrics/%s" % MetricsShellName)
+
+    if args.action == "clean":
+        cleanConfigs()
+        for name in [ManifestName, StateName]:
+            for file in glob.glob("./metrics/%s*.jsonl" % name):
+                os.remove(file)
+        return
+
+    knobs = assignEmptyAttrs(SweepingAttributes)
+    writeDoeLog(SweepingAttributes)
+    path = manifestPath(args.shard, args.index)
+    points = writeManifest(path, knobs, args.shard, args.index)
+    if args.lazy:
+        numRuns = sum(1 for _ in points)
+        print("Manifest of %d runs written to %s" % (numRuns, path))
+        return
+
+    with open("./%s.sh" % ShellName, "w") as frun, open(
+        "./metrics/%s" % MetricsShellName, "w"
+    ) as fcollect:
+        for CurAttrs, row in points:
+            config = writeConfigs(CurAttrs, chunkOf(row["index"]))
+            frun.write("DESIGN_CONFIG=%s make\n" % config)
+            fcollect.write(
+                "python util/genMetrics.py -x -p %s -d %s -v %s -o metrics/metrics_%s/%s.json\n"
+                % (
+                    row["platform"],
+                    row["design"],
+                    row["variant"],
+                    ShellName,
+                    row["variant"],
+                )
+            )
 
 
 # with open('file.txt') as data:
@@ -487,3 +955,7 @@ for i, CurAttrs in enumerate(ProductAttrs, 1):
 
 # with open('file.txt') as data:
 #    for line in file_data:
+
+
+if __name__ == "__main__":
+    main()
@@ -5,9 +5,12 @@
 # information in specific files using regular expressions
 # -----------------------------------------------------------------------------
 
+import mmap
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 from uuid import uuid4 as uuid
 from subprocess import check_output, call, STDOUT
 
@@ -16,6 +19,9 @@ import json
 import re
 from glob import glob
 
+import gnuTime
+import resourceSampler
+
 
 def parse_args():
     parser = argparse.ArgumentParser(
@@ -24,7 +30,7 @@ def parse_args():
     parser.add_argument(
         "--design",
         "-d",
-        required=True,
+        required=False,
         help="Design Name for metrics",
     )
     parser.add_argument(
@@ -48,93 +54,345 @@ def parse_args():
         "--output", "-o", required=False, default="metadata.json", help="Output file"
     )
     parser.add_argument("--hier", "-x", action="store_true", help="Hierarchical JSON")
-    parser.add_argument("--logs", required=True, help="Path to logs")
-    parser.add_argument("--reports", required=True, help="Path to reports")
-    parser.add_argument("--results", required=True, help="Path to results")
+    parser.add_argument("--logs", help="Path to logs")
+    parser.add_argument("--reports", help="Path to reports")
+    parser.add_argument("--results", help="Path to results")
+    parser.add_argument(
+        "--no-cache",
+        dest="cache",
+        action="store_false",
+        help="Do not use the metrics cache stored in the logs directory",
+    )
+    batch = parser.add_argument_group("batch mode")
+    batch.add_argument(
+        "--batch",
+        help="JSON file with a list of runs, each with the keys design,"
+        " platform, variant, logs, reports, results and optionally output",
+    )
+    batch.add_argument(
+        "--discover",
+        metavar="FLOW_DIR",
+        help="Extract metrics for every <platform>/<design>/<variant>"
+        " found under FLOW_DIR/logs",
+    )
+    batch.add_argument(
+        "--index",
+        default="metadata-index.json",
+        help="Combined index written in batch mode",
+    )
+    batch.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of worker processes in batch mode",
+    )
     args = parser.parse_args()
 
+    if args.batch is None and args.discover is None:
+        for arg in ["design", "logs", "reports", "results"]:
+            if getattr(args, arg) is None:
+                parser.error(
+                    f"--{arg} is required unless --batch or --discover is used"
+                )
+
     return args
 
 
 # Functions
 # =============================================================================
-# Main function to do specific extraction of patterns from a file
-
-# This function will look for a regular expression 'pattern' in a 'file', and
-# set the key, 'jsonTag', to the value found. The specific 'occurrence' selects
-# which occurrence it uses (default -1, i.e., last). If pattern not found, it
-# will print an error and set the value to N/A. If a 'defaultNotFound' is set,
-# it will use that instead.  If count is set to True, it will return the count
-# of the pattern.
+# Metrics are extracted from log and report files by a table of patterns. Each
+# pattern looks for a regular expression 'pattern' in a 'file', and sets the
+# key, 'tag', to the value found. The specific 'occurrence' selects which
+# occurrence it uses (default -1, i.e., last). If pattern not found, it will
+# print a warning and set the value to 'default' ("N/A"). If 'count' is set to
+# True, it will return the count of the pattern. If 'optional' is set, nothing
+# is extracted when the file does not exist.
+#
+# All patterns are scanned together so that every file is read exactly once,
+# no matter how many tags are extracted from it.
+
+MetricPattern = namedtuple(
+    "MetricPattern",
+    [
+        "tag",
+        "file",
+        "pattern",
+        "occurrence",
+        "t",
+        "default",
+        "required",
+        "count",
+        "optional",
+    ],
+    defaults=[-1, float, "N/A", True, False, False],
+)
 
+# Files larger than this are memory-mapped instead of read into a string
+MMAP_THRESHOLD = 16 * 1024 * 1024
+
+# Marker for patterns whose file could not be opened
+_FILE_ERROR = object()
+
+
+class MetricsCache:
+    """
+    Sidecar cache of the results extracted from each source file, keyed on
+    the file path, size and modification time. Only files that changed since
+    the cache was written are parsed again.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            if data.get("version") == self.VERSION:
+                self.entries = data["files"]
+        except (IOError, ValueError, KeyError, AttributeError):
+            pass
+
+    @staticmethod
+    def _stamp(file):
+        try:
+            st = os.stat(file)
+        except OSError:
+            return None
+        return [st.st_size, st.st_mtime_ns]
+
+    def get(self, file, key):
+        """Returns the cached result for key, or None if file changed."""
+        stamp = self._stamp(file)
+        entry = self.entries.get(os.path.abspath(file))
+        if stamp is None or entry is None or entry["stamp"] != stamp:
+            self.misses += 1
+            return None
+        if key not in entry["results"]:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["results"][key]
+
+    def put(self, file, key, value):
+        stamp = self._stamp(file)
+        if stamp is None:
+            return
+        path = os.path.abspath(file)
+        entry = self.entries.get(path)
+        if entry is None or entry["stamp"] != stamp:
+            entry = {"stamp": stamp, "results": {}}
+            self.entries[path] = entry
+        entry["results"][key] = value
+
+    def save(self):
+        tmp = "{}.{}.tmp".format(self.path, os.getpid())
+        try:
+            with open(tmp, "w") as f:
+                json.dump({"version": self.VERSION, "files": self.entries}, f)
+            os.replace(tmp, self.path)
+        except IOError:
+            print("[WARN] Failed to write metrics cache:", self.path)
+        print(
+            "[INFO] Metrics cache {}: {} hits, {} misses.".format(
+                self.path, self.hits, self.misses
+            )
+        )
+
+
+def scanFiles(patterns, cache=None):
+    """
+    Scan all patterns, reading each file once. Returns a dict from pattern
+    to the list of matches, or _FILE_ERROR if the file could not be read.
+    Patterns of optional files that do not exist are left out. With a cache,
+    files that did not change since the last scan are not read.
+    """
+    by_file = defaultdict(list)
+    for pattern in patterns:
+        if pattern.optional and not os.path.isfile(pattern.file):
+            continue
+        by_file[pattern.file].append(pattern)
 
-def extractTagFromFile(
-    jsonTag,
-    jsonFile,
-    pattern,
-    file,
-    count=False,
-    occurrence=-1,
-    defaultNotFound="N/A",
-    t=float,
-    required=True,
-):
-    if jsonTag in jsonFile:
-        print("[WARN] Overwriting Tag", jsonTag)
+    matches = {}
+    for file, file_patterns in list(by_file.items()):
+        if cache is None:
+            continue
+        cached = [cache.get(file, "re:" + p.pattern) for p in file_patterns]
+        if all(c is not None for c in cached):
+            matches.update(zip(file_patterns, cached))
+            del by_file[file]
+
+    for file, file_patterns in by_file.items():
+        try:
+            if os.path.getsize(file) > MMAP_THRESHOLD:
+                with open(file, "rb") as f, mmap.mmap(
+                    f.fileno(), 0, access=mmap.ACCESS_READ
+                ) as content:
+                    for p in file_patterns:
+                        regex = re.compile(p.pattern.encode(), re.M)
+                        matches[p] = [
+                            m.decode("utf-8", errors="replace")
+                            for m in regex.findall(content)
+                        ]
+            else:
+                with open(file) as f:
+                    content = f.read()
+                for p in file_patterns:
+                    matches[p] = re.findall(p.pattern, content, re.M)
+        except (IOError, ValueError):
+            for p in file_patterns:
+                matches[p] = _FILE_ERROR
+            continue
+        if cache is not None:
+            for p in file_patterns:
+                cache.put(file, "re:" + p.pattern, matches[p])
+    return matches
 
-    try:
-        with open(file) as f:
-            content = f.read()
 
-        parsedMetrics = re.findall(pattern, content, re.M)
+def applyPatterns(jsonFile, patterns, matches):
+    for pattern in patterns:
+        if pattern not in matches:
+            continue
+        jsonTag = pattern.tag
+        if jsonTag in jsonFile:
+            print("[WARN] Overwriting Tag", jsonTag)
+
+        parsedMetrics = matches[pattern]
+        if parsedMetrics is _FILE_ERROR:
+            print("[ERROR] Failed to open file:", pattern.file)
+            jsonFile[jsonTag] = "ERR"
+            continue
 
-        patternNotFound = len(parsedMetrics) < abs(occurrence)
-        if patternNotFound and not required:
-            jsonFile[jsonTag] = defaultNotFound
-            return
+        patternNotFound = len(parsedMetrics) < abs(pattern.occurrence)
+        if patternNotFound and not pattern.required:
+            jsonFile[jsonTag] = pattern.default
+            continue
 
         if parsedMetrics:
-            if count:
+            if pattern.count:
                 # Return the count
                 jsonFile[jsonTag] = len(parsedMetrics)
             else:
                 # Note: This gets the specified occurrence
-                value = parsedMetrics[occurrence]
+                value = parsedMetrics[pattern.occurrence]
                 value = value.strip()
                 try:
-                    jsonFile[jsonTag] = t(value)
+                    jsonFile[jsonTag] = pattern.t(value)
                 except BaseException:
                     jsonFile[jsonTag] = str(value)
         else:
             # Only print a warning if the defaultNotFound is not set
             print(
-                "[WARN] Tag {} not found in {}.".format(jsonTag, file),
-                "Will use {}.".format(defaultNotFound),
+                "[WARN] Tag {} not found in {}.".format(jsonTag, pattern.file),
+                "Will use {}.".format(pattern.default),
             )
-            jsonFile[jsonTag] = defaultNotFound
-    except IOError:
-        print("[ERROR] Failed to open file:", file)
-        jsonFile[jsonTag] = "ERR"
+            jsonFile[jsonTag] = pattern.default
 
 
-def extractGnuTime(prefix, jsonFile, file):
+def extractTagFromFile(
+    jsonTag,
+    jsonFile,
+    pattern,
+    file,
+    count=False,
+    occurrence=-1,
+    defaultNotFound="N/A",
+    t=float,
+    required=True,
+):
+    patterns = [
+        MetricPattern(
+            jsonTag,
+            file,
+            pattern,
+            occurrence=occurrence,
+            t=t,
+            default=defaultNotFound,
+            required=required,
+            count=count,
+        )
+    ]
+    applyPatterns(jsonFile, patterns, scanFiles(patterns))
+
+
+def readGnuTime(file, cache=None):
+    """Returns the GNU time footer of a log, using the cache if possible."""
+    cached = None if cache is None else cache.get(file, "gnutime")
+    if cached is not None:
+        return gnuTime.GnuTime(*cached) if cached else None
+    footer = gnuTime.read_footer(file)
+    if cache is not None:
+        cache.put(file, "gnutime", list(footer) if footer else [])
+    return footer
+
+
+def extractGnuTime(prefix, jsonFile, file, cache=None):
+    """
+    Extract the runtime, CPU time and peak memory of a stage from the GNU
+    time footer of its log. Nothing is extracted if the log does not exist.
+    """
     if not os.path.isfile(file):
         return
-    extractTagFromFile(
+    tags = [
         prefix + "__runtime__total",
-        jsonFile,
-        "^Elapsed time: (\\S+)\\[h:\\]min:sec.*",
-        file,
-    )
-    extractTagFromFile(
         prefix + "__cpu__total",
-        jsonFile,
-        "^Elapsed time:.*CPU time: user (\\S+) .*",
-        file,
-    )
-    extractTagFromFile(
-        prefix + "__mem__peak", jsonFile, "^Elapsed time:.*Peak memory: (\\S+)KB.", file
-    )
+        prefix + "__mem__peak",
+    ]
+    try:
+        footer = readGnuTime(file, cache)
+    except OSError:
+        print("[ERROR] Failed to open file:", file)
+        for tag in tags:
+            jsonFile[tag] = "ERR"
+        return
+
+    values = [None] * len(tags)
+    if footer is not None:
+        values = [footer.elapsed, footer.user, footer.peak_memory]
+    for tag, value in zip(tags, values):
+        if tag in jsonFile:
+            print("[WARN] Overwriting Tag", tag)
+        if value is None:
+            print(
+                "[WARN] Tag {} not found in {}.".format(tag, file),
+                "Will use N/A.",
+            )
+            jsonFile[tag] = "N/A"
+            continue
+        try:
+            jsonFile[tag] = float(value)
+        except ValueError:
+            jsonFile[tag] = str(value)
+
+
+def extractResources(prefix, jsonFile, file, cache=None):
+    """
+    Extract the RSS percentiles and parallel efficiency of a stage from the
+    samples written by resourceSampler.py. Nothing is extracted if the stage
+    was not sampled.
+    """
+    if not os.path.isfile(file):
+        return
+    summary = None if cache is None else cache.get(file, "resources")
+    if summary is None:
+        try:
+            summary = resourceSampler.summarize(file) or {}
+        except (IOError, ValueError, IndexError) as e:
+            print("[WARN] Failed to read resource samples {}: {}".format(file, e))
+            return
+        if cache is not None:
+            cache.put(file, "resources", summary)
+    if not summary:
+        return
+    jsonFile[prefix + "__mem__rss_p50"] = summary["rss_p50"]
+    jsonFile[prefix + "__mem__rss_p95"] = summary["rss_p95"]
+    jsonFile[prefix + "__cpu__average_cores"] = summary["cores_average"]
+    if summary["parallel_efficiency"] is not None:
+        jsonFile[prefix + "__cpu__parallel_efficiency"] = summary["parallel_efficiency"]
 
 
 #
@@ -182,70 +440,146 @@ def is_git_repo(folder=None):
             return call(cmd, stderr=STDOUT, stdout=devnull) == 0
 
 
-def merge_jsons(root_path, output, files):
+def cache_path(logPath):
+    return os.path.join(logPath, "metrics-cache.json")
+
+
+def merge_jsons(root_path, output, files, cache=None):
     paths = sorted(glob(os.path.join(root_path, files)))
     for path in paths:
-        file = open(path, "r")
-        data = json.load(file)
+        data = None if cache is None else cache.get(path, "json")
+        if data is None:
+            file = open(path, "r")
+            data = json.load(file)
+            file.close()
+            if cache is not None:
+                cache.put(path, "json", data)
         output.update(data)
-        file.close()
 
 
-def extract_metrics(
-    cwd, platform, design, flow_variant, output, hier_json, logPath, rptPath, resultPath
-):
-    baseRegEx = "^{}\n^-*\n^{}"
-
-    metrics_dict = defaultdict(dict)
-    metrics_dict["run__flow__generate_date"] = now.strftime("%Y-%m-%d %H:%M")
-    metrics_dict["run__flow__metrics_version"] = "Metrics_2.1.2"
+def get_flow_provenance():
+    """
+    Returns the metrics describing the tools and scripts, which are the same
+    for every design of a run.
+    """
+    provenance = dict()
+    provenance["run__flow__generate_date"] = datetime.now().strftime("%Y-%m-%d %H:%M")
+    provenance["run__flow__metrics_version"] = "Metrics_2.1.2"
     cmdOutput = check_output([os.environ.get("OPENROAD_EXE", "openroad"), "-version"])
     cmdFields = [x.decode("utf-8") for x in cmdOutput.split()]
-    metrics_dict["run__flow__openroad_version"] = str(cmdFields[0])
+    provenance["run__flow__openroad_version"] = str(cmdFields[0])
     if len(cmdFields) > 1:
-        metrics_dict["run__flow__openroad_commit"] = str(cmdFields[1])
+        provenance["run__flow__openroad_commit"] = str(cmdFields[1])
     else:
-        metrics_dict["run__flow__openroad_commit"] = "N/A"
+        provenance["run__flow__openroad_commit"] = "N/A"
     if is_git_repo():
         cmdOutput = check_output(["git", "rev-parse", "HEAD"])
         cmdOutput = cmdOutput.decode("utf-8").strip()
     else:
         cmdOutput = "not a git repo"
         print("[WARN]", cmdOutput)
-    metrics_dict["run__flow__scripts_commit"] = cmdOutput
-    metrics_dict["run__flow__uuid"] = str(uuid())
-    metrics_dict["run__flow__design"] = design
-    metrics_dict["run__flow__platform"] = platform
-    platformDir = os.environ.get("PLATFORM_DIR")
+    provenance["run__flow__scripts_commit"] = cmdOutput
+    return provenance
+
+
+def get_platform_commit(platformDir):
     if platformDir is None:
         print("[INFO]", "PLATFORM_DIR env variable not set")
-        cmdOutput = "N/A"
-    elif is_git_repo(folder=platformDir):
+        return "N/A"
+    if is_git_repo(folder=platformDir):
         cmdOutput = check_output(["git", "rev-parse", "HEAD"], cwd=platformDir)
-        cmdOutput = cmdOutput.decode("utf-8").strip()
-    else:
-        print("[WARN]", "not a git repo")
-        cmdOutput = "N/A"
-    metrics_dict["run__flow__platform_commit"] = cmdOutput
+        return cmdOutput.decode("utf-8").strip()
+    print("[WARN]", "not a git repo")
+    return "N/A"
+
+
+def get_provenance(platformDir):
+    provenance = get_flow_provenance()
+    provenance["run__flow__platform_commit"] = get_platform_commit(platformDir)
+    return provenance
+
+
+def extract_metrics(
+    cwd,
+    platform,
+    design,
+    flow_variant,
+    output,
+    hier_json,
+    logPath,
+    rptPath,
+    resultPath,
+    provenance=None,
+    cachePath=None,
+):
+    baseRegEx = "^{}\n^-*\n^{}"
+
+    if provenance is None:
+        provenance = get_provenance(os.environ.get("PLATFORM_DIR"))
+
+    metrics_dict = defaultdict(dict)
+    metrics_dict.update(provenance)
+    metrics_dict["run__flow__uuid"] = str(uuid())
+    metrics_dict["run__flow__design"] = design
+    metrics_dict["run__flow__platform"] = platform
     metrics_dict["run__flow__variant"] = flow_variant
 
-    # Synthesis
+    # Patterns
     # =========================================================================
 
-    # The new format (>= 0.57) is: <count> <area> cells
-    extractTagFromFile(
-        "synth__design__instance__count__stdcell",
-        metrics_dict,
-        "^\\s+(\\d+)\\s+[-0-9.]+\\s+cells$",
-        rptPath + "/synth_stat.txt",
-    )
+    synthPatterns = [
+        # The new format (>= 0.57) is: <count> <area> cells
+        MetricPattern(
+            "synth__design__instance__count__stdcell",
+            rptPath + "/synth_stat.txt",
+            "^\\s+(\\d+)\\s+[-0-9.]+\\s+cells$",
+        ),
+        MetricPattern(
+            "synth__design__instance__area__stdcell",
+            rptPath + "/synth_stat.txt",
+            "Chip area for (?:top )?module.*: +(\\S+)",
+        ),
+    ]
+    globalRoutePatterns = [
+        MetricPattern(
+            "globalroute__timing__clock__slack",
+            logPath + "/5_1_grt.log",
+            "^\\[INFO FLW-....\\] Clock .* slack (\\S+)",
+        ),
+    ]
+    finishPatterns = [
+        MetricPattern(
+            "finish__timing__wns_percent_delay",
+            rptPath + "/6_finish.rpt",
+            baseRegEx.format("finish slack div critical path delay", "(\\S+)"),
+        ),
+    ]
+    timeLogs = [
+        ("finish", "6_report.log"),
+        ("synth", "1_2_yosys.log"),
+        ("floorplan", "2_1_floorplan.log"),
+        ("floorplan_io", "2_2_floorplan_io.log"),
+        ("floorplan_macro", "2_3_floorplan_macro.log"),
+        ("floorplan_tap", "2_4_floorplan_tapcell.log"),
+        ("floorplan_pdn", "2_5_floorplan_pdn.log"),
+        ("globalplace_skip_io", "3_1_place_gp_skip_io.log"),
+        ("globalplace_io", "3_2_place_iop.log"),
+        ("globalplace", "3_3_place_gp.log"),
+        ("placeopt", "3_4_place_resized.log"),
+        ("detailedplace", "3_5_place_dp.log"),
+        ("cts", "4_1_cts.log"),
+        ("globalroute", "5_1_grt.log"),
+        ("fillcell", "5_2_fillcell.log"),
+        ("detailedroute", "5_3_route.log"),
+        ("finish_merge", "6_1_merge.log"),
+    ]
+
+    cache = None if cachePath is None else MetricsCache(cachePath)
+    matches = scanFiles(synthPatterns + globalRoutePatterns + finishPatterns, cache)
 
-    extractTagFromFile(
-        "synth__design__instance__area__stdcell",
-        metrics_dict,
-        "Chip area for (?:top )?module.*: +(\\S+)",
-        rptPath + "/synth_stat.txt",
-    )
+    # Synthesis
+    # =========================================================================
+    applyPatterns(metrics_dict, synthPatterns, matches)
 
     # Clocks
     # =========================================================================
@@ -255,64 +589,35 @@ def extract_metrics(
 
     # Floorplan
     # =========================================================================
-    merge_jsons(logPath, metrics_dict, "2_*.json")
+    merge_jsons(logPath, metrics_dict, "2_*.json", cache)
 
     # Place
     # =========================================================================
-    merge_jsons(logPath, metrics_dict, "3_*.json")
+    merge_jsons(logPath, metrics_dict, "3_*.json", cache)
 
     # CTS
     # =======================================================================
-    merge_jsons(logPath, metrics_dict, "4_*.json")
+    merge_jsons(logPath, metrics_dict, "4_*.json", cache)
 
     # Global Route
     # =========================================================================
-    merge_jsons(logPath, metrics_dict, "5_*.json")
-    extractTagFromFile(
-        "globalroute__timing__clock__slack",
-        metrics_dict,
-        "^\\[INFO FLW-....\\] Clock .* slack (\\S+)",
-        logPath + "/5_1_grt.log",
-    )
+    merge_jsons(logPath, metrics_dict, "5_*.json", cache)
+    applyPatterns(metrics_dict, globalRoutePatterns, matches)
 
     # Finish
     # =========================================================================
-    merge_jsons(logPath, metrics_dict, "6_*.json")
-    extractTagFromFile(
-        "finish__timing__wns_percent_delay",
-        metrics_dict,
-        baseRegEx.format("finish slack div critical path delay", "(\\S+)"),
-        rptPath + "/6_finish.rpt",
-    )
-
-    extractGnuTime("finish", metrics_dict, logPath + "/6_report.log")
+    merge_jsons(logPath, metrics_dict, "6_*.json", cache)
+    applyPatterns(metrics_dict, finishPatterns, matches)
 
     # Accumulate time
     # =========================================================================
+    for prefix, log in timeLogs:
+        extractGnuTime(prefix, metrics_dict, logPath + "/" + log, cache)
+        samples = os.path.splitext(log)[0] + ".resources.jsonl"
+        extractResources(prefix, metrics_dict, logPath + "/" + samples, cache)
 
-    extractGnuTime("synth", metrics_dict, logPath + "/1_2_yosys.log")
-    extractGnuTime("floorplan", metrics_dict, logPath + "/2_1_floorplan.log")
-    extractGnuTime("floorplan_io", metrics_dict, logPath + "/2_2_floorplan_io.log")
-    extractGnuTime(
-        "floorplan_macro", metrics_dict, logPath + "/2_3_floorplan_macro.log"
-    )
-    extractGnuTime(
-        "floorplan_tap", metrics_dict, logPath + "/2_4_floorplan_tapcell.log"
-    )
-    extractGnuTime("floorplan_pdn", metrics_dict, logPath + "/2_5_floorplan_pdn.log")
-    extractGnuTime(
-        "globalplace_skip_io", metrics_dict, logPath + "/3_1_place_gp_skip_io.log"
-    )
-    extractGnuTime("globalplace_io", metrics_dict, logPath + "/3_2_place_iop.log")
-    extractGnuTime("globalplace", metrics_dict, logPath + "/3_3_place_gp.log")
-    extractGnuTime("placeopt", metrics_dict, logPath + "/3_4_place_resized.log")
-    extractGnuTime("detailedplace", metrics_dict, logPath + "/3_5_place_dp.log")
-    extractGnuTime("cts", metrics_dict, logPath + "/4_1_cts.log")
-    extractGnuTime("globalroute", metrics_dict, logPath + "/5_1_grt.log")
-    extractGnuTime("fillcell", metrics_dict, logPath + "/5_2_fillcell.log")
-    extractGnuTime("detailedroute", metrics_dict, logPath + "/5_3_route.log")
-    extractGnuTime("finish_merge", metrics_dict, logPath + "/6_1_merge.log")
-    extractGnuTime("finish", metrics_dict, logPath + "/6_report.log")
+    if cache is not None:
+        cache.save()
 
     failed = False
     total = timedelta()
@@ -372,18 +677,145 @@ def extract_metrics(
     with open(output, "w") as resultSpecfile:
         json.dump(metrics_dict, resultSpecfile, indent=2, sort_keys=True)
 
+    return metrics_dict
 
-args = parse_args()
-now = datetime.now()
 
-extract_metrics(
-    os.path.join(os.path.dirname(os.path.realpath(__file__)), "../"),
-    args.platform,
-    args.design,
-    args.flowVariant,
-    args.output,
-    args.hier,
-    args.logs,
-    args.reports,
-    args.results,
-)
+# Batch mode
+# =============================================================================
+# Extract metrics for many runs in one invocation. The tool and script
+# versions are looked up once and shared by all runs, and the runs are
+# processed by a pool of worker processes.
+
+
+def discover_runs(flow_dir):
+    """Find <platform>/<design>/<variant> directories under flow_dir/logs."""
+    runs = []
+    logs = os.path.join(flow_dir, "logs")
+    for logPath in sorted(glob(os.path.join(logs, "*", "*", "*"))):
+        if not os.path.isdir(logPath):
+            continue
+        platform, design, variant = os.path.relpath(logPath, logs).split(os.sep)
+        runs.append(
+            {
+                "design": design,
+                "platform": platform,
+                "variant": variant,
+                "logs": logPath,
+                "reports": os.path.join(flow_dir, "reports", platform, design, variant),
+                "results": os.path.join(flow_dir, "results", platform, design, variant),
+            }
+        )
+    return runs
+
+
+def _extract_run(cwd, run, hier_json, provenance, use_cache):
+    try:
+        metrics = extract_metrics(
+            cwd,
+            run["platform"],
+            run["design"],
+            run["variant"],
+            run["output"],
+            hier_json,
+            run["logs"],
+            run["reports"],
+            run["results"],
+            provenance=provenance,
+            cachePath=cache_path(run["logs"]) if use_cache else None,
+        )
+        return run, metrics, None
+    except Exception as e:
+        return run, None, "{}: {}".format(type(e).__name__, e)
+
+
+def extract_metrics_batch(cwd, runs, hier_json, index, jobs, use_cache=True):
+    """
+    Extract the metrics of all runs and write a combined index. A run that
+    fails is recorded in the index and does not stop the others.
+    """
+    flowProvenance = get_flow_provenance()
+    platformCommits = dict()
+    for run in runs:
+        run.setdefault("variant", "base")
+        run.setdefault("output", os.path.join(run["reports"], "metadata.json"))
+        if run["platform"] not in platformCommits:
+            platformDir = os.path.join(cwd, "platforms", run["platform"])
+            if not os.path.isdir(platformDir):
+                platformDir = os.environ.get("PLATFORM_DIR")
+            platformCommits[run["platform"]] = get_platform_commit(platformDir)
+
+    entries = dict()
+    with ProcessPoolExecutor(max_workers=max(1, jobs)) as executor:
+        futures = []
+        for run in runs:
+            provenance = dict(flowProvenance)
+            provenance["run__flow__platform_commit"] = platformCommits[run["platform"]]
+            futures.append(
+                executor.submit(
+                    _extract_run, cwd, run, hier_json, provenance, use_cache
+                )
+            )
+        for future in as_completed(futures):
+            run, metrics, error = future.result()
+            name = "/".join([run["platform"], run["design"], run["variant"]])
+            entry = {
+                "design": run["design"],
+                "platform": run["platform"],
+                "variant": run["variant"],
+                "output": run["output"],
+            }
+            if error is None:
+                entry["status"] = "ok"
+                entry["metrics"] = metrics
+            else:
+                print(
+                    "[ERROR] Failed to extract metrics for {}: {}".format(name, error)
+                )
+                entry["status"] = "ERR"
+                entry["error"] = error
+            entries[name] = entry
+
+    failed = sum(1 for entry in entries.values() if entry["status"] != "ok")
+    with open(index, "w") as indexFile:
+        json.dump(
+            {"provenance": flowProvenance, "runs": entries},
+            indexFile,
+            indent=2,
+            sort_keys=True,
+        )
+    print(
+        "[INFO] Extracted metrics for {} of {} runs, index written to {}.".format(
+            len(entries) - failed, len(entries), index
+        )
+    )
+    return failed
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    cwd = os.path.join(os.path.dirname(os.path.realpath(__file__)), "../")
+
+    if args.batch is not None or args.discover is not None:
+        runs = []
+        if args.batch is not None:
+            with open(args.batch) as batchFile:
+                runs += json.load(batchFile)
+        if args.discover is not None:
+            runs += discover_runs(args.discover)
+        failed = extract_metrics_batch(
+            cwd, runs, args.hier, args.index, args.jobs, args.cache
+        )
+        sys.exit(1 if failed else 0)
+
+    extract_metrics(
+        cwd,
+        args.platform,
+        args.design,
+        args.flowVariant,
+        args.output,
+        args.hier,
+        args.logs,
+        args.reports,
+        args.results,
+        cachePath=cache_path(args.logs) if args.cache else None,
+    )
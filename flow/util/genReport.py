@@ -4,10 +4,12 @@ Generate reports from current logs
 """
 
 import argparse
+import contextlib
+import io
+import json
 import os
 import re
-
-os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from concurrent.futures import ProcessPoolExecutor
 
 LOGS_FOLDER = "logs"
 REPORTS_FOLDER = "reports"
@@ -20,6 +22,9 @@ METRICS_LOG_FMT = "metadata-generate.log"
 METRICS_CHECK_FMT = "{}/metadata-check.log"
 REGEX_ERROR = re.compile(r"^\[error ?(\w+-\d+)?\]", re.IGNORECASE)
 REGEX_WARNING = re.compile(r"^\[warning ?(\w+-\d+)?\]", re.IGNORECASE)
+# Cheap byte-level check done before running the regexes on a line
+MESSAGE_PREFIXES = (b"[error", b"[warning")
+SCAN_CACHE_FILENAME = f"{REPORTS_FOLDER}/report-scan-cache.json"
 SKIPPED_FLOW_VARIANT_KEYWORDS = ["test", "tune"]
 STATUS_GREEN = "Passing"
 STATUS_RED = "Failing"
@@ -57,27 +62,62 @@ parser.add_argument(
     help="Only write summary file.",
 )
 
-args = parser.parse_args()
+parser.add_argument(
+    "--jobs",
+    "-j",
+    required=False,
+    type=int,
+    default=os.cpu_count(),
+    help="Number of processes used to scan the logs.",
+)
 
+parser.add_argument(
+    "--no-cache",
+    required=False,
+    dest="cache",
+    default=True,
+    action="store_false",
+    help=f"Do not use the scan cache in {SCAN_CACHE_FILENAME}.",
+)
 
-def parse_messages(filename, print_missing=True):
+
+def parse_messages(filename, print_missing=True, cache=None):
     """
-    TODO: docs
+    Returns the error and warning messages found in a file. When a cache dict
+    is given, files whose size and mtime match the cached entry are not read.
     """
-    errors = list()
-    warnings = list()
     try:
-        with open(filename, "r") as file:
-            lines = file.readlines()
-        for line in lines:
-            if re.search(REGEX_ERROR, line):
-                errors.append(line.strip())
-            elif re.search(REGEX_WARNING, line):
-                warnings.append(line.strip())
+        st = os.stat(filename)
+        stamp = [st.st_size, st.st_mtime_ns]
+        if cache is not None:
+            entry = cache.get(filename)
+            if entry is not None and entry["stamp"] == stamp:
+                return list(entry["errors"]), list(entry["warnings"])
+        errors = list()
+        warnings = list()
+        with open(filename, "rb") as file:
+            content = file.read()
+        lowered = content.lower()
+        if any(prefix in lowered for prefix in MESSAGE_PREFIXES):
+            for line in content.splitlines():
+                if not line[:9].lower().startswith(MESSAGE_PREFIXES):
+                    continue
+                line = line.decode("utf-8", errors="replace")
+                if re.search(REGEX_ERROR, line):
+                    errors.append(line.strip())
+                elif re.search(REGEX_WARNING, line):
+                    warnings.append(line.strip())
+        if cache is not None:
+            cache[filename] = {
+                "stamp": stamp,
+                "errors": list(errors),
+                "warnings": list(warnings),
+            }
+        return errors, warnings
     except BaseException:
         if print_missing:
             print(f"Failed to open {filename}.")
-    return errors, warnings
+    return list(), list()
 
 
 def append_text(list_, text, sup, regex, verbose):
@@ -244,20 +284,24 @@ def write_summary():
         print("Generated report summary file:", SUMMARY_FILENAME)
 
 
-design_list = dict()
+def scan_design(log_dir, files, cache):
+    """
+    Scan the logs and reports of one design. Runs in a worker process, so the
+    messages printed are captured and returned along with the design data and
+    the updated cache entries.
+    """
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        d = _scan_design(log_dir, files, cache)
+    if cache is not None:
+        # drop the entries of logs that no longer exist
+        cache = {k: v for k, v in cache.items() if os.path.isfile(k)}
+    return d, cache, output.getvalue()
 
-for log_dir, dirs, files in sorted(os.walk(LOGS_FOLDER, topdown=False)):
-    dir_list = log_dir.split(os.sep)
-    # Handles autotuner folders, which do not have `report.log` natively.
-    # TODO: Can we log something for autotuner?
-    if len(dir_list) != 4 or any(
-        word in dir_list[-1] for word in SKIPPED_FLOW_VARIANT_KEYWORDS
-    ):
-        continue
+
+def _scan_design(log_dir, files, cache):
     report_dir = log_dir.replace(LOGS_FOLDER, REPORTS_FOLDER)
 
-    # basic info about current design
-    platform, design, variant = dir_list[1:]
     d = dict()
     d["output_file"] = os.path.join(report_dir, REPORT_FILENAME)
 
@@ -266,7 +310,7 @@ for log_dir, dirs, files in sorted(os.walk(LOGS_FOLDER, topdown=False)):
     d["log_warnings"] = list()
     d["last_log"] = ""
     for name_ in sorted(files):
-        temp_e, temp_w = parse_messages(os.path.join(log_dir, name_))
+        temp_e, temp_w = parse_messages(os.path.join(log_dir, name_), cache=cache)
         d["log_errors"] += temp_e
         d["log_warnings"] += temp_w
         if name_.endswith(".log"):
@@ -277,16 +321,21 @@ for log_dir, dirs, files in sorted(os.walk(LOGS_FOLDER, topdown=False)):
     d["metrics_logs_errors"], d["metrics_logs_warnings"] = parse_messages(
         os.path.join(report_dir, METRICS_LOG_FMT),
         print_missing=d["finished"],
+        cache=cache,
     )
 
     # check if metrics passed
     d["metrics_errors"], d["metrics_warnings"] = parse_messages(
-        METRICS_CHECK_FMT.format(report_dir), print_missing=d["finished"]
+        METRICS_CHECK_FMT.format(report_dir),
+        print_missing=d["finished"],
+        cache=cache,
     )
 
     # check if calibre was run and if drc check passed
     d["calibre_errors"], d["calibre_warnings"] = parse_messages(
-        os.path.join(log_dir, "calibre/save-to-drc-db.log"), print_missing=False
+        os.path.join(log_dir, "calibre/save-to-drc-db.log"),
+        print_missing=False,
+        cache=cache,
     )
 
     # check if there were drc violations
@@ -320,17 +369,90 @@ for log_dir, dirs, files in sorted(os.walk(LOGS_FOLDER, topdown=False)):
         else:
             d["status"] = STATUS_GREEN
 
-    design_list[f"{platform} {design} ({variant})"] = d
+    return d
 
-if not os.path.isdir(REPORTS_FOLDER):
-    os.mkdir(REPORTS_FOLDER)
 
-if args.summary:
-    write_summary()
-else:
-    if os.path.isfile(SINGLE_REPORT_FILENAME):
-        if not args.quiet:
-            print(f"Overwriting report {SINGLE_REPORT_FILENAME}.")
-        os.remove(SINGLE_REPORT_FILENAME)
-    for name_, data_ in design_list.items():
-        write_report(data_["output_file"], gen_report(name_, data_))
+def load_scan_cache():
+    try:
+        with open(SCAN_CACHE_FILENAME, "r") as file:
+            return json.load(file)
+    except (IOError, ValueError):
+        return dict()
+
+
+def save_scan_cache(cache):
+    tmp = f"{SCAN_CACHE_FILENAME}.tmp"
+    with open(tmp, "w") as file:
+        json.dump(cache, file)
+    os.replace(tmp, SCAN_CACHE_FILENAME)
+
+
+def find_designs():
+    """Returns the (name, log dir, log files) of the designs in the logs."""
+    designs = list()
+    for log_dir, dirs, files in sorted(os.walk(LOGS_FOLDER, topdown=False)):
+        dir_list = log_dir.split(os.sep)
+        # Handles autotuner folders, which do not have `report.log` natively.
+        # TODO: Can we log something for autotuner?
+        if len(dir_list) != 4 or any(
+            word in dir_list[-1] for word in SKIPPED_FLOW_VARIANT_KEYWORDS
+        ):
+            continue
+        # basic info about current design
+        platform, design, variant = dir_list[1:]
+        designs.append((f"{platform} {design} ({variant})", log_dir, files))
+    return designs
+
+
+def scan_designs(designs, jobs, cache=None):
+    """
+    Scan the designs in parallel, returns the data of each design by name and
+    the updated scan cache, or None without a cache.
+    """
+    design_list = dict()
+    new_cache = None if cache is None else dict()
+    with ProcessPoolExecutor(max_workers=max(1, jobs)) as executor:
+        futures = list()
+        for name, log_dir, files in designs:
+            # only hand each worker the cache entries of its own design
+            report_dir = log_dir.replace(LOGS_FOLDER, REPORTS_FOLDER)
+            design_cache = None
+            if cache is not None:
+                design_cache = {
+                    k: v
+                    for k, v in cache.items()
+                    if k.startswith(log_dir + os.sep)
+                    or k.startswith(report_dir + os.sep)
+                }
+            futures.append(executor.submit(scan_design, log_dir, files, design_cache))
+        for (name, _, _), future in zip(designs, futures):
+            d, design_cache, output = future.result()
+            print(output, end="")
+            if design_cache is not None:
+                new_cache.update(design_cache)
+            design_list[name] = d
+    return design_list, new_cache
+
+
+if __name__ == "__main__":
+    os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    args = parser.parse_args()
+
+    cache = load_scan_cache() if args.cache else None
+    design_list, new_cache = scan_designs(find_designs(), args.jobs, cache)
+
+    if not os.path.isdir(REPORTS_FOLDER):
+        os.mkdir(REPORTS_FOLDER)
+
+    if cache is not None:
+        save_scan_cache(new_cache)
+
+    if args.summary:
+        write_summary()
+    else:
+        if os.path.isfile(SINGLE_REPORT_FILENAME):
+            if not args.quiet:
+                print(f"Overwriting report {SINGLE_REPORT_FILENAME}.")
+            os.remove(SINGLE_REPORT_FILENAME)
+        for name_, data_ in design_list.items():
+            write_report(data_["output_file"], gen_report(name_, data_))
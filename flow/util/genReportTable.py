@@ -7,10 +7,10 @@ import json
 import operator
 from collections import defaultdict
 
-# make sure the working dir is flow/
-os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import numpy as np
 
 htmlOutput = "reports/report-table.html"
+jsonOutput = "reports/report-table.json"
 cssOutput = "reports/table.css"
 designPathFile = "design-dir.txt"
 
@@ -41,38 +41,61 @@ __tns
     re.VERBOSE | re.IGNORECASE,
 )
 
+# Cell styles, stored as indices into this list in the JSON data
+STYLES = ["no_change", "green", "orange", "red"]
+NO_CHANGE, GREEN, ORANGE, RED = range(len(STYLES))
+
 
 helpText = """
 Creates a HTML table with metric comparison between golden and current run
-for each design.
+for each design. By default the comparison is embedded in the HTML page as
+JSON data, also written to reports/report-table.json, and rendered by the
+page in the browser.
 """
-parser = argparse.ArgumentParser(description=helpText)
-parser.add_argument("--variant", default="base")
-args = parser.parse_args()
 
-goldFilename = f"metadata-{args.variant}-ok.json"
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description=helpText)
+    parser.add_argument("--variant", default="base")
+    parser.add_argument(
+        "--static",
+        action="store_true",
+        help="Write the whole comparison table into the HTML page",
+    )
+    return parser.parse_args()
+
+
 runFilename = f"metadata.json"
 
 
-def readMetrics(fname, justLoad=False):
-    global tableDict
+def readMetrics(fname):
     try:
         with open(fname, "r") as f:
-            tempDict = json.loads(f.read())
+            return json.loads(f.read())
     except BaseException:
         print("Failed to open {}.".format(fname))
         return None
-    if justLoad:
-        return tempDict
-    metrics = dict()
-    for metric, value in tempDict.items():
-        if not re.search(dontUse, metric):
-            metrics[metric] = value
-        else:
-            continue
-        if metric not in tableDict.keys():
-            tableDict[metric] = list()
-    return metrics
+
+
+class MetricClasses:
+    """
+    Classification of metric keys, computed once per distinct key instead of
+    once per metric per design.
+    """
+
+    def __init__(self):
+        self.used = dict()
+        self.higher = dict()
+
+    def isUsed(self, metric):
+        if metric not in self.used:
+            self.used[metric] = not re.search(dontUse, metric)
+        return self.used[metric]
+
+    def isHigherBetter(self, metric):
+        if metric not in self.higher:
+            self.higher[metric] = bool(re.search(higherIsBetter, metric))
+        return self.higher[metric]
 
 
 ops = {
@@ -85,119 +108,157 @@ ops = {
 }
 
 
-def getDiff(metric, gold, run, rules):
-    diff = "-"
-    style = "no_change"
-    if isNumber:
-        diff = run - gold
-        if gold != 0:
-            percentage = "{:.2f}%".format(abs(diff / gold) * 100)
-        else:
-            percentage = "#DIV/0!"
-        if run > gold:
-            style = "green" if re.search(higherIsBetter, metric) else "orange"
-        elif gold > run:
-            style = "orange" if re.search(higherIsBetter, metric) else "green"
-        for field, rule in rules.items():
-            if metric != field:
-                continue
-            op = ops[rule["compare"]]
-            value = rule["value"]
-            if not op(run, value):
-                style = "red"
-        if diff != 0:
-            if abs(diff) < 0.01:
-                diff = "{:+.2} ({})".format(diff, percentage)
-            else:
-                diff = "{:+.2f} ({})".format(diff, percentage)
-    return diff, style
-
+def toFloat(value):
+    try:
+        return float(value)
+    except BaseException:
+        return np.nan
 
-tableDict = dict()
-testList = list()
-status = dict()
 
-for logDir, dirs, files in sorted(os.walk("logs", topdown=False)):
-    dirList = logDir.split(os.sep)
-    if len(dirList) != 4:
-        continue
+def formatDiff(diff, gold):
+    if gold != 0:
+        percentage = "{:.2f}%".format(abs(diff / gold) * 100)
+    else:
+        percentage = "#DIV/0!"
+    if abs(diff) < 0.01:
+        return "{:+.2} ({})".format(diff, percentage)
+    return "{:+.2f} ({})".format(diff, percentage)
+
+
+class MetricsFrame:
+    """
+    Gold and current values of every metric (rows) for every test (columns).
+    Numeric values are held in float matrices so that differences and styles
+    are computed for the whole table at once.
+    """
+
+    def __init__(self, tests, metrics, golds, runs, rules, classes):
+        self.tests = tests
+        self.metrics = metrics
+        shape = (len(metrics), len(tests))
+        self.gold = np.empty(shape, dtype=object)
+        self.run = np.empty(shape, dtype=object)
+        for col, (gold, run) in enumerate(zip(golds, runs)):
+            for i, metric in enumerate(metrics):
+                self.gold[i, col] = self._value(gold, metric)
+                self.run[i, col] = self._value(run, metric)
+
+        goldNum = np.vectorize(toFloat, otypes=[float])(self.gold)
+        runNum = np.vectorize(toFloat, otypes=[float])(self.run)
+        self.isNumber = ~np.isnan(goldNum) & ~np.isnan(runNum)
+        # Numeric cells show the parsed values
+        self.gold[self.isNumber] = goldNum[self.isNumber]
+        self.run[self.isNumber] = runNum[self.isNumber]
+
+        higher = np.array(
+            [classes.isHigherBetter(m) for m in metrics], dtype=bool
+        ).reshape(-1, 1)
+        with np.errstate(invalid="ignore"):
+            self.diff = np.where(self.isNumber, runNum - goldNum, 0.0)
+            increased = self.isNumber & (runNum > goldNum)
+            decreased = self.isNumber & (goldNum > runNum)
+        self.style = np.full(shape, NO_CHANGE, dtype=np.int8)
+        self.style[(increased & higher) | (decreased & ~higher)] = GREEN
+        self.style[(increased & ~higher) | (decreased & higher)] = ORANGE
+
+        row = {metric: i for i, metric in enumerate(metrics)}
+        for col, testRules in enumerate(rules):
+            for field, rule in (testRules or {}).items():
+                i = row.get(field)
+                if i is None or not self.isNumber[i, col]:
+                    continue
+                if not ops[rule["compare"]](runNum[i, col], rule["value"]):
+                    self.style[i, col] = RED
+
+        self.diffText = np.full(shape, "-", dtype=object)
+        self.diffText[self.isNumber] = 0.0
+        for i, col in zip(*np.nonzero(self.isNumber & (self.diff != 0))):
+            self.diffText[i, col] = formatDiff(self.diff[i, col], goldNum[i, col])
+
+    @staticmethod
+    def _value(values, metric):
+        if values is None:
+            return "ERR"
+        return values.get(metric, "N/A")
+
+    def styleCounts(self, col):
+        counts = np.bincount(self.style[:, col], minlength=len(STYLES))
+        return {style: int(count) for style, count in zip(STYLES, counts)}
+
+
+def readTests(variant, classes):
+    """
+    Returns the tests of the logs folder with their gold and current metrics,
+    rules and number of parsing errors, and the metric names in order.
+    """
+    goldFilename = f"metadata-{variant}-ok.json"
+    testList = list()
+    golds = list()
+    runs = list()
+    rules = list()
+    errorList = list()
+    metricList = dict()
+
+    for logDir, dirs, files in sorted(os.walk("logs", topdown=False)):
+        dirList = logDir.split(os.sep)
+        if len(dirList) != 4:
+            continue
 
-    # basic info about test design
-    platform = dirList[1]
-    design = dirList[2]
-    variant = dirList[3]
-    test = "{} {} {}".format(platform, design, variant)
-    reportDir = logDir.replace("logs", "reports")
-    errors = 0
+        # basic info about test design
+        platform = dirList[1]
+        design = dirList[2]
+        variant = dirList[3]
+        test = "{} {} {}".format(platform, design, variant)
+        reportDir = logDir.replace("logs", "reports")
+        errors = 0
 
-    print("-" * 79)
-    print(test)
-    print("-" * 79)
+        print("-" * 79)
+        print(test)
+        print("-" * 79)
 
-    try:
-        with open(os.path.join(reportDir, designPathFile), "r") as f:
-            designDir = f.read().strip()
-    except BaseException:
-        print("Failed to open {}.".format(designPathFile))
-        designDir = os.path.join("designs", platform, design)
-        errors += 1
-
-    gold = readMetrics(os.path.join(designDir, goldFilename))
-    if gold is None:
-        errors += 1
-        goldKeys = None
-    else:
-        goldKeys = gold.keys()
-
-    run = readMetrics(os.path.join(reportDir, runFilename))
-    if run is None:
-        errors += 1
-        runKeys = None
-    else:
-        runKeys = run.keys()
-
-    rulesFilename = f"rules-{variant}.json"
-    rules = readMetrics(os.path.join(designDir, rulesFilename), justLoad=True)
-    if rules is None:
-        errors += 1
-
-    testList.append(test)
-    if test not in status.keys():
-        status[test] = dict()
-        status[test]["error"] = errors
-        status[test]["red"] = 0
-        status[test]["orange"] = 0
-        status[test]["no_change"] = 0
-        status[test]["green"] = 0
-
-    for metric in tableDict.keys():
         try:
-            if metric in goldKeys:
-                goldValue = gold[metric]
-            else:
-                goldValue = "N/A"
+            with open(os.path.join(reportDir, designPathFile), "r") as f:
+                designDir = f.read().strip()
         except BaseException:
-            goldValue = "ERR"
-        try:
-            if metric in runKeys:
-                runValue = run[metric]
+            print("Failed to open {}.".format(designPathFile))
+            designDir = os.path.join("designs", platform, design)
+            errors += 1
+
+        metricsFiles = [
+            os.path.join(designDir, goldFilename),
+            os.path.join(reportDir, runFilename),
+        ]
+        for fname, values in zip(metricsFiles, [golds, runs]):
+            metrics = readMetrics(fname)
+            if metrics is None:
+                errors += 1
             else:
-                runValue = "N/A"
-        except BaseException:
-            runValue = "ERR"
-        try:
-            goldValue = float(goldValue)
-            runValue = float(runValue)
-            isNumber = True
-        except BaseException:
-            isNumber = False
-        tableDict[metric].append(goldValue)
-        tableDict[metric].append(runValue)
-        diff, style = getDiff(metric, goldValue, runValue, rules)
-        tableDict[metric].append([diff, style])
-        status[test][style] += 1
+                metrics = {k: v for k, v in metrics.items() if classes.isUsed(k)}
+                metricList.update(dict.fromkeys(metrics))
+            values.append(metrics)
+
+        rulesFilename = f"rules-{variant}.json"
+        testRules = readMetrics(os.path.join(designDir, rulesFilename))
+        if testRules is None:
+            errors += 1
+        rules.append(testRules)
+
+        testList.append(test)
+        errorList.append(errors)
+
+        print()
+
+    return testList, golds, runs, rules, errorList, list(metricList)
+
+
+def testStatus(frame, errorList):
+    """Returns the number of cells of each style and errors of each test."""
+    status = dict()
+    for col, test in enumerate(frame.tests):
+        status[test] = frame.styleCounts(col)
+        status[test]["error"] = errorList[col]
+    return status
 
-    print()
 
 cssStyle = """/* table styles */
 table {
@@ -295,9 +356,6 @@ div.desc {
 }
 """
 
-with open(cssOutput, "w") as f:
-    f.writelines(cssStyle)
-
 head = """<!DOCTYPE html>
 <html lang="en">
 
@@ -328,27 +386,22 @@ def add_image(path, platform, view):
 """
 
 
-platforms = set()
-designs = set()
-views = set()
-images = defaultdict(lambda: defaultdict(dict))
-for parents, dirs, files in sorted(os.walk("reports", topdown=False)):
-    for file in files:
-        if file.endswith(".webp"):
-            path = os.path.join(parents, file).replace("reports", ".")
-            platform, design = path.split(os.sep)[1:3]
-            view = file[:-5]
-            designs.add(design)
-            platforms.add(platform)
-            views.add(view)
-            images[design][platform][view] = path
+def findImages():
+    """Returns the images of the reports folder by design, platform and view."""
+    views = set()
+    images = defaultdict(lambda: defaultdict(dict))
+    for parents, dirs, files in sorted(os.walk("reports", topdown=False)):
+        for file in files:
+            if file.endswith(".webp"):
+                path = os.path.join(parents, file).replace("reports", ".")
+                platform, design = path.split(os.sep)[1:3]
+                view = file[:-5]
+                views.add(view)
+                images[design][platform][view] = path
+    return images, views
 
-platforms = sorted(platforms)
-designs = sorted(designs)
-view = sorted(views)
 
-
-def write_gallery(design, platforms, views):
+def write_gallery(images, design, platforms, views):
     htmlGallery = f"reports/report-gallery-{design}.html"
     with open(htmlGallery, "w") as f:
         gallery = "  <h1>Image Gallery</h1>\n"
@@ -370,14 +423,11 @@ def write_gallery(design, platforms, views):
         f.writelines(html)
 
 
-for design in designs:
-    write_gallery(design, platforms, views)
-
 subColumns = ["Gold", "Current", "Diff (%)"]
 
-table = ""
-with open(htmlOutput, "w") as f:
-    # Compute summary rows
+
+def summaryTable(status):
+    """Returns the HTML of the overview and summary table."""
     noChangeList = list()
     improvementList = list()
     degradationList = list()
@@ -415,141 +465,224 @@ with open(htmlOutput, "w") as f:
             designsMoreDegradations.append(test)
 
     # Summary table begin
-    table += "\n<h1>Metrics Overview</h1>\n"
-
-    txt = "Number of designs that failed parsing: "
-    txt += "{}\n".format(len(designsParsingErrors))
-    txt += "    {}\n".format(", ".join(designsParsingErrors))
-    table += "<pre>\n{}\n</pre>\n".format(txt.strip())
-
-    txt = "Number of designs failing metrics checks: "
-    txt += "{}\n".format(len(designsRed))
-    txt += "    {}\n".format(", ".join(designsRed))
-    table += "<pre>\n{}\n</pre>\n".format(txt.strip())
-
-    txt = "Number of designs with more improvements: "
-    txt += "{}\n".format(len(designsMoreImprovements))
-    txt += "    {}\n".format(", ".join(designsMoreImprovements))
-    table += "<pre>\n{}\n</pre>\n".format(txt.strip())
-
-    txt = "Number of designs with more degradations: "
-    txt += "{}\n".format(len(designsMoreDegradations))
-    txt += "    {}\n".format(", ".join(designsMoreDegradations))
-    table += "<pre>\n{}\n</pre>\n".format(txt.strip())
-
-    txt = "Number of designs with same number of degradations and improvements: "
-    txt += "{}\n".format(len(designsSameNumber))
-    txt += "    {}\n".format(", ".join(designsSameNumber))
-    table += "<pre>\n{}\n</pre>\n".format(txt.strip())
-
-    txt = "Number of designs with no change: "
-    txt += "{}\n".format(len(designsNoChange))
-    txt += "    {}\n".format(", ".join(designsNoChange))
-    table += "<pre>\n{}\n</pre>\n".format(txt.strip())
+    table = "\n<h1>Metrics Overview</h1>\n"
+
+    for txt, designList in [
+        ("Number of designs that failed parsing: ", designsParsingErrors),
+        ("Number of designs failing metrics checks: ", designsRed),
+        ("Number of designs with more improvements: ", designsMoreImprovements),
+        ("Number of designs with more degradations: ", designsMoreDegradations),
+        (
+            "Number of designs with same number of degradations and improvements: ",
+            designsSameNumber,
+        ),
+        ("Number of designs with no change: ", designsNoChange),
+    ]:
+        txt += "{}\n".format(len(designList))
+        txt += "    {}\n".format(", ".join(designList))
+        table += "<pre>\n{}\n</pre>\n".format(txt.strip())
 
     table += '\n<table class="summary-table">\n'
     # Summary header
     table += "  <tr>\n"
     table += "    <th>Summary</th>\n"
-    for test in testList + ["Total"]:
+    for test in list(status) + ["Total"]:
         table += "    <th>{}</th>\n".format(test)
     table += "  </tr>\n"
 
     # Summary rows
-
-    title = "Parsing Errors"
-    table += "  <tr>\n"
-    table += '    <td bgcolor="brown">{}</td>\n'.format(title)
-    for value in parsingErrorList:
-        table += '    <td title="{}">{}</td>\n'.format(title, value)
-    table += "    <td>{}</td>\n".format(sum(parsingErrorList))
-    table += "  </tr>\n"
-
-    title = "Failed Metrics"
-    table += "  <tr>\n"
-    table += '    <td bgcolor="red">{}</td>\n'.format(title)
-    for value in failedMetricsList:
-        table += '    <td title="{}">{}</td>\n'.format(title, value)
-    table += "    <td>{}</td>\n".format(sum(failedMetricsList))
-    table += "  </tr>\n"
-
-    title = "Degradation"
-    table += "  <tr>\n"
-    table += '    <td bgcolor="orange">{}</td>\n'.format(title)
-    for value in degradationList:
-        table += '    <td title="{}">{}</td>\n'.format(title, value)
-    table += "    <td>{}</td>\n".format(sum(degradationList))
-    table += "  </tr>\n"
-
-    title = "No Change"
-    table += "  <tr>\n"
-    table += "    <td>{}</td>\n".format(title)
-    for value in noChangeList:
-        table += '    <td title="{}">{}</td>\n'.format(title, value)
-    table += "    <td>{}</td>\n".format(sum(noChangeList))
-    table += "  </tr>\n"
-
-    title = "Improvement"
-    table += "  <tr>\n"
-    table += '    <td bgcolor="green">{}</td>\n'.format(title)
-    for value in improvementList:
-        table += '    <td title="{}">{}</td>\n'.format(title, value)
-    table += "    <td>{}</td>\n".format(sum(improvementList))
-    table += "  </tr>\n"
+    for title, color, valueList in [
+        ("Parsing Errors", "brown", parsingErrorList),
+        ("Failed Metrics", "red", failedMetricsList),
+        ("Degradation", "orange", degradationList),
+        ("No Change", None, noChangeList),
+        ("Improvement", "green", improvementList),
+    ]:
+        table += "  <tr>\n"
+        if color is None:
+            table += "    <td>{}</td>\n".format(title)
+        else:
+            table += '    <td bgcolor="{}">{}</td>\n'.format(color, title)
+        for value in valueList:
+            table += '    <td title="{}">{}</td>\n'.format(title, value)
+        table += "    <td>{}</td>\n".format(sum(valueList))
+        table += "  </tr>\n"
 
     table += "</table>\n"
+    return table
+
 
-    # Main table begin
-    table += "\n<h1>Metrics Comparison Per Design</h1>\n"
-    table += '<table class="main-table">\n'
+def writeStaticTable(f, frame):
+    """Stream the main comparison table to f, one metric row at a time."""
+    testList = frame.tests
+    f.write("\n<h1>Metrics Comparison Per Design</h1>\n")
+    f.write('<table class="main-table">\n')
     # Main table header
-    table += "  <tr>\n"
-    table += "    <th>Metric</th>\n"
+    header = "  <tr>\n"
+    header += "    <th>Metric</th>\n"
     for test in testList:
-        table += '    <th colspan="3">{}</th>\n'.format(test)
-    table += "  </tr>\n"
+        header += '    <th colspan="3">{}</th>\n'.format(test)
+    header += "  </tr>\n"
 
     # Main table header subdivision
-    table += "  <tr>\n"
-    table += "    <td>Name</td>\n"
+    header += "  <tr>\n"
+    header += "    <td>Name</td>\n"
     for _ in testList:
         for col in subColumns:
-            table += "    <td>{}</td>\n".format(col)
-    table += "  </tr>\n"
+            header += "    <td>{}</td>\n".format(col)
+    header += "  </tr>\n"
+    f.write(header)
 
     # Main table rows
-    for metric, entry in tableDict.items():
-        table += "  <tr>\n"
-        table += "    <td>{}</td>\n".format(metric)
+    for i, metric in enumerate(frame.metrics):
+        row = ["  <tr>\n", "    <td>{}</td>\n".format(metric)]
         title = 'title="{}"'.format(metric)
 
-        for num in range(0, len(entry), len(subColumns)):
-            goldValue = "{}".format(entry[num])
-            props = title
-            if goldValue == "N/A":
-                props += "bgcolor=yellow"
-            elif goldValue == "ERR":
-                props += "bgcolor=brown"
-            table += "    <td {}>{}</td>\n".format(props, goldValue)
-
-            runValue = "{}".format(entry[num + 1])
-            props = title
-            if runValue == "N/A":
-                props += "bgcolor=yellow"
-            elif runValue == "ERR":
-                props += "bgcolor=brown"
-            table += "    <td {}>{}</td>\n".format(props, runValue)
-
-            diffValue, style = entry[num + 2]
-            props = title
+        for col in range(len(testList)):
+            for value in [frame.gold[i, col], frame.run[i, col]]:
+                value = "{}".format(value)
+                props = title
+                if value == "N/A":
+                    props += "bgcolor=yellow"
+                elif value == "ERR":
+                    props += "bgcolor=brown"
+                row.append("    <td {}>{}</td>\n".format(props, value))
+
+            style = STYLES[frame.style[i, col]]
             if style == "no_change":
                 style = ""
-            props = '{} bgcolor="{}"'.format(props, style)
-            table += "    <td {}>{}</td>\n".format(props, diffValue)
+            props = '{} bgcolor="{}"'.format(title, style)
+            row.append("    <td {}>{}</td>\n".format(props, frame.diffText[i, col]))
+
+        row.append("  </tr>\n")
+        f.write("".join(row))
+
+    f.write("</table>\n\n")
+
+
+def writeJson(f, variant, frame):
+    """
+    Stream the comparison to f as compact JSON. Each metric is one row
+    [name, gold values, current values, diffs, style indices] on its own line.
+    """
+    f.write("{\n")
+    f.write('"variant": {},\n'.format(json.dumps(variant)))
+    f.write('"styles": {},\n'.format(json.dumps(STYLES)))
+    f.write('"tests": {},\n'.format(json.dumps(frame.tests)))
+    f.write('"rows": [')
+    for i, metric in enumerate(frame.metrics):
+        row = [
+            metric,
+            frame.gold[i].tolist(),
+            frame.run[i].tolist(),
+            [str(d) for d in frame.diffText[i]],
+            frame.style[i].tolist(),
+        ]
+        f.write(",\n" if i else "\n")
+        f.write(json.dumps(row, separators=(",", ":"), default=str))
+    f.write("\n]\n}\n")
+
+
+class ScriptWriter:
+    """
+    Escapes the JSON written into a <script> element of the page, where
+    "</script>" or "<!--" in a metric would end or break the element. "<"
+    only appears in JSON strings, where it can be escaped as \\u003c.
+    """
+
+    def __init__(self, f):
+        self.f = f
+
+    def write(self, text):
+        self.f.write(text.replace("<", "\\u003c"))
+
+
+clientTable = """
+<h1>Metrics Comparison Per Design</h1>
+<p>
+Metric <input id="metric-filter" placeholder="regex">
+Design <input id="test-filter" placeholder="regex">
+<label><input id="changed-filter" type="checkbox"> Only changed</label>
+</p>
+<div id="main-table">Loading...</div>
+<script>
+const bgcolor = {"N/A": "yellow", "ERR": "brown"};
+const colors = {"no_change": "", "green": "green", "orange": "orange", "red": "red"};
+let data = null;
+
+function escape(text) {
+  return String(text).replace(/&/g, "&amp;").replace(/</g, "&lt;")
+    .replace(/>/g, "&gt;").replace(/"/g, "&quot;");
+}
 
-        table += "  </tr>\n"
+function regex(id) {
+  try {
+    return new RegExp(document.getElementById(id).value, "i");
+  } catch (e) {
+    return /(?:)/;
+  }
+}
+
+function render() {
+  const metricRe = regex("metric-filter");
+  const testRe = regex("test-filter");
+  const changed = document.getElementById("changed-filter").checked;
+  const cols = data.tests.map((t, i) => i).filter(i => testRe.test(data.tests[i]));
+  const html = ['<table class="main-table"><tr><th>Metric</th>'];
+  for (const i of cols) {
+    html.push('<th colspan="3">' + escape(data.tests[i]) + "</th>");
+  }
+  html.push("</tr><tr><td>Name</td>");
+  html.push("<td>Gold</td><td>Current</td><td>Diff (%)</td>".repeat(cols.length));
+  html.push("</tr>");
+  for (const [metric, gold, run, diff, style] of data.rows) {
+    if (!metricRe.test(metric)) continue;
+    if (changed && !cols.some(i => style[i] != 0)) continue;
+    const title = ' title="' + escape(metric) + '"';
+    html.push("<tr><td>" + escape(metric) + "</td>");
+    for (const i of cols) {
+      for (const value of [gold[i], run[i]]) {
+        const color = bgcolor[value] ? ' bgcolor="' + bgcolor[value] + '"' : "";
+        html.push("<td" + title + color + ">" + escape(value) + "</td>");
+      }
+      const color = colors[data.styles[style[i]]];
+      html.push("<td" + title + ' bgcolor="' + color + '">' + escape(diff[i]) + "</td>");
+    }
+    html.push("</tr>");
+  }
+  html.push("</table>");
+  document.getElementById("main-table").innerHTML = html.join("");
+}
 
-    table += "</table>\n\n"
+// Embedded in the page so that it also opens from file://
+data = JSON.parse(document.getElementById("report-data").textContent);
+for (const id of ["metric-filter", "test-filter", "changed-filter"]) {
+  document.getElementById(id).addEventListener("input", render);
+}
+render();
+</script>
+"""
+
+
+def main():
+    args = parseArgs()
+    # make sure the working dir is flow/
+    os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+    classes = MetricClasses()
+    testList, golds, runs, rules, errorList, metricList = readTests(
+        args.variant, classes
+    )
+    frame = MetricsFrame(testList, metricList, golds, runs, rules, classes)
+    status = testStatus(frame, errorList)
+
+    with open(cssOutput, "w") as f:
+        f.writelines(cssStyle)
+
+    images, views = findImages()
+    platforms = sorted({p for design in images.values() for p in design})
+    for design in sorted(images):
+        write_gallery(images, design, platforms, views)
 
     fname = "reports/report.log"
     content = ""
@@ -559,5 +692,21 @@ with open(htmlOutput, "w") as f:
         content = "<pre>\n" + content + "\n</pre>\n"
         content = "<h1>Flow Finish State and Log Summary</h1>\n" + content
 
-    html = head + table + content + tail
-    f.writelines(html)
+    if not args.static:
+        with open(jsonOutput, "w") as f:
+            writeJson(f, args.variant, frame)
+
+    with open(htmlOutput, "w") as f:
+        f.write(head + summaryTable(status))
+        if args.static:
+            writeStaticTable(f, frame)
+        else:
+            f.write('<script type="application/json" id="report-data">\n')
+            writeJson(ScriptWriter(f), args.variant, frame)
+            f.write("</script>\n")
+            f.write(clientTable)
+        f.write(content + tail)
+
+
+if __name__ == "__main__":
+    main()
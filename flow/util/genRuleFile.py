@@ -1,246 +1,282 @@
 #!/usr/bin/env python3
 
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from glob import glob
 from math import ceil, isinf
 from os import chdir, getcwd
 from os.path import isfile
 from re import sub
 import argparse
+import contextlib
 import fnmatch
+import io
 import json
 import operator
 import os
+import re
 import sys
 
 
-def gen_rule_file(
-    rules_file,
-    new_rules_file,
-    update,
-    tighten,
-    failing,
-    variant,
-    metrics_file=None,
-    metrics_to_consider=[],
-):
-    with open(metrics_file, "r") as f:
-        metrics = json.load(f)
-    if not isinstance(metrics, dict):
-        print(f"[ERROR] Invalid format for reference metrics {metrics_file}")
-        sys.exit(1)
+class RuleError(Exception):
+    pass
+
+
+# Notes
+# - Apply tighter margin on timing__setup__ws than timing__setup__tns
+#   because WNS is more important than TNS.
+# - Apply the consistent margins on timing__setup__* and timing__hold__*
+# - 'period_padding' mode is used for timing__setup__* and timing__hold__*
+#   to give small margin based on clock period to avoid failures by small
+#   violations.
+
+# dict format
+# 'metric_name': {
+#     'mode': <str>, one of ['direct', 'sum_fixed', 'period', 'padding',
+#                           'period_padding', 'abs_padding', 'metric']
+#     'padding': <float>, percentage of padding to use
+#     'fixed': <float>, sum this number instead of using % padding
+#     'round_value': <bool>, use the rounded value for the rule
+#     'compare': <str>, one of ['<', '>', '<=', '>=', '==', '!=']
+#     'metric': <str>, when mode is 'metric', use this metric to compute
+#                     the rule value
+#     'min_max': <function>, one of [min, max], optional
+#     'min_max_direct': <float>, optional
+#     'min_max_sum': <float>, optional
+#     'min_max_period': <float>, optional
+#     'level': <bool>, severity level. ['warning' or
+#                                        others (means ERROR, default) ]
+# }
+
+RULES_DICT = {
+    # all stages
+    "*flow__warnings__count:*": {
+        "mode": "direct",
+        "round_value": True,
+        "compare": "<=",
+        "level": "warning",
+    },
+    # synth
+    "synth__design__instance__area__stdcell": {
+        "mode": "padding",
+        "padding": 15,
+        "round_value": False,
+        "compare": "<=",
+    },
+    # clock
+    "constraints__clocks__count": {
+        "mode": "direct",
+        "round_value": True,
+        "compare": "==",
+    },
+    # place
+    "placeopt__design__instance__area": {
+        "mode": "padding",
+        "padding": 15,
+        "round_value": True,
+        "compare": "<=",
+    },
+    "placeopt__design__instance__count__stdcell": {
+        "mode": "padding",
+        "padding": 15,
+        "round_value": True,
+        "compare": "<=",
+    },
+    "detailedplace__design__violations": {
+        "mode": "direct",
+        "round_value": True,
+        "compare": "==",
+    },
+    # cts
+    "cts__design__instance__count__setup_buffer": {
+        "mode": "metric",
+        "padding": 10,
+        "metric": "placeopt__design__instance__count__stdcell",
+        "round_value": True,
+        "compare": "<=",
+    },
+    "cts__design__instance__count__hold_buffer": {
+        "mode": "metric",
+        "padding": 10,
+        "metric": "placeopt__design__instance__count__stdcell",
+        "round_value": True,
+        "compare": "<=",
+    },
+    "cts__timing__setup__ws": {
+        "mode": "period_padding",
+        "padding": 5,
+        "round_value": False,
+        "compare": ">=",
+    },
+    "cts__timing__setup__tns": {
+        "mode": "period_padding",
+        "padding": 20,
+        "round_value": False,
+        "compare": ">=",
+    },
+    "cts__timing__hold__ws": {
+        "mode": "period_padding",
+        "padding": 5,
+        "round_value": False,
+        "compare": ">=",
+    },
+    "cts__timing__hold__tns": {
+        "mode": "period_padding",
+        "padding": 20,
+        "round_value": False,
+        "compare": ">=",
+    },
+    # route
+    "globalroute__antenna_diodes_count": {
+        "mode": "metric",
+        "padding": 0.1,
+        "metric": "globalroute__route__net",
+        "min_max": max,
+        "min_max_direct": 100,
+        "round_value": True,
+        "compare": "<=",
+    },
+    "globalroute__timing__setup__ws": {
+        "mode": "period_padding",
+        "padding": 5,
+        "round_value": False,
+        "compare": ">=",
+    },
+    "globalroute__timing__setup__tns": {
+        "mode": "period_padding",
+        "padding": 20,
+        "round_value": False,
+        "compare": ">=",
+    },
+    "globalroute__timing__hold__ws": {
+        "mode": "period_padding",
+        "padding": 5,
+        "round_value": False,
+        "compare": ">=",
+    },
+    "globalroute__timing__hold__tns": {
+        "mode": "period_padding",
+        "padding": 20,
+        "round_value": False,
+        "compare": ">=",
+    },
+    "detailedroute__route__wirelength": {
+        "mode": "padding",
+        "padding": 15,
+        "round_value": True,
+        "compare": "<=",
+    },
+    "detailedroute__route__drc_errors": {
+        "mode": "direct",
+        "round_value": True,
+        "compare": "<=",
+    },
+    "detailedroute__antenna__violating__nets": {
+        "mode": "padding",
+        "padding": 30,
+        "round_value": True,
+        "compare": "<=",
+    },
+    "detailedroute__antenna_diodes_count": {
+        "mode": "metric",
+        "padding": 0.1,
+        "metric": "detailedroute__route__net",
+        "min_max": max,
+        "min_max_direct": 100,
+        "round_value": True,
+        "compare": "<=",
+    },
+    # finish
+    "finish__timing__setup__ws": {
+        "mode": "period_padding",
+        "padding": 5,
+        "round_value": False,
+        "compare": ">=",
+    },
+    "finish__timing__setup__tns": {
+        "mode": "period_padding",
+        "padding": 20,
+        "round_value": False,
+        "compare": ">=",
+    },
+    "finish__timing__hold__ws": {
+        "mode": "period_padding",
+        "padding": 5,
+        "round_value": False,
+        "compare": ">=",
+    },
+    "finish__timing__hold__tns": {
+        "mode": "period_padding",
+        "padding": 20,
+        "round_value": False,
+        "compare": ">=",
+    },
+    "finish__design__instance__area": {
+        "mode": "padding",
+        "padding": 15,
+        "round_value": True,
+        "compare": "<=",
+    },
+}
+
+ops = {
+    "<": operator.lt,
+    ">": operator.gt,
+    "<=": operator.le,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+
+# Compiled wildcard patterns of RULES_DICT
+_PATTERNS = {
+    pattern: re.compile(fnmatch.translate(pattern))
+    for pattern in RULES_DICT
+    if "*" in pattern
+}
+
+FORMAT_STR = "| {:45} | {:8} | {:8} | {:8} |\n"
+
+
+@lru_cache(maxsize=None)
+def match_rules(metric_keys):
+    """
+    Returns the (field, option) pairs of the rules that apply to a metrics
+    schema, given as a sorted tuple of metric keys. Each field is matched by
+    the first pattern of RULES_DICT that covers it. Designs sharing a schema
+    share the result.
+    """
+    matched = list()
+    processed_fields = set()
+    for pattern, option in RULES_DICT.items():
+        matching_fields = []
+        # Find all metric fields that match this pattern.
+        if pattern in _PATTERNS:
+            regex = _PATTERNS[pattern]
+            for metric_field in metric_keys:
+                if regex.match(metric_field) and metric_field not in processed_fields:
+                    matching_fields.append(metric_field)
+        elif pattern in metric_keys and pattern not in processed_fields:
+            matching_fields.append(pattern)
 
-    rules = dict()
-    if isfile(rules_file):
-        with open(rules_file, "r") as f:
-            OLD_RULES = json.load(f)
-    else:
-        print(f"[WARNING] No old rules file found {rules_file}")
-        OLD_RULES = None
+        for field in matching_fields:
+            # Replace ':' with '__' as the dashboard DB does not accept
+            # ':' in # field names.
+            if ":" in field:
+                field = field.replace(":", "__")
+            processed_fields.add(field)
+            matched.append((field, option))
+    return tuple(matched)
 
-    # Notes
-    # - Apply tighter margin on timing__setup__ws than timing__setup__tns
-    #   because WNS is more important than TNS.
-    # - Apply the consistent margins on timing__setup__* and timing__hold__*
-    # - 'period_padding' mode is used for timing__setup__* and timing__hold__*
-    #   to give small margin based on clock period to avoid failures by small
-    #   violations.
-
-    # dict format
-    # 'metric_name': {
-    #     'mode': <str>, one of ['direct', 'sum_fixed', 'period', 'padding',
-    #                           'period_padding', 'abs_padding', 'metric']
-    #     'padding': <float>, percentage of padding to use
-    #     'fixed': <float>, sum this number instead of using % padding
-    #     'round_value': <bool>, use the rounded value for the rule
-    #     'compare': <str>, one of ['<', '>', '<=', '>=', '==', '!=']
-    #     'metric': <str>, when mode is 'metric', use this metric to compute
-    #                     the rule value
-    #     'min_max': <function>, one of [min, max], optional
-    #     'min_max_direct': <float>, optional
-    #     'min_max_sum': <float>, optional
-    #     'min_max_period': <float>, optional
-    #     'level': <bool>, severity level. ['warning' or
-    #                                        others (means ERROR, default) ]
-    # }
-
-    rules_dict = {
-        # all stages
-        "*flow__warnings__count:*": {
-            "mode": "direct",
-            "round_value": True,
-            "compare": "<=",
-            "level": "warning",
-        },
-        # synth
-        "synth__design__instance__area__stdcell": {
-            "mode": "padding",
-            "padding": 15,
-            "round_value": False,
-            "compare": "<=",
-        },
-        # clock
-        "constraints__clocks__count": {
-            "mode": "direct",
-            "round_value": True,
-            "compare": "==",
-        },
-        # place
-        "placeopt__design__instance__area": {
-            "mode": "padding",
-            "padding": 15,
-            "round_value": True,
-            "compare": "<=",
-        },
-        "placeopt__design__instance__count__stdcell": {
-            "mode": "padding",
-            "padding": 15,
-            "round_value": True,
-            "compare": "<=",
-        },
-        "detailedplace__design__violations": {
-            "mode": "direct",
-            "round_value": True,
-            "compare": "==",
-        },
-        # cts
-        "cts__design__instance__count__setup_buffer": {
-            "mode": "metric",
-            "padding": 10,
-            "metric": "placeopt__design__instance__count__stdcell",
-            "round_value": True,
-            "compare": "<=",
-        },
-        "cts__design__instance__count__hold_buffer": {
-            "mode": "metric",
-            "padding": 10,
-            "metric": "placeopt__design__instance__count__stdcell",
-            "round_value": True,
-            "compare": "<=",
-        },
-        "cts__timing__setup__ws": {
-            "mode": "period_padding",
-            "padding": 5,
-            "round_value": False,
-            "compare": ">=",
-        },
-        "cts__timing__setup__tns": {
-            "mode": "period_padding",
-            "padding": 20,
-            "round_value": False,
-            "compare": ">=",
-        },
-        "cts__timing__hold__ws": {
-            "mode": "period_padding",
-            "padding": 5,
-            "round_value": False,
-            "compare": ">=",
-        },
-        "cts__timing__hold__tns": {
-            "mode": "period_padding",
-            "padding": 20,
-            "round_value": False,
-            "compare": ">=",
-        },
-        # route
-        "globalroute__antenna_diodes_count": {
-            "mode": "metric",
-            "padding": 0.1,
-            "metric": "globalroute__route__net",
-            "min_max": max,
-            "min_max_direct": 100,
-            "round_value": True,
-            "compare": "<=",
-        },
-        "globalroute__timing__setup__ws": {
-            "mode": "period_padding",
-            "padding": 5,
-            "round_value": False,
-            "compare": ">=",
-        },
-        "globalroute__timing__setup__tns": {
-            "mode": "period_padding",
-            "padding": 20,
-            "round_value": False,
-            "compare": ">=",
-        },
-        "globalroute__timing__hold__ws": {
-            "mode": "period_padding",
-            "padding": 5,
-            "round_value": False,
-            "compare": ">=",
-        },
-        "globalroute__timing__hold__tns": {
-            "mode": "period_padding",
-            "padding": 20,
-            "round_value": False,
-            "compare": ">=",
-        },
-        "detailedroute__route__wirelength": {
-            "mode": "padding",
-            "padding": 15,
-            "round_value": True,
-            "compare": "<=",
-        },
-        "detailedroute__route__drc_errors": {
-            "mode": "direct",
-            "round_value": True,
-            "compare": "<=",
-        },
-        "detailedroute__antenna__violating__nets": {
-            "mode": "padding",
-            "padding": 30,
-            "round_value": True,
-            "compare": "<=",
-        },
-        "detailedroute__antenna_diodes_count": {
-            "mode": "metric",
-            "padding": 0.1,
-            "metric": "detailedroute__route__net",
-            "min_max": max,
-            "min_max_direct": 100,
-            "round_value": True,
-            "compare": "<=",
-        },
-        # finish
-        "finish__timing__setup__ws": {
-            "mode": "period_padding",
-            "padding": 5,
-            "round_value": False,
-            "compare": ">=",
-        },
-        "finish__timing__setup__tns": {
-            "mode": "period_padding",
-            "padding": 20,
-            "round_value": False,
-            "compare": ">=",
-        },
-        "finish__timing__hold__ws": {
-            "mode": "period_padding",
-            "padding": 5,
-            "round_value": False,
-            "compare": ">=",
-        },
-        "finish__timing__hold__tns": {
-            "mode": "period_padding",
-            "padding": 20,
-            "round_value": False,
-            "compare": ">=",
-        },
-        "finish__design__instance__area": {
-            "mode": "padding",
-            "padding": 15,
-            "round_value": True,
-            "compare": "<=",
-        },
-    }
-
-    ops = {
-        "<": operator.lt,
-        ">": operator.gt,
-        "<=": operator.le,
-        ">=": operator.ge,
-        "==": operator.eq,
-        "!=": operator.ne,
-    }
+
+def compute_rules(metrics, OLD_RULES, update, tighten, failing, metrics_to_consider=[]):
+    """
+    Compute the rules for a design from its reference metrics and old
+    rules. Returns the rules and the list of changes as
+    (field, old value, new value, type) tuples.
+    """
+    rules = dict()
 
     period_list = metrics.get("constraints__clocks__details")
 
@@ -256,162 +292,269 @@ def gen_rule_file(
             "[WARNING] 'constraints__clocks__details' not found or is empty in metrics. Clock-related rules might be affected."
         )
 
-    format_str = "| {:45} | {:8} | {:8} | {:8} |\n"
-    change_str = ""
+    changes = list()
 
-    processed_fields = set()
-    for pattern, option in rules_dict.items():
-        matching_fields = []
-        # Find all metric fields that match this pattern.
-        if "*" in pattern:
-            for metric_field in sorted(metrics.keys()):
-                if (
-                    fnmatch.fnmatch(metric_field, pattern)
-                    and metric_field not in processed_fields
-                ):
-                    matching_fields.append(metric_field)
-        elif pattern in metrics and pattern not in processed_fields:
-            matching_fields.append(pattern)
+    for field, option in match_rules(tuple(sorted(metrics.keys()))):
+        if isinstance(metrics[field], str):
+            print(f"[WARNING] Skipping string field {field} = {metrics[field]}")
+            continue
 
-        for field in matching_fields:
-            # Replace ':' with '__' as the dashboard DB does not accept
-            # ':' in # field names.
-            if ":" in field:
-                field = field.replace(":", "__")
-            processed_fields.add(field)
-            if isinstance(metrics[field], str):
-                print(f"[WARNING] Skipping string field {field} = {metrics[field]}")
-                continue
+        if len(period_list or []) != 1 and field == "globalroute__timing__clock__slack":
+            print("[WARNING] Skipping clock slack until multiple clocks support.")
+            continue
 
-            if len(period_list) != 1 and field == "globalroute__timing__clock__slack":
-                print("[WARNING] Skipping clock slack until multiple clocks support.")
-                continue
+        rule_value = None
+        if option["mode"] == "direct":
+            rule_value = metrics[field]
 
-            rule_value = None
-            if option["mode"] == "direct":
-                rule_value = metrics[field]
+        elif option["mode"] == "sum_fixed":
+            rule_value = metrics[field] + option["padding"]
 
-            elif option["mode"] == "sum_fixed":
-                rule_value = metrics[field] + option["padding"]
+        elif option["mode"] == "period":
+            rule_value = metrics[field] - period * option["padding"] / 100
+            rule_value = min(rule_value, 0)
 
-            elif option["mode"] == "period":
-                rule_value = metrics[field] - period * option["padding"] / 100
-                rule_value = min(rule_value, 0)
+        elif option["mode"] == "padding":
+            rule_value = metrics[field] * (1 + option["padding"] / 100)
 
-            elif option["mode"] == "padding":
-                rule_value = metrics[field] * (1 + option["padding"] / 100)
+        elif option["mode"] == "period_padding":
+            negative_slack = min(metrics[field], 0)
+            rule_value = negative_slack - max(
+                negative_slack * option["padding"] / 100,
+                period * option["padding"] / 100,
+            )
+
+        elif option["mode"] == "abs_padding":
+            rule_value = abs(metrics[field]) * (1 + option["padding"] / 100)
+
+        elif option["mode"] == "metric":
+            rule_value = metrics[option["metric"]] * option["padding"] / 100
 
-            elif option["mode"] == "period_padding":
-                negative_slack = min(metrics[field], 0)
-                rule_value = negative_slack - max(
-                    negative_slack * option["padding"] / 100,
-                    period * option["padding"] / 100,
+        if (
+            field == "cts__design__instance__count__setup_buffer"
+            or field == "cts__design__instance__count__hold_buffer"
+        ):
+            rule_value = max(rule_value, metrics[field] * 1.1)
+
+        if "min_max" in option.keys():
+            if "min_max_direct" in option.keys():
+                rule_value = option["min_max"](rule_value, option["min_max_direct"])
+            elif "min_max_sum" in option.keys():
+                rule_value = option["min_max"](
+                    rule_value + option["min_max_sum"], option["min_max_sum"]
+                )
+            elif "min_max_period" in option.keys():
+                rule_value = option["min_max"](
+                    rule_value, -period * option["min_max_period"] / 100.0
+                )
+            else:
+                raise RuleError(
+                    f"Metric {field} has 'min_max' field but no "
+                    "'min_max_direct', 'min_max_sum', or 'min_max_period' field."
                 )
 
-            elif option["mode"] == "abs_padding":
-                rule_value = abs(metrics[field]) * (1 + option["padding"] / 100)
+        if rule_value is None:
+            raise RuleError(f"Metric {field} has invalid mode {option['mode']}.")
 
-            elif option["mode"] == "metric":
-                rule_value = metrics[option["metric"]] * option["padding"] / 100
+        if option["round_value"] and not isinf(rule_value):
+            rule_value = int(round(rule_value))
+        else:
+            rule_value = float(f"{rule_value:.3g}")
 
+        preserve_old_rule = (
+            True
+            if len(metrics_to_consider) > 0 and field not in metrics_to_consider
+            else False
+        )
+        has_old_rule = OLD_RULES is not None and field in OLD_RULES.keys()
+
+        if has_old_rule and preserve_old_rule:
+            rule_value = OLD_RULES[field]["value"]
+
+        if has_old_rule and not preserve_old_rule:
+            old_rule = OLD_RULES[field]
+            if old_rule["compare"] != option["compare"]:
+                print("[WARNING] Compare operator changed since last update.")
+
+            compare = ops[option["compare"]]
+
+            if compare(rule_value, metrics[field]) and "padding" in option.keys():
+                rule_value = metrics[field] * (1 + option["padding"] / 100)
+                if option["round_value"] and not isinf(rule_value):
+                    rule_value = int(round(rule_value))
+                else:
+                    rule_value = float(f"{rule_value:.3g}")
+
+            need_to_update = False
             if (
-                field == "cts__design__instance__count__setup_buffer"
-                or field == "cts__design__instance__count__hold_buffer"
+                tighten
+                and rule_value != old_rule["value"]
+                and compare(rule_value, old_rule["value"])
             ):
-                rule_value = max(rule_value, metrics[field] * 1.1)
-
-            if "min_max" in option.keys():
-                if "min_max_direct" in option.keys():
-                    rule_value = option["min_max"](rule_value, option["min_max_direct"])
-                elif "min_max_sum" in option.keys():
-                    rule_value = option["min_max"](
-                        rule_value + option["min_max_sum"], option["min_max_sum"]
-                    )
-                elif "min_max_period" in option.keys():
-                    rule_value = option["min_max"](
-                        rule_value, -period * option["min_max_period"] / 100.0
-                    )
-                else:
-                    print(
-                        f"[ERROR] Metric {field} has 'min_max' field but no "
-                        "'min_max_direct', 'min_max_sum', or 'min_max_period' field."
-                    )
-                    sys.exit(1)
-
-            if rule_value is None:
-                print(f"[ERROR] Metric {field} has invalid mode {option['mode']}.")
-                sys.exit(1)
-
-            if option["round_value"] and not isinf(rule_value):
-                rule_value = int(round(rule_value))
-            else:
-                rule_value = float(f"{rule_value:.3g}")
+                need_to_update = True
+                changes.append((field, old_rule["value"], rule_value, "Tighten"))
 
-            preserve_old_rule = (
-                True
-                if len(metrics_to_consider) > 0 and field not in metrics_to_consider
-                else False
-            )
-            has_old_rule = OLD_RULES is not None and field in OLD_RULES.keys()
-
-            if has_old_rule and preserve_old_rule:
-                rule_value = OLD_RULES[field]["value"]
-
-            if has_old_rule and not preserve_old_rule:
-                old_rule = OLD_RULES[field]
-                if old_rule["compare"] != option["compare"]:
-                    print("[WARNING] Compare operator changed since last update.")
-
-                compare = ops[option["compare"]]
-
-                if compare(rule_value, metrics[field]) and "padding" in option.keys():
-                    rule_value = metrics[field] * (1 + option["padding"] / 100)
-                    if option["round_value"] and not isinf(rule_value):
-                        rule_value = int(round(rule_value))
-                    else:
-                        rule_value = float(f"{rule_value:.3g}")
-
-                need_to_update = False
-                if (
-                    tighten
-                    and rule_value != old_rule["value"]
-                    and compare(rule_value, old_rule["value"])
-                ):
-                    need_to_update = True
-                    change_str += format_str.format(
-                        field, old_rule["value"], rule_value, "Tighten"
-                    )
-
-                if failing and not compare(metrics[field], old_rule["value"]):
-                    need_to_update = True
-                    change_str += format_str.format(
-                        field, old_rule["value"], rule_value, "Failing"
-                    )
-
-                if update and old_rule["value"] != rule_value:
-                    need_to_update = True
-                    change_str += format_str.format(
-                        field, old_rule["value"], rule_value, "Updating"
-                    )
-
-                if not need_to_update:
-                    rule_value = old_rule["value"]
-
-            rule_entry = {"value": rule_value, "compare": option["compare"]}
-            if "level" in option:
-                rule_entry["level"] = option["level"]
-            rules[field] = rule_entry
-
-    if len(change_str) > 0:
-        print(f"{os.path.normpath(rules_file)} updates:")
-        print(format_str.format("Metric", "Old", "New", "Type"), end="")
-        print(format_str.format("------", "---", "---", "----"), end="")
-        print(change_str)
+            if failing and not compare(metrics[field], old_rule["value"]):
+                need_to_update = True
+                changes.append((field, old_rule["value"], rule_value, "Failing"))
+
+            if update and old_rule["value"] != rule_value:
+                need_to_update = True
+                changes.append((field, old_rule["value"], rule_value, "Updating"))
+
+            if not need_to_update:
+                rule_value = old_rule["value"]
+
+        rule_entry = {"value": rule_value, "compare": option["compare"]}
+        if "level" in option:
+            rule_entry["level"] = option["level"]
+        rules[field] = rule_entry
+
+    return rules, changes
+
+
+def format_changes(rules_file, changes):
+    text = f"{os.path.normpath(rules_file)} updates:\n"
+    text += FORMAT_STR.format("Metric", "Old", "New", "Type")
+    text += FORMAT_STR.format("------", "---", "---", "----")
+    for change in changes:
+        text += FORMAT_STR.format(*change)
+    return text
+
+
+def load_inputs(rules_file, metrics_file):
+    with open(metrics_file, "r") as f:
+        metrics = json.load(f)
+    if not isinstance(metrics, dict):
+        raise RuleError(f"Invalid format for reference metrics {metrics_file}")
+
+    if isfile(rules_file):
+        with open(rules_file, "r") as f:
+            OLD_RULES = json.load(f)
+    else:
+        print(f"[WARNING] No old rules file found {rules_file}")
+        OLD_RULES = None
+    return metrics, OLD_RULES
+
+
+def gen_rule_file(
+    rules_file,
+    new_rules_file,
+    update,
+    tighten,
+    failing,
+    variant,
+    metrics_file=None,
+    metrics_to_consider=[],
+):
+    try:
+        metrics, OLD_RULES = load_inputs(rules_file, metrics_file)
+        rules, changes = compute_rules(
+            metrics, OLD_RULES, update, tighten, failing, metrics_to_consider
+        )
+    except RuleError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+    if len(changes) > 0:
+        print(format_changes(rules_file, changes))
 
     with open(new_rules_file, "w") as f:
         json.dump(rules, f, indent=4)
 
 
+# Batch mode
+# =============================================================================
+
+
+def discover_designs(flow_dir, variants, in_place):
+    """
+    Find the reference metadata of every run under flow_dir/reports whose
+    variant is in variants, with the rules file of its design directory.
+    """
+    designs = list()
+    reports = os.path.join(flow_dir, "reports")
+    for path in sorted(glob(os.path.join(reports, "*", "*", "*", "metadata.json"))):
+        reportDir = os.path.dirname(path)
+        platform, design, variant = os.path.relpath(reportDir, reports).split(os.sep)
+        if variant not in variants:
+            continue
+        try:
+            with open(os.path.join(reportDir, "design-dir.txt")) as f:
+                designDir = os.path.join(flow_dir, f.read().strip())
+        except IOError:
+            designDir = os.path.join(flow_dir, "designs", platform, design)
+        rules = os.path.join(designDir, f"rules-{variant}.json")
+        designs.append(
+            dict(
+                name=f"{platform} {design} ({variant})",
+                rules=rules,
+                new_rules=rules if in_place else os.path.join(reportDir, "rules.json"),
+                reference=path,
+            )
+        )
+    return designs
+
+
+def _gen_design(design, update, tighten, failing, metrics_to_consider):
+    output = io.StringIO()
+    changes = list()
+    error = None
+    with contextlib.redirect_stdout(output):
+        try:
+            metrics, OLD_RULES = load_inputs(design["rules"], design["reference"])
+            rules, changes = compute_rules(
+                metrics, OLD_RULES, update, tighten, failing, metrics_to_consider
+            )
+            with open(design["new_rules"], "w") as f:
+                json.dump(rules, f, indent=4)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+    return changes, output.getvalue(), error
+
+
+def gen_rule_files(
+    designs, update, tighten, failing, metrics_to_consider=[], jobs=None
+):
+    """
+    Generate the rules of many designs with a pool of worker processes and
+    print one consolidated report of the changes. Returns the number of
+    designs that could not be processed.
+    """
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(
+                _gen_design, design, update, tighten, failing, metrics_to_consider
+            )
+            for design in designs
+        ]
+        results = [future.result() for future in futures]
+
+    failed = 0
+    changed = 0
+    for design, (changes, output, error) in zip(designs, results):
+        name = design.get("name", design["rules"])
+        if output or error:
+            print(f"{name}:")
+            if output:
+                print(output, end="")
+        if error is not None:
+            print(f"[ERROR] {error}")
+            failed += 1
+        if changes:
+            changed += 1
+            print(format_changes(design["rules"], changes))
+        elif output or error:
+            print()
+
+    total = sum(len(changes) for changes, _, _ in results)
+    print(
+        f"Rules updated: {total} rules in {changed} of {len(designs)} designs, "
+        f"{failed} failed."
+    )
+    return failed
+
+
 def comma_separated_list(value):
     if value is None or value == "all":
         return []
@@ -472,6 +615,34 @@ if __name__ == "__main__":
         default="all",
         help="Only consider the following metrics to change. [default=all]",
     )
+    batch = parser.add_argument_group("batch mode")
+    batch.add_argument(
+        "--discover",
+        metavar="FLOW_DIR",
+        default=None,
+        help="Update the rules of every run under FLOW_DIR/reports. --variant"
+        " may be a comma separated list of variants in this mode.",
+    )
+    batch.add_argument(
+        "--batch",
+        default=None,
+        help="JSON file with a list of designs, each with the keys rules,"
+        " new_rules, reference and optionally name.",
+    )
+    batch.add_argument(
+        "--in-place",
+        action="store_true",
+        default=False,
+        help="Write discovered rules to the design directory instead of the"
+        " reports directory.",
+    )
+    batch.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of worker processes. [default=number of CPUs]",
+    )
     args = parser.parse_args()
 
     if not args.update and not args.tighten and not args.failing:
@@ -482,6 +653,20 @@ if __name__ == "__main__":
         parser.print_help()
         sys.exit(1)
 
+    if args.discover is not None or args.batch is not None:
+        designs = list()
+        if args.batch is not None:
+            with open(args.batch) as f:
+                designs += json.load(f)
+        if args.discover is not None:
+            designs += discover_designs(
+                args.discover, args.variant.split(","), args.in_place
+            )
+        failed = gen_rule_files(
+            designs, args.update, args.tighten, args.failing, args.metrics, args.jobs
+        )
+        sys.exit(1 if failed else 0)
+
     gen_rule_file(
         args.rules,
         args.new_rules,
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+
+# This scripts generates a timeline of the flow steps in the Chrome trace
+# event format, which can be opened in https://ui.perfetto.dev or
+# chrome://tracing
+# ---------------------------------------------------------------------------
+#
+# Every log file with a GNU time footer becomes a slice that ends at the
+# modification time of the log and lasts the elapsed time of the footer.
+# Each log directory (one variant of a design) is a process in the trace,
+# and steps of a variant that overlap in time are put on separate tracks.
+# The CPU utilization and peak memory of the running steps are added as
+# counters, and the metrics of the step JSON file (e.g. 2_1_floorplan.json)
+# are attached to its slice.
+
+from glob import glob
+import argparse
+import json
+import os
+import sys
+
+import gnuTime
+
+SKIPPED_LOGS = ["eqy_output", "rsz_lec_check"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Generates a Chrome trace/Perfetto timeline of the flow steps"
+    )
+    parser.add_argument(
+        "--logDir", "-d", nargs="+", default=[], help="Log files directories"
+    )
+    parser.add_argument(
+        "--discover",
+        metavar="FLOW_DIR",
+        help="Add every FLOW_DIR/logs/<platform>/<design>/<variant> directory",
+    )
+    parser.add_argument(
+        "--output", "-o", default="trace.json", help="Output trace file"
+    )
+    parser.add_argument(
+        "--gap",
+        type=float,
+        default=1.0,
+        help="Report idle gaps between steps longer than this, in seconds",
+    )
+    args = parser.parse_args()
+    if not args.logDir and args.discover is None:
+        parser.error("one of --logDir or --discover is required")
+    return args
+
+
+def read_step_metrics(log_file):
+    """Returns the metrics of the JSON file next to a log, if any."""
+    try:
+        with open(os.path.splitext(log_file)[0] + ".json") as f:
+            data = json.load(f)
+    except (IOError, ValueError):
+        return dict()
+    if not isinstance(data, dict):
+        return dict()
+    return {k: v for k, v in data.items() if not isinstance(v, (dict, list))}
+
+
+def read_steps(log_dir):
+    """
+    Returns the steps of a log directory, ordered by start time. Each step
+    is a dict with the name, start and end in seconds since the epoch and
+    the footer values.
+    """
+    steps = list()
+    for path in sorted(glob(os.path.join(log_dir, "**", "*.log"), recursive=True)):
+        if any(x in path for x in SKIPPED_LOGS):
+            continue
+        try:
+            footer = gnuTime.read_footer(path)
+            end = os.path.getmtime(path)
+        except OSError:
+            continue
+        if footer is None or footer.elapsed_seconds is None:
+            continue
+        steps.append(
+            dict(
+                name=os.path.splitext(os.path.relpath(path, log_dir))[0],
+                start=end - footer.elapsed_seconds,
+                end=end,
+                footer=footer,
+                metrics=read_step_metrics(path),
+            )
+        )
+    steps.sort(key=lambda s: (s["start"], s["name"]))
+    return steps
+
+
+def assign_tracks(steps):
+    """
+    Set the track of every step so that steps on the same track do not
+    overlap, reusing the first free track. Returns the number of tracks.
+    """
+    track_ends = list()
+    for step in steps:
+        for track, end in enumerate(track_ends):
+            if end <= step["start"]:
+                break
+        else:
+            track = len(track_ends)
+            track_ends.append(0)
+        track_ends[track] = step["end"]
+        step["track"] = track
+    return len(track_ends)
+
+
+def counter_events(steps, pid, origin):
+    """
+    Returns counter events with the sum of the CPU utilization (in cores)
+    and peak memory (in MB) of the steps running at any time.
+    """
+    changes = dict()
+    for step in steps:
+        footer = step["footer"]
+        cpu = (footer.cpu_percent or 0) / 100
+        memory = (footer.peak_memory or 0) / 1024
+        for time, sign in [(step["start"], 1), (step["end"], -1)]:
+            change = changes.setdefault(time, [0, 0])
+            change[0] += sign * cpu
+            change[1] += sign * memory
+
+    events = list()
+    cpu, memory = 0, 0
+    for time in sorted(changes):
+        cpu += changes[time][0]
+        memory += changes[time][1]
+        ts = round((time - origin) * 1e6)
+        events.append(
+            dict(
+                name="CPU utilization",
+                ph="C",
+                pid=pid,
+                ts=ts,
+                args=dict(cores=round(max(cpu, 0), 2)),
+            )
+        )
+        events.append(
+            dict(
+                name="Peak memory",
+                ph="C",
+                pid=pid,
+                ts=ts,
+                args=dict(MB=round(max(memory, 0), 1)),
+            )
+        )
+    return events
+
+
+def idle_gaps(steps, min_gap):
+    """Returns (after step, before step, seconds) of the idle periods."""
+    gaps = list()
+    busy_until, last = None, None
+    for step in steps:
+        if busy_until is not None and step["start"] - busy_until > min_gap:
+            gaps.append((last, step["name"], step["start"] - busy_until))
+        if busy_until is None or step["end"] > busy_until:
+            busy_until, last = step["end"], step["name"]
+    return gaps
+
+
+def build_trace(log_dirs, min_gap=1.0):
+    """
+    Returns the trace of the steps of all log directories and prints a
+    summary of the wall-clock span, busy time and idle gaps of each one.
+    """
+    runs = [(log_dir, read_steps(log_dir)) for log_dir in log_dirs]
+    starts = [s["start"] for _, steps in runs for s in steps]
+    origin = min(starts) if starts else 0
+
+    events = list()
+    for pid, (log_dir, steps) in enumerate(runs, start=1):
+        name = os.path.normpath(log_dir)
+        events.append(dict(name="process_name", ph="M", pid=pid, args=dict(name=name)))
+        events.append(
+            dict(name="process_sort_index", ph="M", pid=pid, args=dict(sort_index=pid))
+        )
+        if not steps:
+            print(f"[WARN] No steps with an elapsed time found in {log_dir}")
+            continue
+
+        for track in range(assign_tracks(steps)):
+            events.append(
+                dict(
+                    name="thread_name",
+                    ph="M",
+                    pid=pid,
+                    tid=track,
+                    args=dict(name=f"steps {track}"),
+                )
+            )
+        for step in steps:
+            footer = step["footer"]
+            args = dict(
+                elapsed=footer.elapsed,
+                user=footer.user,
+                sys=footer.sys,
+                cpu_percent=footer.cpu_percent,
+                peak_memory_KB=footer.peak_memory,
+            )
+            args.update(step["metrics"])
+            events.append(
+                dict(
+                    name=step["name"],
+                    cat=step["name"].split("_")[0],
+                    ph="X",
+                    pid=pid,
+                    tid=step["track"],
+                    ts=round((step["start"] - origin) * 1e6),
+                    dur=round((step["end"] - step["start"]) * 1e6),
+                    args=args,
+                )
+            )
+        events += counter_events(steps, pid, origin)
+
+        span = max(s["end"] for s in steps) - steps[0]["start"]
+        busy = sum(s["end"] - s["start"] for s in steps)
+        print(
+            "{}: {} steps, span {:.0f}s, step time {:.0f}s".format(
+                name, len(steps), span, busy
+            )
+        )
+        for after, before, seconds in idle_gaps(steps, min_gap):
+            print(f"  idle {seconds:.0f}s between {after} and {before}")
+
+    return dict(traceEvents=events, displayTimeUnit="ms")
+
+
+def main():
+    args = parse_args()
+    log_dirs = list(args.logDir)
+    if args.discover is not None:
+        log_dirs += sorted(
+            d
+            for d in glob(os.path.join(args.discover, "logs", "*", "*", "*"))
+            if os.path.isdir(d)
+        )
+    if not log_dirs:
+        print("[ERROR] No log directories found.")
+        sys.exit(1)
+
+    trace = build_trace(log_dirs, args.gap)
+    with open(args.output, "w") as f:
+        json.dump(trace, f)
+    print(f"Trace of {len(log_dirs)} log directories written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
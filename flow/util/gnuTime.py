@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+# This module reads the GNU time footer that the flow appends to every
+# stage log (see TIME_CMD in scripts/variables.mk):
+#
+# Elapsed time: 0:04.26[h:]min:sec. CPU time: user 4.08 sys 0.17 (99%). Peak memory: 671508KB.
+#
+# The footer is near the end of the log, followed only by the short
+# genElapsedTime output that scripts/flow.sh appends after each step, so the
+# file is read backwards in blocks from its end, up to MAX_TAIL bytes, and
+# only scanned forward when no footer is found in that tail.
+# -----------------------------------------------------------------------------
+
+from collections import namedtuple
+import os
+import re
+
+FOOTER_PREFIX = b"Elapsed time:"
+
+# Largest tail of a log searched before falling back to a forward scan
+MAX_TAIL = 1024 * 1024
+BLOCK_SIZE = 64 * 1024
+
+GnuTime = namedtuple(
+    "GnuTime",
+    [
+        "elapsed",  # elapsed time as printed, [h:]min:sec
+        "elapsed_seconds",  # elapsed time in seconds, None if not understood
+        "user",  # user CPU time in seconds
+        "sys",  # system CPU time in seconds
+        "cpu_percent",  # CPU utilization in percent
+        "peak_memory",  # peak resident set size in KB
+    ],
+)
+
+_ELAPSED = re.compile(r"^Elapsed time: (\S+)\[h:\]min:sec")
+_CPU = re.compile(r"CPU time: user (\S+) sys (\S+) \((\S+)%\)")
+_MEMORY = re.compile(r"Peak memory: (\d+)KB")
+
+
+def _number(value, t=float):
+    try:
+        return t(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_elapsed(elapsed):
+    """Convert a [h:]min:sec elapsed time to seconds."""
+    fields = elapsed.split(":")
+    if len(fields) not in [2, 3]:
+        return None
+    try:
+        seconds = float(fields[-1])
+        minutes = int(fields[-2])
+        hours = int(fields[0]) if len(fields) == 3 else 0
+    except ValueError:
+        return None
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def parse_footer(line):
+    """Parse a footer line into a GnuTime, fields not present are None."""
+    elapsed = _ELAPSED.search(line)
+    cpu = _CPU.search(line)
+    memory = _MEMORY.search(line)
+    elapsed = elapsed.group(1) if elapsed else None
+    return GnuTime(
+        elapsed=elapsed,
+        elapsed_seconds=parse_elapsed(elapsed) if elapsed else None,
+        user=_number(cpu.group(1)) if cpu else None,
+        sys=_number(cpu.group(2)) if cpu else None,
+        cpu_percent=_number(cpu.group(3), int) if cpu else None,
+        peak_memory=_number(memory.group(1), int) if memory else None,
+    )
+
+
+def _find_last(content, at_start):
+    """Returns the last footer line of content, or None."""
+    index = content.rfind(b"\n" + FOOTER_PREFIX)
+    if index >= 0:
+        start = index + 1
+    elif at_start and content.startswith(FOOTER_PREFIX):
+        start = 0
+    else:
+        return None
+    end = content.find(b"\n", start)
+    if end < 0:
+        end = len(content)
+    return content[start:end].decode("utf-8", errors="replace").strip()
+
+
+def read_footer(path):
+    """
+    Returns the GnuTime of the last footer of a log file, or None if the
+    file has no footer. Raises OSError if the file cannot be read.
+    """
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        tail = b""
+        while position > 0 and len(tail) < MAX_TAIL:
+            size = min(BLOCK_SIZE, position)
+            position -= size
+            f.seek(position)
+            tail = f.read(size) + tail
+            line = _find_last(tail, position == 0)
+            if line is not None:
+                return parse_footer(line)
+        if position == 0:
+            return None
+
+        # No footer near the end, scan the whole file
+        f.seek(0)
+        line = None
+        for raw in f:
+            if raw.startswith(FOOTER_PREFIX):
+                line = raw
+        if line is None:
+            return None
+        return parse_footer(line.decode("utf-8", errors="replace").strip())
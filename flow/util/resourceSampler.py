@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+
+# This scripts runs a command and samples the resources used by it and its
+# child processes from /proc at a fixed interval
+# ---------------------------------------------------------------------------
+#
+# The samples are written to a JSON lines file as they are taken: the first
+# line is a header describing the run, every other line is one sample
+#
+# [seconds since start, RSS in KB, CPU utilization in cores, threads, processes]
+#
+# The RSS and threads are the sums over the process tree and the CPU
+# utilization is the CPU time used by the tree since the previous sample
+# divided by the interval. The exit code of the command is returned, and
+# the command is run without sampling where /proc is not available.
+#
+# Usage: resourceSampler.py -o 3_3_place_gp.resources.jsonl -- openroad ...
+
+import argparse
+import json
+import math
+import os
+import signal
+import subprocess
+import sys
+import time
+
+VERSION = 1
+COLUMNS = ["time", "rss_kb", "cores", "threads", "processes"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Runs a command and samples its memory, CPU and thread usage"
+    )
+    parser.add_argument("--output", "-o", required=True, help="Samples file")
+    parser.add_argument(
+        "--interval", "-i", type=float, default=1.0, help="Sampling interval in s"
+    )
+    parser.add_argument(
+        "--cores",
+        type=int,
+        default=None,
+        help="Cores available to the command, defaults to NUM_CORES",
+    )
+    parser.add_argument("command", nargs=argparse.REMAINDER, help="Command to run")
+    args = parser.parse_args()
+    if args.command[:1] == ["--"]:
+        args.command = args.command[1:]
+    if not args.command:
+        parser.error("no command given")
+    if args.cores is None:
+        try:
+            args.cores = int(os.environ["NUM_CORES"])
+        except (KeyError, ValueError):
+            args.cores = os.cpu_count()
+    return args
+
+
+def read_stat(pid):
+    """
+    Returns (ppid, CPU ticks, threads, RSS pages) of a process from
+    /proc/<pid>/stat, or None if the process is gone.
+    """
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # The command name may contain spaces, the fields start after it
+    fields = stat[stat.rfind(b")") + 2 :].split()
+    return (
+        int(fields[1]),
+        int(fields[11]) + int(fields[12]),
+        int(fields[17]),
+        int(fields[21]),
+    )
+
+
+def process_tree(root):
+    """Returns the stats of root and all its descendants by pid."""
+    stats = dict()
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            stat = read_stat(int(entry))
+            if stat is not None:
+                stats[int(entry)] = stat
+    tree = dict()
+    pending = [root]
+    children = dict()
+    for pid, stat in stats.items():
+        children.setdefault(stat[0], []).append(pid)
+    while pending:
+        pid = pending.pop()
+        if pid in stats:
+            tree[pid] = stats[pid]
+            pending += children.get(pid, [])
+    return tree
+
+
+class Sampler:
+    """Samples a process tree, keeping the CPU ticks seen for each pid."""
+
+    def __init__(self, root):
+        self.root = root
+        self.ticks = dict()
+        self.page_kb = os.sysconf("SC_PAGE_SIZE") // 1024
+        self.tick_rate = os.sysconf("SC_CLK_TCK")
+        self.last = time.monotonic()
+
+    def sample(self):
+        tree = process_tree(self.root)
+        now = time.monotonic()
+        ticks = 0
+        for pid, (_, cpu, _, _) in tree.items():
+            # CPU time of processes that exited since the previous sample is
+            # lost, new processes count their CPU time since they started
+            ticks += cpu - self.ticks.get(pid, 0)
+        self.ticks = {pid: stat[1] for pid, stat in tree.items()}
+        cores = ticks / self.tick_rate / max(now - self.last, 1e-3)
+        self.last = now
+        return [
+            sum(stat[3] for stat in tree.values()) * self.page_kb,
+            round(cores, 2),
+            sum(stat[2] for stat in tree.values()),
+            len(tree),
+        ]
+
+
+def run(command, output, interval, cores):
+    start = time.time()
+    process = subprocess.Popen(command)
+
+    # Let the command handle interrupts, and pass on terminations
+    handlers = (
+        signal.signal(signal.SIGINT, signal.SIG_IGN),
+        signal.signal(signal.SIGTERM, lambda signum, frame: process.terminate()),
+    )
+    try:
+        if not os.path.isdir(f"/proc/{process.pid}"):
+            print(
+                "[WARN] /proc not available, resources are not sampled",
+                file=sys.stderr,
+            )
+            return process.wait()
+        return sample_process(process, output, interval, cores, start)
+    finally:
+        signal.signal(signal.SIGINT, handlers[0])
+        signal.signal(signal.SIGTERM, handlers[1])
+
+
+def sample_process(process, output, interval, cores, start):
+    """Samples a running process until it exits, returns its exit code."""
+    command = process.args
+    sampler = Sampler(process.pid)
+    with open(output, "w") as f:
+        header = dict(
+            version=VERSION,
+            command=os.path.basename(command[0]),
+            start=start,
+            interval=interval,
+            num_cores=cores,
+            columns=COLUMNS,
+        )
+        f.write(json.dumps(header) + "\n")
+        while True:
+            try:
+                returncode = process.wait(timeout=interval)
+                break
+            except subprocess.TimeoutExpired:
+                pass
+            sample = [round(time.time() - start, 2)] + sampler.sample()
+            f.write(json.dumps(sample, separators=(",", ":")) + "\n")
+            f.flush()
+    return returncode
+
+
+def read_samples(path):
+    """Returns the header and the list of samples of a samples file."""
+    with open(path) as f:
+        header = json.loads(f.readline())
+        samples = [json.loads(line) for line in f if line.strip()]
+    return header, samples
+
+
+def percentile(values, p):
+    """Nearest rank percentile of a list of values."""
+    values = sorted(values)
+    return values[max(math.ceil(p / 100 * len(values)) - 1, 0)]
+
+
+def summarize(path):
+    """
+    Returns the p50/p95 RSS in KB, average CPU utilization in cores and
+    parallel efficiency (cores used over cores available) of a samples
+    file, or None if it has no samples.
+    """
+    header, samples = read_samples(path)
+    if not samples:
+        return None
+    rss = [s[1] for s in samples]
+    cores = sum(s[2] for s in samples) / len(samples)
+    summary = dict(
+        rss_p50=percentile(rss, 50),
+        rss_p95=percentile(rss, 95),
+        cores_average=round(cores, 2),
+        parallel_efficiency=None,
+    )
+    if header.get("num_cores"):
+        summary["parallel_efficiency"] = round(cores / header["num_cores"], 3)
+    return summary
+
+
+def main():
+    args = parse_args()
+    returncode = run(args.command, args.output, args.interval, args.cores)
+    # Report a command killed by a signal like a shell does
+    sys.exit(128 - returncode if returncode < 0 else returncode)
+
+
+if __name__ == "__main__":
+    main()
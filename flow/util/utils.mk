@@ -186,7 +186,11 @@ endif
 .PHONY: convert_rve
 convert_rve: $(REPORTS_DIR)/drc.json
 
-$(REPORTS_DIR)/drc.json: $(DRC_FILE)
+## Convert RVE DRC database to gzipped JSON, e.g. with DRC_JSON_FORMAT=compact
+.PHONY: convert_rve_gz
+convert_rve_gz: $(REPORTS_DIR)/drc.json.gz
+
+$(REPORTS_DIR)/drc.json $(REPORTS_DIR)/drc.json.gz: $(DRC_FILE)
 ifneq ($(DRC_FILE),)
 	$(KLAYOUT_CMD) -z -rd in_drc="$<" \
 	        -rd out_file="$@" \
@@ -0,0 +1,114 @@
+"""
+Batch candidate generation for the Ax search algorithm.
+
+Ray's `AxSearch` asks `AxClient.get_next_trial()` for one candidate per free
+slot, so the Bayesian model is refitted and the acquisition function is
+optimized once per trial. `BatchAxSearch` instead fills every free slot at
+once: the model is fitted a single time and one generator run with a
+candidate per free slot is generated, with the running points treated as
+pending, then each candidate becomes its own trial.
+
+Ray's `ConcurrencyLimiter` frees a single slot when a trial completes, so the
+batches are as large as `--jobs` at startup and afterwards only when several
+trials complete between two suggestions.
+"""
+
+import time
+from typing import Dict, Optional
+
+from ax.core.generator_run import GeneratorRun
+from ax.core.utils import get_pending_observation_features_based_on_trial_status
+from ax.exceptions.core import DataRequiredError
+from ax.exceptions.generation_strategy import MaxParallelismReachedException
+from botorch.utils.sampling import manual_seed
+from ray.tune.search.ax import AxSearch
+from ray.tune.utils.util import unflatten_list_dict
+
+
+class BatchAxSearch(AxSearch):
+    """
+    AxSearch that generates candidates for all free slots in one batch.
+
+    Args:
+        seed: Random seed used for candidate generation.
+        kwargs: Passed through to `AxSearch`.
+    """
+
+    def __init__(self, seed: Optional[int] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.seed = seed
+        self.max_concurrent = 1
+        self.queue = []
+        self.num_batches = 0
+        self.num_generated = 0
+        self.generation_time = 0.0
+
+    def set_max_concurrency(self, max_concurrent: int) -> bool:
+        # Size the batches but let ConcurrencyLimiter keep enforcing the limit.
+        self.max_concurrent = max_concurrent
+        return False
+
+    def _generate_batch(self):
+        """Generate one candidate per free slot and queue them."""
+        free = self.max_concurrent - len(self._live_trial_mapping)
+        gs = self._ax.generation_strategy
+        limit, complete = gs.current_generator_run_limit()
+        if complete:
+            return
+        if limit >= 0:
+            free = min(free, limit)
+        if free <= 0:
+            return
+        start = time.time()
+        # A different seed per batch, or the batches would repeat the same
+        # random draws
+        seed = None if self.seed is None else self.seed + self.num_batches
+        try:
+            with manual_seed(seed=seed):
+                generator_run = gs.gen(
+                    experiment=self._ax.experiment,
+                    n=free,
+                    pending_observations=(
+                        get_pending_observation_features_based_on_trial_status(
+                            self._ax.experiment
+                        )
+                    ),
+                )
+        except (MaxParallelismReachedException, DataRequiredError):
+            return
+        # The trials record the generation step of their generator run, which
+        # the generation strategy counts to move to its next step
+        model_name = gs.current_step.model_to_gen_from_name
+        for arm in generator_run.arms:
+            trial = self._ax.experiment.new_trial(
+                generator_run=GeneratorRun(
+                    arms=[arm],
+                    type=generator_run.generator_run_type,
+                    model_key=model_name,
+                    generation_step_index=gs.current_step_index,
+                    generation_node_name=gs.current_node_name,
+                )
+            )
+            trial.mark_running(no_runner_required=True)
+            self.queue.append((trial.arm.parameters, trial.index))
+        elapsed = time.time() - start
+        self.num_batches += 1
+        self.num_generated += len(generator_run.arms)
+        self.generation_time += elapsed
+        print(
+            f"[INFO TUN-0050] Ax generated {len(generator_run.arms)} candidates"
+            f" in {elapsed:.2f}s using {model_name}."
+        )
+
+    def suggest(self, trial_id: str) -> Optional[Dict]:
+        if self._points_to_evaluate or not self._ax:
+            return super().suggest(trial_id)
+        if len(self.queue) == 0:
+            self._generate_batch()
+        if len(self.queue) == 0:
+            return None
+        parameters, trial_index = self.queue.pop(0)
+        self._live_trial_mapping[trial_id] = trial_index
+        return unflatten_list_dict(
+            {k: parameters[k] for k in sorted(parameters.keys())}
+        )
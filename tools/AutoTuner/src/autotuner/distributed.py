@@ -57,6 +57,13 @@ Parameter sweeping:
     openroad_autotuner --design gcd --platform sky130hd \
                        --config distributed-sweep-example.json \
                        sweep
+
+Parameter screening:
+    openroad_autotuner screen -h
+    Example:
+    openroad_autotuner --design gcd --platform sky130hd \
+                       --config ../designs/sky130hd/gcd/autotuner.json \
+                       screen --method morris --trajectories 4
 """
 
 import argparse
@@ -77,7 +84,6 @@ from ray import tune
 from ray.tune.schedulers import AsyncHyperBandScheduler
 from ray.tune.schedulers import PopulationBasedTraining
 from ray.tune.search import ConcurrencyLimiter
-from ray.tune.search.ax import AxSearch
 from ray.tune.search.basic_variant import BasicVariantGenerator
 from ray.tune.search.hyperopt import HyperOptSearch
 from ray.tune.search.optuna import OptunaSearch
@@ -87,7 +93,10 @@ from ax.service.ax_client import AxClient
 
 from autotuner.utils import (
     openroad,
+    openroad_distributed,
     consumer,
+    clone_flow_variant,
+    first_affected_stage,
     parse_config,
     read_config,
     read_metrics,
@@ -98,6 +107,9 @@ from autotuner.utils import (
     FASTROUTE_TCL,
 )
 from autotuner.tensorboard_logger import TensorBoardLogger
+from autotuner.ax_search import BatchAxSearch
+from autotuner.surrogate import SurrogateFilter
+from autotuner import screening
 
 # Name of the final metric
 METRIC = "metric"
@@ -124,6 +136,21 @@ class AutoTunerBase(tune.Trainable):
         #      1/     2/         3/       4/           5/
         # <repo>/<logs>/<platform>/<design>/<experiment/<cwd>
         self.repo_dir = os.path.abspath(LOCAL_DIR + "/../" * 4)
+        self._configure(config)
+
+    def reset_config(self, new_config):
+        """
+        Reuse this actor for a new trial. The working directory has already
+        been changed to the new trial directory by Tune.
+        """
+        self._configure(new_config)
+        return True
+
+    def _configure(self, config):
+        """
+        Per-trial state. The variables.yaml registry used by parse_config is
+        cached per process, so reused actors only parse it once.
+        """
         self.parameters = parse_config(
             config=config,
             base_dir=self.repo_dir,
@@ -136,6 +163,8 @@ class AutoTunerBase(tune.Trainable):
         )
         self.step_ = 0
         self.variant = f"variant-{self.__class__.__name__}-{self.trial_id}-or"
+        # Set by load_checkpoint: (parent variant, first stage to re-run)
+        self.clone_from = None
         # Do a valid config check here, since we still have the config in a
         # dict vs. having to scan through the parameter string later
         self.is_valid_config = self._is_valid_config(config)
@@ -154,6 +183,16 @@ class AutoTunerBase(tune.Trainable):
                 "die_area": ERROR_METRIC,
             }
         self._variant = f"{self.variant}-{self.step_}"
+        if self.clone_from is not None:
+            parent_variant, stage = self.clone_from
+            copied = clone_flow_variant(
+                args, self.repo_dir, parent_variant, self._variant, stage
+            )
+            print(
+                f"[INFO TUN-0052] Cloned {copied} files from {parent_variant},"
+                f" re-running from stage {stage or 'none'}."
+            )
+            self.clone_from = None
         metrics_file = openroad(
             args=args,
             base_dir=self.repo_dir,
@@ -174,6 +213,31 @@ class AutoTunerBase(tune.Trainable):
             "die_area": die_area,
         }
 
+    def save_checkpoint(self, checkpoint_dir):
+        """
+        Record the flow variant of the last step. The stage results stay in
+        the flow results directory and are cloned by load_checkpoint.
+        """
+        return {
+            "variant": getattr(self, "_variant", None),
+            "config": self.config,
+            "step": self.step_,
+        }
+
+    def load_checkpoint(self, checkpoint):
+        """
+        Inherit the flow state of a parent trial (PBT exploit). Stages before
+        the first one affected by the mutated parameters are cloned from the
+        parent on the next step instead of being re-run.
+        """
+        self.step_ = checkpoint["step"]
+        if checkpoint["variant"] is None:
+            return
+        stage = first_affected_stage(checkpoint["config"], self.config)
+        if stage == "synth":
+            return
+        self.clone_from = (checkpoint["variant"], stage)
+
     def evaluate(self, metrics):
         """
         User-defined evaluation function.
@@ -267,6 +331,7 @@ def parse_arguments():
     )
     tune_parser = subparsers.add_parser("tune")
     _ = subparsers.add_parser("sweep")
+    screen_parser = subparsers.add_parser("screen")
 
     # DUT
     parser.add_argument(
@@ -379,6 +444,79 @@ def parse_arguments():
         default=42,
         help="Random seed. (0 means no seed.)",
     )
+    tune_parser.add_argument(
+        "--surrogate",
+        action="store_true",
+        help="Skip candidates that a surrogate model fitted on completed"
+        " trials predicts to fail or to be clearly worse than the best trial.",
+    )
+    tune_parser.add_argument(
+        "--surrogate_min_trials",
+        type=int,
+        metavar="<int>",
+        default=20,
+        help="Number of completed trials before the surrogate filter starts.",
+    )
+    tune_parser.add_argument(
+        "--surrogate_margin",
+        type=float,
+        metavar="<float>",
+        default=0.2,
+        help="Reject candidates predicted worse than the best trial by more"
+        " than this fraction.",
+    )
+    tune_parser.add_argument(
+        "--surrogate_exploration",
+        type=float,
+        metavar="<float>",
+        default=0.1,
+        help="Fraction of rejected candidates that are run anyway.",
+    )
+
+    # Screening
+    screen_parser.add_argument(
+        "--method",
+        type=str,
+        choices=["morris", "factorial"],
+        default="morris",
+        help="Design of experiments used to rank parameter sensitivities.",
+    )
+    screen_parser.add_argument(
+        "--trajectories",
+        type=int,
+        metavar="<int>",
+        default=4,
+        help="Number of Morris trajectories. Each costs (#parameters + 1) runs.",
+    )
+    screen_parser.add_argument(
+        "--levels",
+        type=int,
+        metavar="<int>",
+        default=4,
+        help="Number of grid levels per parameter for the Morris design.",
+    )
+    screen_parser.add_argument(
+        "--threshold",
+        type=float,
+        metavar="<float>",
+        default=0.1,
+        help="Keep parameters whose sensitivity is at least this fraction of"
+        " the largest sensitivity.",
+    )
+    screen_parser.add_argument(
+        "--keep",
+        type=int,
+        metavar="<int>",
+        default=None,
+        help="Keep the N most sensitive parameters. Overrides --threshold.",
+    )
+    screen_parser.add_argument(
+        "--seed",
+        type=int,
+        metavar="<int>",
+        default=42,
+        help="Random seed for the Morris design.",
+    )
 
     # Workload
     parser.add_argument(
@@ -452,6 +590,20 @@ def parse_arguments():
             )
             sys.exit(1)
 
+        if args.surrogate and args.algorithm in ["pbt", "random"]:
+            print(
+                '[ERROR TUN-0048] The flag "--surrogate" is not supported'
+                f' with "--algorithm {args.algorithm}".'
+            )
+            sys.exit(1)
+    elif args.mode == "screen":
+        if args.trajectories < 1 or args.levels < 2:
+            print(
+                "[ERROR TUN-0041] Screening requires --trajectories >= 1"
+                " and --levels >= 2."
+            )
+            sys.exit(1)
+
     # If the experiment name is the default, add a UUID to the end.
     if args.experiment == "test":
         id = str(uuid())[:8]
@@ -466,10 +618,18 @@ def parse_arguments():
 
 
 def set_algorithm(
-    algorithm_name, experiment_name, best_params, seed, perturbation, jobs, config
+    algorithm_name,
+    experiment_name,
+    best_params,
+    seed,
+    perturbation,
+    jobs,
+    config,
+    surrogate=None,
 ):
     """
     Configure search algorithm.
+    surrogate, if given, holds the SurrogateFilter options.
     """
     # Pre-set seed if user sets seed to 0
     if seed == 0:
@@ -500,7 +660,9 @@ def set_algorithm(
             parameters=config,
             objectives={METRIC: AxClientMetric(minimize=True)},
         )
-        algorithm = AxSearch(ax_client=ax_client, points_to_evaluate=best_params)
+        algorithm = BatchAxSearch(
+            seed=seed, ax_client=ax_client, points_to_evaluate=best_params
+        )
     elif algorithm_name == "optuna":
         algorithm = OptunaSearch(points_to_evaluate=best_params, seed=seed)
     elif algorithm_name == "pbt":
@@ -517,6 +679,11 @@ def set_algorithm(
             random_state=seed,
         )
 
+    if surrogate is not None and algorithm_name not in ["random", "pbt"]:
+        algorithm = SurrogateFilter(
+            algorithm, error_metric=ERROR_METRIC, seed=seed, **surrogate
+        )
+
     # A wrapper algorithm for limiting the number of concurrent trials.
     if algorithm_name not in ["random", "pbt"]:
         algorithm = ConcurrencyLimiter(algorithm, max_concurrent=jobs)
@@ -625,6 +792,133 @@ def sweep():
     print("[INFO TUN-0010] Sweep complete.")
 
 
+def screen():
+    """Run a design of experiments and prune insensitive parameters"""
+    if args.server is not None:
+        repo_dir = os.path.abspath(LOCAL_DIR + "/../" * 4)
+    else:
+        repo_dir = os.path.abspath(os.path.join(ORFS_FLOW_DIR, ".."))
+    print(f"[INFO TUN-0012] Log folder {LOCAL_DIR}.")
+
+    specs = {k: v for k, v in config_dict.items() if screening.is_screenable(v)}
+    names = list(specs.keys())
+    if len(names) == 0:
+        print("[ERROR TUN-0042] No parameter with more than one value to screen.")
+        sys.exit(1)
+
+    if args.method == "morris":
+        rng = np.random.default_rng(args.seed)
+        units, moves = screening.morris_design(
+            len(names), args.trajectories, args.levels, rng
+        )
+    else:
+        design = screening.factorial_design(len(names))
+        units = (design + 1) / 2
+    points = [screening.decode_point(names, specs, row) for row in units]
+    fixed = screening.fixed_parameters(config_dict)
+    print(
+        f"[INFO TUN-0043] Screening {len(names)} parameters with"
+        f" {args.method} design: {len(points)} runs."
+    )
+
+    tb_log_dir = os.path.join(LOCAL_DIR, args.experiment)
+    tb_logger = TensorBoardLogger.remote(log_dir=tb_log_dir)
+
+    # Keep at most --jobs runs in flight, as sweep does with its consumers.
+    scores = [ERROR_METRIC] * len(points)
+    pending = dict()
+    next_point = 0
+    while next_point < len(points) or pending:
+        while next_point < len(points) and len(pending) < args.jobs:
+            config = dict(fixed)
+            config.update(points[next_point])
+            ref = openroad_distributed.remote(
+                args,
+                repo_dir,
+                config,
+                SDC_ORIGINAL,
+                FR_ORIGINAL,
+                INSTALL_PATH,
+                variant=f"screen-{next_point}",
+            )
+            pending[ref] = next_point
+            next_point += 1
+        done, _ = ray.wait(list(pending.keys()), num_returns=1)
+        index = pending.pop(done[0])
+        metric_file, _ = ray.get(done[0])
+        metrics = read_metrics(metric_file, args.stop_stage)
+        score, effective_clk_period, num_drc, die_area = calculate_score(metrics)
+        scores[index] = score
+        print(f"[INFO TUN-0008] Finished run for parameter {points[index]}.")
+        ray.get(
+            tb_logger.log_sweep_metrics.remote(
+                params=points[index],
+                metrics=metrics,
+                score=score,
+                effective_clk_period=effective_clk_period,
+                num_drc=num_drc,
+                die_area=die_area,
+            )
+        )
+    ray.get(tb_logger.close.remote())
+
+    clean, failed = screening.clean_scores(scores, ERROR_METRIC)
+    if clean is None:
+        print("[ERROR TUN-0016] No successful runs found.")
+        sys.exit(16)
+    if failed > 0:
+        print(
+            f"[WARNING TUN-0044] {failed} of {len(points)} screening runs"
+            " failed and were scored as the worst successful run."
+        )
+    if args.method == "morris":
+        sensitivity, sigma = screening.morris_effects(clean, moves, len(names))
+    else:
+        sensitivity, sigma = screening.factorial_effects(clean, design)
+    ranking, kept = screening.select_parameters(
+        names, sensitivity, args.threshold, args.keep
+    )
+
+    print("[INFO TUN-0045] Parameter sensitivities (most sensitive first):")
+    for name in ranking:
+        i = names.index(name)
+        status = "keep" if name in kept else "drop"
+        print(f"  {name:40} {sensitivity[i]:12.4g} {sigma[i]:12.4g}  {status}")
+
+    best_config = points[int(np.argmin(clean))]
+    out_dir = os.path.join(LOCAL_DIR, args.experiment)
+    os.makedirs(out_dir, exist_ok=True)
+    pruned_path = os.path.join(out_dir, "autotuner-screened.json")
+    with open(os.path.abspath(args.config)) as file:
+        data = json.load(file)
+    pruned = screening.prune_config(data, args.config, kept, best_config, pruned_path)
+    with open(pruned_path, "w") as file:
+        json.dump(pruned, file, indent=4)
+    results_path = os.path.join(out_dir, "screening-results.json")
+    with open(results_path, "w") as file:
+        json.dump(
+            {
+                "method": args.method,
+                "runs": len(points),
+                "failed": failed,
+                "sensitivity": {
+                    n: {"mu_star": float(m), "sigma": float(s)}
+                    for n, m, s in zip(names, sensitivity, sigma)
+                },
+                "ranking": ranking,
+                "kept": kept,
+                "best_config": best_config,
+            },
+            file,
+            indent=4,
+        )
+    print(f"[INFO TUN-0046] Screening results written to {results_path}")
+    print(
+        f"[INFO TUN-0047] Pruned config with {len(kept)} of {len(names)}"
+        f" parameters written to {pruned_path}"
+    )
+
+
 def main():
     global args, SDC_ORIGINAL, FR_ORIGINAL, LOCAL_DIR, INSTALL_PATH, ORFS_FLOW_DIR, WORK_HOME, config_dict, reference, best_params
     args = parse_arguments()
@@ -644,6 +938,13 @@ def main():
 
     if args.mode == "tune":
         best_params = set_best_params(args.platform, args.design)
+        surrogate = None
+        if args.surrogate:
+            surrogate = dict(
+                min_trials=args.surrogate_min_trials,
+                margin=args.surrogate_margin,
+                exploration=args.surrogate_exploration,
+            )
         search_algo = set_algorithm(
             args.algorithm,
             args.experiment,
@@ -652,6 +953,7 @@ def main():
             args.perturbation,
             args.jobs,
             config_dict,
+            surrogate=surrogate,
         )
         TrainClass = set_training_class(args.eval)
         # PPAImprov requires a reference file to compute training scores.
@@ -671,6 +973,7 @@ def main():
             log_to_file=["trail-out.log", "trail-err.log"],
             trial_name_creator=lambda x: f"variant-{x.trainable_name}-{x.trial_id}-ray",
             trial_dirname_creator=lambda x: f"variant-{x.trainable_name}-{x.trial_id}-ray",
+            reuse_actors=True,
         )
         if args.algorithm == "pbt":
             os.environ["TUNE_MAX_PENDING_TRIALS_PG"] = str(args.jobs)
@@ -685,6 +988,22 @@ def main():
         task_id = save_best.remote(analysis)
         _ = ray.get(task_id)
         print(f"[INFO TUN-0002] Best parameters found: {analysis.best_config}")
+        if args.algorithm == "ax":
+            ax_search = search_algo.searcher
+            while not isinstance(ax_search, BatchAxSearch):
+                ax_search = ax_search.searcher
+            print(
+                f"[INFO TUN-0051] Ax generated {ax_search.num_generated}"
+                f" candidates in {ax_search.num_batches} batches,"
+                f" {ax_search.generation_time:.2f}s total generation time."
+            )
+        if args.surrogate:
+            surrogate_filter = search_algo.searcher
+            print(
+                f"[INFO TUN-0049] Surrogate filter skipped"
+                f" {surrogate_filter.num_rejected} candidates for"
+                f" {surrogate_filter.num_suggested} trials run."
+            )
 
         # if all runs have failed
         if analysis.best_result[METRIC] == ERROR_METRIC:
@@ -692,6 +1011,8 @@ def main():
             sys.exit(16)
     elif args.mode == "sweep":
         sweep()
+    elif args.mode == "screen":
+        screen()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,207 @@
+"""
+Parameter screening for AutoTuner.
+
+Screening runs a cheap design of experiments over the knobs of an
+`autotuner.json` file, ranks the knobs by how much they move the score and
+writes a pruned configuration that can be fed back to `tune`.
+
+Two designs are supported:
+- Morris elementary effects: r one-at-a-time trajectories, r * (k + 1) runs.
+- Two-level fractional factorial (resolution III), 2^ceil(log2(k + 1)) runs.
+"""
+
+import itertools
+import math
+import os
+
+import numpy as np
+
+# Parameters whose values are file paths, kept verbatim in the pruned config.
+PATH_KEYS = ("_SDC_FILE_PATH", "_FR_FILE_PATH")
+
+
+def is_screenable(spec):
+    """Returns True if the parameter spec spans more than one value."""
+    if not isinstance(spec, dict):
+        return False
+    if spec.get("type") == "string":
+        return len(spec.get("values", [])) > 1
+    if "minmax" in spec:
+        min_, max_ = spec["minmax"]
+        return min_ != max_
+    return False
+
+
+def decode(spec, unit):
+    """
+    Map a coordinate in [0, 1] to a value of the parameter described by spec.
+    Quantized parameters snap to the closest step from the lower bound.
+    """
+    if spec.get("type") == "string":
+        values = spec["values"]
+        return values[int(round(unit * (len(values) - 1)))]
+    min_, max_ = spec["minmax"]
+    value = min_ + unit * (max_ - min_)
+    step = spec.get("step", 0)
+    if spec["type"] == "int":
+        step = max(step, 1)
+    if step > 0:
+        value = min_ + round((value - min_) / step) * step
+        value = min(max(value, min_), max_)
+    if spec["type"] == "int":
+        return int(value)
+    return float(value)
+
+
+def fixed_parameters(config):
+    """Returns the values of parameters that only take a single value."""
+    fixed = dict()
+    for name, spec in config.items():
+        if not isinstance(spec, dict) or is_screenable(spec):
+            continue
+        if spec.get("type") == "string" and spec.get("values"):
+            fixed[name] = spec["values"][0]
+        elif "minmax" in spec:
+            fixed[name] = decode(spec, 0.0)
+    return fixed
+
+
+def decode_point(names, specs, units):
+    """Build a trial configuration from a row of unit coordinates."""
+    config = {name: decode(specs[name], u) for name, u in zip(names, units)}
+    # Detail placement padding cannot exceed global placement padding.
+    global_pad = config.get("CELL_PAD_IN_SITES_GLOBAL_PLACEMENT")
+    detail_pad = config.get("CELL_PAD_IN_SITES_DETAIL_PLACEMENT")
+    if global_pad is not None and detail_pad is not None:
+        config["CELL_PAD_IN_SITES_DETAIL_PLACEMENT"] = min(global_pad, detail_pad)
+    return config
+
+
+def morris_design(num_params, trajectories, levels, rng):
+    """
+    Generate Morris trajectories on a `levels`-level grid of [0, 1]^k.
+
+    Returns (points, moves) where points has shape
+    (trajectories * (k + 1), k) and moves lists, for each trajectory step,
+    the tuple (row_before, row_after, parameter_index, delta).
+    """
+    if levels < 2:
+        raise ValueError("Morris design needs at least 2 levels.")
+    delta = levels / (2 * (levels - 1))
+    # Base values must leave room for a +delta move.
+    grid = np.arange(levels) / (levels - 1)
+    grid = grid[grid + delta <= 1 + 1e-9]
+    points = []
+    moves = []
+    for _ in range(trajectories):
+        base = rng.choice(grid, size=num_params)
+        # Each parameter moves once per trajectory, between its base value
+        # and base + delta, in a random direction.
+        signs = rng.choice([-1, 1], size=num_params)
+        current = base + delta * (signs < 0)
+        start = len(points)
+        points.append(current.copy())
+        for step, index in enumerate(rng.permutation(num_params)):
+            sign = signs[index]
+            current[index] += sign * delta
+            points.append(current.copy())
+            moves.append((start + step, start + step + 1, index, sign * delta))
+    return np.clip(np.array(points), 0.0, 1.0), moves
+
+
+def factorial_design(num_params):
+    """
+    Generate a two-level resolution III fractional factorial design.
+
+    A full factorial is built on m = ceil(log2(k + 1)) base factors, and the
+    remaining factors are aliased to interaction columns of the base factors.
+    Returns a (2^m, k) matrix of -1/+1 levels.
+    """
+    base = max(1, math.ceil(math.log2(num_params + 1)))
+    full = np.array(list(itertools.product([-1, 1], repeat=base)))
+    columns = [full[:, i] for i in range(base)]
+    for size in range(2, base + 1):
+        for subset in itertools.combinations(range(base), size):
+            columns.append(np.prod(full[:, subset], axis=1))
+    return np.stack(columns[:num_params], axis=1)
+
+
+def morris_effects(scores, moves, num_params):
+    """Compute (mu_star, sigma) of the elementary effects per parameter."""
+    effects = [[] for _ in range(num_params)]
+    for before, after, index, delta in moves:
+        effects[index].append((scores[after] - scores[before]) / delta)
+    mu_star = np.array([np.mean(np.abs(e)) if e else 0.0 for e in effects])
+    sigma = np.array([np.std(e) if e else 0.0 for e in effects])
+    return mu_star, sigma
+
+
+def factorial_effects(scores, design):
+    """Compute the absolute main effect of each factor of a two-level design."""
+    scores = np.asarray(scores)
+    effects = []
+    for column in design.T:
+        effects.append(abs(scores[column > 0].mean() - scores[column < 0].mean()))
+    return np.array(effects), np.zeros(len(effects))
+
+
+def clean_scores(scores, error_metric):
+    """
+    Replace failed runs with the worst successful score so that a single
+    failing trial does not swamp every elementary effect.
+    Returns the cleaned array and the number of failed runs.
+    """
+    scores = np.asarray(scores, dtype=float)
+    failed = scores >= error_metric
+    if failed.all():
+        return None, int(failed.sum())
+    scores[failed] = scores[~failed].max()
+    return scores, int(failed.sum())
+
+
+def select_parameters(names, sensitivity, threshold, keep):
+    """
+    Rank parameters by decreasing sensitivity and return (ranking, kept).
+    A parameter is kept if it is among the `keep` most sensitive ones or, when
+    `keep` is not given, if its sensitivity is at least `threshold` times the
+    largest sensitivity.
+    """
+    order = np.argsort(-sensitivity, kind="stable")
+    ranking = [names[i] for i in order]
+    if keep is not None:
+        return ranking, ranking[:keep]
+    top = sensitivity[order[0]] if len(order) else 0.0
+    if top <= 0:
+        return ranking, ranking
+    kept = [names[i] for i in order if sensitivity[i] >= threshold * top]
+    return ranking, kept
+
+
+def prune_config(data, config_file, kept, best_config, output_file):
+    """
+    Build an autotuner.json dict with only the kept parameters left tunable.
+    Dropped parameters are pinned to the value of the best screening run and
+    file paths are rewritten relative to the new file location.
+    """
+    pruned = dict()
+    out_dir = os.path.dirname(os.path.abspath(output_file))
+    in_dir = os.path.dirname(os.path.abspath(config_file))
+    for key, spec in data.items():
+        if key == "best_result":
+            continue
+        if key in PATH_KEYS:
+            if spec != "":
+                spec = os.path.relpath(os.path.join(in_dir, spec), out_dir)
+            pruned[key] = spec
+        elif key in kept or not is_screenable(spec):
+            pruned[key] = spec
+        elif spec.get("type") == "string":
+            pruned[key] = {"type": "string", "values": [best_config[key]]}
+        else:
+            value = best_config[key]
+            pruned[key] = {
+                "type": spec["type"],
+                "minmax": [value, value],
+                "step": spec.get("step", 0),
+            }
+    return pruned
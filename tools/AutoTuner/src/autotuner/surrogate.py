@@ -0,0 +1,267 @@
+"""
+Surrogate-model pre-screening for AutoTuner.
+
+`SurrogateFilter` wraps a Ray Tune searcher. Once enough trials have
+completed, every candidate proposed by the wrapped searcher is scored by a
+k-nearest-neighbour regressor fitted on the completed trials. Candidates that
+are predicted to fail, to be clearly worse than the incumbent or to have DRC
+violations when the incumbent has none are reported back to the wrapped
+searcher as errored, and abandoned in the Ax experiment when the wrapped
+searcher is an `AxSearch`, and a new candidate is requested, so the rejected
+point never takes a trial slot. A fraction of candidates is
+always accepted regardless of the prediction so that the model cannot lock
+itself into a region of the search space.
+"""
+
+import copy
+import logging
+from typing import Dict, Optional
+
+import numpy as np
+from ray.tune.search import Searcher
+from ray.tune.search.ax import AxSearch
+from ray.tune.search.util import _set_search_properties_backwards_compatible
+
+logger = logging.getLogger(__name__)
+
+
+class SurrogateModel:
+    """
+    Distance-weighted k-nearest-neighbour regressor over trial configs.
+    Numeric parameters are scaled to [0, 1] over the observed range, other
+    parameters contribute a unit distance when they differ.
+    """
+
+    def __init__(self, neighbours=5):
+        self.neighbours = neighbours
+        self.keys = []
+        self.numeric = []
+        self.low = None
+        self.span = None
+        self.points = None
+        self.labels = None
+        self.scores = None
+        self.num_drc = None
+        self.failed = None
+
+    def fit(self, configs, scores, num_drc, failed):
+        self.keys = sorted(configs[0].keys())
+        self.numeric = [
+            all(isinstance(c.get(k), (int, float)) for c in configs) for k in self.keys
+        ]
+        values = np.array(
+            [
+                [self._value(c, k, n) for k, n in zip(self.keys, self.numeric)]
+                for c in configs
+            ],
+            dtype=float,
+        )
+        self.low = values.min(axis=0)
+        self.span = np.where(
+            values.max(axis=0) > self.low, values.max(axis=0) - self.low, 1.0
+        )
+        self.points = (values - self.low) / self.span
+        self.labels = [
+            [c.get(k) for k, n in zip(self.keys, self.numeric) if not n]
+            for c in configs
+        ]
+        self.scores = np.asarray(scores, dtype=float)
+        self.num_drc = np.asarray(num_drc, dtype=float)
+        self.failed = np.asarray(failed, dtype=bool)
+
+    @staticmethod
+    def _value(config, key, numeric):
+        return float(config.get(key)) if numeric else 0.0
+
+    def predict(self, config):
+        """Returns (score, num_drc, failure probability) for a config."""
+        point = np.array(
+            [self._value(config, k, n) for k, n in zip(self.keys, self.numeric)],
+            dtype=float,
+        )
+        point = (point - self.low) / self.span
+        labels = [config.get(k) for k, n in zip(self.keys, self.numeric) if not n]
+        distance = np.sqrt(((self.points - point) ** 2).sum(axis=1))
+        mismatch = np.array(
+            [sum(a != b for a, b in zip(row, labels)) for row in self.labels]
+        )
+        distance = np.sqrt(distance**2 + mismatch)
+        nearest = np.argsort(distance)[: self.neighbours]
+        weight = 1.0 / (distance[nearest] + 1e-6)
+        p_fail = float((weight * self.failed[nearest]).sum() / weight.sum())
+        ok = nearest[~self.failed[nearest]]
+        if len(ok) == 0:
+            return None, None, p_fail
+        ok_weight = 1.0 / (distance[ok] + 1e-6)
+        score = float((ok_weight * self.scores[ok]).sum() / ok_weight.sum())
+        num_drc = float((ok_weight * self.num_drc[ok]).sum() / ok_weight.sum())
+        return score, num_drc, p_fail
+
+
+class SurrogateFilter(Searcher):
+    """
+    Searcher wrapper rejecting candidates predicted to be poor.
+
+    Args:
+        searcher: Searcher that proposes the candidates.
+        error_metric: Score reported by failed trials.
+        min_trials: Number of completed trials before filtering starts.
+        margin: Reject candidates predicted worse than the incumbent by more
+            than this fraction.
+        exploration: Fraction of candidates accepted without filtering.
+        max_candidates: Candidates drawn per slot before accepting the one
+            with the best prediction.
+        seed: Seed for the exploration draws.
+    """
+
+    def __init__(
+        self,
+        searcher: Searcher,
+        error_metric: float,
+        min_trials: int = 20,
+        margin: float = 0.2,
+        exploration: float = 0.1,
+        max_candidates: int = 10,
+        seed: Optional[int] = None,
+    ):
+        self.searcher = searcher
+        self.error_metric = error_metric
+        self.min_trials = min_trials
+        self.margin = margin
+        self.exploration = exploration
+        self.max_candidates = max_candidates
+        self.rng = np.random.default_rng(seed)
+        self.model = SurrogateModel()
+        self.live = dict()
+        self.history = []
+        self.num_suggested = 0
+        self.num_rejected = 0
+        self._fitted_on = 0
+        super().__init__(metric=searcher.metric, mode=searcher.mode)
+
+    def set_max_concurrency(self, max_concurrent: int) -> bool:
+        return self.searcher.set_max_concurrency(max_concurrent)
+
+    def set_search_properties(
+        self, metric: Optional[str], mode: Optional[str], config: Dict, **spec
+    ) -> bool:
+        ok = _set_search_properties_backwards_compatible(
+            self.searcher.set_search_properties, metric, mode, config, **spec
+        )
+        self._metric = self.searcher.metric
+        self._mode = self.searcher.mode
+        return ok
+
+    def _is_poor(self, config, incumbent, incumbent_drc):
+        score, num_drc, p_fail = self.model.predict(config)
+        if p_fail > 0.5:
+            return True, score
+        if score is None:
+            return True, score
+        if incumbent_drc == 0 and num_drc >= 1:
+            return True, score
+        return score > incumbent + self.margin * abs(incumbent), score
+
+    def suggest(self, trial_id: str) -> Optional[Dict]:
+        successful = [h for h in self.history if not h[3]]
+        if len(self.history) < self.min_trials or len(successful) == 0:
+            config = self.searcher.suggest(trial_id)
+            if config not in (None, Searcher.FINISHED):
+                self.live[trial_id] = (trial_id, config)
+                self.num_suggested += 1
+            return config
+
+        if self._fitted_on != len(self.history):
+            configs, scores, num_drc, failed = zip(*self.history)
+            self.model.fit(list(configs), scores, num_drc, failed)
+            self._fitted_on = len(self.history)
+        _, incumbent, incumbent_drc, _ = min(successful, key=lambda h: h[1])
+
+        accepted = None
+        fallback = None
+        for i in range(self.max_candidates):
+            proxy_id = f"{trial_id}-s{i}"
+            config = self.searcher.suggest(proxy_id)
+            if config in (None, Searcher.FINISHED):
+                break
+            poor, score = self._is_poor(config, incumbent, incumbent_drc)
+            if not poor or self.rng.random() < self.exploration:
+                accepted = (proxy_id, config)
+                break
+            if fallback is None or self._better(score, fallback[2]):
+                if fallback is not None:
+                    self._reject(fallback[0])
+                fallback = (proxy_id, config, score)
+            else:
+                self._reject(proxy_id)
+        if accepted is None:
+            if fallback is None:
+                return config
+            # Deprioritize rather than leave the slot idle: run the least poor
+            # candidate once the candidate budget is exhausted.
+            accepted = fallback[:2]
+        self.live[trial_id] = accepted
+        self.num_suggested += 1
+        return accepted[1]
+
+    @staticmethod
+    def _better(score, other):
+        return score is not None and (other is None or score < other)
+
+    def _reject(self, proxy_id):
+        logger.debug(f"Surrogate filter rejected candidate {proxy_id}.")
+        if isinstance(self.searcher, AxSearch):
+            # AxSearch leaves errored trials running in the experiment, where
+            # they would be pending points of the later generations.
+            self.searcher._ax.abandon_trial(
+                trial_index=self.searcher._live_trial_mapping[proxy_id],
+                reason="rejected by the surrogate filter",
+            )
+        self.searcher.on_trial_complete(proxy_id, result=None, error=True)
+        self.num_rejected += 1
+
+    def on_trial_result(self, trial_id: str, result: Dict) -> None:
+        if trial_id in self.live:
+            self.searcher.on_trial_result(self.live[trial_id][0], result)
+
+    def on_trial_complete(
+        self, trial_id: str, result: Optional[Dict] = None, error: bool = False
+    ):
+        if trial_id not in self.live:
+            return
+        proxy_id, config = self.live.pop(trial_id)
+        self.searcher.on_trial_complete(proxy_id, result=result, error=error)
+        score = self.error_metric
+        num_drc = self.error_metric
+        if result is not None and self.metric in result:
+            score = result[self.metric]
+            num_drc = result.get("num_drc", 0)
+        failed = error or score >= self.error_metric
+        if failed:
+            num_drc = 0
+        self.history.append((config, float(score), float(num_drc), failed))
+
+    def add_evaluated_point(self, *args, **kwargs):
+        return self.searcher.add_evaluated_point(*args, **kwargs)
+
+    def get_state(self) -> Dict:
+        state = self.__dict__.copy()
+        del state["searcher"]
+        return copy.deepcopy(state)
+
+    def set_state(self, state: Dict):
+        self.__dict__.update(state)
+
+    def save(self, checkpoint_path: str):
+        self.searcher.save(checkpoint_path)
+
+    def restore(self, checkpoint_path: str):
+        self.searcher.restore(checkpoint_path)
+
+    def on_pause(self, trial_id: str):
+        if trial_id in self.live:
+            self.searcher.on_pause(self.live[trial_id][0])
+
+    def on_unpause(self, trial_id: str):
+        if trial_id in self.live:
+            self.searcher.on_unpause(self.live[trial_id][0])
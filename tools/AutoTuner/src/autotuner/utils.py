@@ -33,10 +33,12 @@
 ##
 ###############################################################################
 
+import functools
 import glob
 import json
 import os
 import re
+import shutil
 import yaml
 import subprocess
 import sys
@@ -71,6 +73,8 @@ FASTROUTE_TCL = "fastroute.tcl"
 DATE = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
 # The worst of optimized metric
 ERROR_METRIC = 9e99
+# Flow stages in execution order, as named in variables.yaml
+STAGES = ["synth", "floorplan", "place", "cts", "grt", "route", "final"]
 
 
 def calculate_score(metrics, step=1):
@@ -215,9 +219,11 @@ def parse_flow_variables(base_dir, platform):
     return variables
 
 
+@functools.lru_cache(maxsize=None)
 def parse_tunable_variables():
     """
     Parse the tunable variables from variables.yaml
+    The result is cached per process and must not be modified.
     TODO: Tests.
     """
     cur_path = os.path.dirname(os.path.realpath(__file__))
@@ -226,10 +232,129 @@ def parse_tunable_variables():
     # Read from variables.yaml and get variables with tunable = 1
     with open(vars_path) as file:
         result = yaml.safe_load(file)
-    variables = {key for key, value in result.items() if value.get("tunable", 0) == 1}
+    variables = frozenset(
+        key for key, value in result.items() if value.get("tunable", 0) == 1
+    )
     return variables
 
 
+@functools.lru_cache(maxsize=None)
+def parse_variable_stages():
+    """
+    Parse the stages each variable affects from variables.yaml
+    The result is cached per process and must not be modified.
+    """
+    cur_path = os.path.dirname(os.path.realpath(__file__))
+    vars_path = os.path.join(cur_path, "../../../../flow/scripts/variables.yaml")
+    with open(vars_path) as file:
+        result = yaml.safe_load(file)
+    return {key: value.get("stages", []) for key, value in result.items()}
+
+
+def first_affected_stage(old_config, new_config):
+    """
+    Returns the earliest flow stage whose inputs differ between two
+    configurations, or None if the configurations are identical.
+    Parameters with unknown stages are assumed to affect synthesis.
+    """
+    changed = [
+        key
+        for key in set(old_config) | set(new_config)
+        if old_config.get(key) != new_config.get(key)
+    ]
+    if len(changed) == 0:
+        return None
+    variable_stages = parse_variable_stages()
+    first = len(STAGES) - 1
+    for key in changed:
+        if key.startswith("_SDC_"):
+            stages = ["synth"]
+        elif key.startswith("_FR_"):
+            stages = ["grt"]
+        elif key == "_PINS_DISTANCE":
+            stages = variable_stages.get("PLACE_PINS_ARGS", [])
+        else:
+            stages = variable_stages.get(key, [])
+        indices = [STAGES.index(stage) for stage in stages if stage in STAGES]
+        if len(indices) == 0 or len(indices) != len(stages):
+            # "All stages", test-only or undocumented variables
+            return STAGES[0]
+        first = min(first, min(indices))
+    return STAGES[first]
+
+
+# Files without a stage prefix, by the stage that writes them, as removed by
+# the clean_<stage> targets of the Makefile
+UNPREFIXED_FILES = [
+    (r"clock_period\.txt$", "synth"),
+    (r"mem.*\.json$", "synth"),
+    (r"synth_", "synth"),
+    (r"route\.guide$", "grt"),
+    (r"output_guide\.mod$", "grt"),
+    (r"updated_clks\.sdc$", "grt"),
+]
+
+# Files that are inputs of the other files of their stage
+STAGE_INPUTS = ["clock_period.txt"]
+
+
+def file_stage(file_name):
+    """Returns the flow stage that produced a log, report or result file."""
+    for pattern, stage in UNPREFIXED_FILES:
+        if re.match(pattern, file_name):
+            return stage
+    if file_name.startswith("5_1_"):
+        return "grt"
+    match = re.match(r"([1-6])_", file_name)
+    if match is None:
+        return None
+    return ["synth", "floorplan", "place", "cts", "route", "final"][
+        int(match.group(1)) - 1
+    ]
+
+
+def clone_flow_variant(args, base_dir, src_variant, dst_variant, stage):
+    """
+    Copy the logs, reports and results of the stages before `stage` from one
+    flow variant to another, so that make only re-runs `stage` onwards.
+    A `stage` of None copies every stage.
+    The copies are touched in dependency order, by stage, with the inputs of
+    a stage such as clock_period.txt first, then in their original order, so
+    that they are newer than the configuration files written for the new
+    variant and make considers them up to date.
+    """
+    stop = len(STAGES) if stage is None else STAGES.index(stage)
+    copies = []
+    for kind in ["logs", "reports", "results"]:
+        design_dir = os.path.join(
+            base_dir, f"flow/{kind}/{args.platform}/{args.design}", args.experiment
+        )
+        src_dir = os.path.join(design_dir, src_variant)
+        dst_dir = os.path.join(design_dir, dst_variant)
+        if not os.path.isdir(src_dir):
+            continue
+        os.makedirs(dst_dir, exist_ok=True)
+        for file_name in os.listdir(src_dir):
+            src = os.path.join(src_dir, file_name)
+            src_stage = file_stage(file_name)
+            if src_stage is None or STAGES.index(src_stage) >= stop:
+                continue
+            if not os.path.isfile(src):
+                continue
+            dst = os.path.join(dst_dir, file_name)
+            shutil.copy2(src, dst)
+            order = (
+                STAGES.index(src_stage),
+                file_name not in STAGE_INPUTS,
+                os.path.getmtime(src),
+            )
+            copies.append((order, dst))
+    now = time.time()
+    for i, (_, dst) in enumerate(sorted(copies)):
+        os.utime(dst, (now + i * 0.01, now + i * 0.01))
+    return len(copies)
+
+
 def parse_config(
     config,
     base_dir,
@@ -635,6 +760,8 @@ def read_config(file_name, mode, algorithm):
                 config[key] = value
         elif mode == "sweep":
             config[key] = read_sweep(value)
+        elif mode == "screen":
+            config[key] = value
         elif mode == "tune" and algorithm == "ax":
             config.append(read_tune_ax(key, value))
         elif mode == "tune" and algorithm == "pbt":
@@ -0,0 +1,57 @@
+import unittest
+
+from ax.core.base_trial import TrialStatus
+from ax.modelbridge.generation_strategy import GenerationStep, GenerationStrategy
+from ax.modelbridge.registry import Models
+from ax.service.ax_client import AxClient, ObjectiveProperties
+from autotuner.ax_search import BatchAxSearch
+
+
+class BatchAxSearchTest(unittest.TestCase):
+    def setUp(self):
+        generation_strategy = GenerationStrategy(
+            steps=[
+                GenerationStep(model=Models.SOBOL, num_trials=4),
+                GenerationStep(model=Models.SOBOL, num_trials=-1),
+            ]
+        )
+        self.ax_client = AxClient(
+            generation_strategy=generation_strategy,
+            random_seed=42,
+            verbose_logging=False,
+        )
+        self.ax_client.create_experiment(
+            name="ax_search_test",
+            parameters=[{"name": "x", "type": "range", "bounds": [0.0, 1.0]}],
+            objectives={"minimum": ObjectiveProperties(minimize=True)},
+        )
+        self.searcher = BatchAxSearch(seed=42, ax_client=self.ax_client)
+        # As set by the ConcurrencyLimiter of the tune run
+        self.searcher.set_max_concurrency(3)
+
+    def test_batch(self):
+        configs = [self.searcher.suggest(f"trial_{i}") for i in range(3)]
+        self.assertEqual(self.searcher.num_batches, 1)
+        self.assertEqual(self.searcher.num_generated, 3)
+        self.assertEqual(len({c["x"] for c in configs}), 3)
+        trials = self.ax_client.experiment.trials.values()
+        self.assertEqual([t.status for t in trials], [TrialStatus.RUNNING] * 3)
+        self.assertTrue(all(len(t.arms) == 1 for t in trials))
+
+    def test_generation_steps(self):
+        # Run until the first step is complete, one free slot at a time
+        for i in range(3):
+            self.searcher.suggest(f"trial_{i}")
+        for i in range(3, 6):
+            self.searcher.on_trial_complete(
+                f"trial_{i - 3}", result={"minimum": float(i)}
+            )
+            self.assertIsNotNone(self.searcher.suggest(f"trial_{i}"))
+        self.assertEqual(self.searcher.num_batches, 4)
+        # The first step counted its 4 trials, then the strategy moved on
+        self.assertEqual(len(self.ax_client.experiment.trials), 6)
+        self.assertEqual(self.ax_client.generation_strategy.current_step_index, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+
+from autotuner.utils import clone_flow_variant, file_stage
+
+# The synthesis and floorplan dependencies of flow/Makefile
+MAKEFILE = """
+RESULTS_DIR = results/asap7/gcd/test/$(FLOW_VARIANT)
+
+$(RESULTS_DIR)/clock_period.txt: constraint.sdc
+\ttouch $@
+$(RESULTS_DIR)/1_1_yosys_canonicalize.rtlil: $(RESULTS_DIR)/clock_period.txt
+\ttouch $@
+$(RESULTS_DIR)/1_2_yosys.v: $(RESULTS_DIR)/1_1_yosys_canonicalize.rtlil
+\ttouch $@
+$(RESULTS_DIR)/2_floorplan.odb: $(RESULTS_DIR)/1_2_yosys.v
+\ttouch $@
+$(RESULTS_DIR)/3_place.odb: $(RESULTS_DIR)/2_floorplan.odb
+\ttouch $@
+"""
+
+
+class CloneFlowVariantTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.flow_dir = os.path.join(self.tmp_dir.name, "flow")
+        self.args = SimpleNamespace(platform="asap7", design="gcd", experiment="test")
+        files = {
+            "logs": ["1_1_yosys_canonicalize.log", "2_1_floorplan.log"],
+            "reports": ["synth_stat.txt", "2_floorplan_final.rpt"],
+            "results": [
+                "clock_period.txt",
+                "mem.json",
+                "1_1_yosys_canonicalize.rtlil",
+                "1_2_yosys.v",
+                "2_floorplan.odb",
+                "route.guide",
+                "5_1_grt.odb",
+            ],
+        }
+        for kind, names in files.items():
+            variant_dir = self.variant_dir(kind, "parent")
+            os.makedirs(variant_dir)
+            for name in names:
+                with open(os.path.join(variant_dir, name), "w") as f:
+                    f.write(name)
+        # clock_period.txt is rewritten after synthesis in the parent, as
+        # when it was copied from an older checkpoint
+        now = time.time()
+        os.utime(
+            os.path.join(self.variant_dir("results", "parent"), "clock_period.txt"),
+            (now + 10, now + 10),
+        )
+
+    def variant_dir(self, kind, variant):
+        return os.path.join(self.flow_dir, kind, "asap7", "gcd", "test", variant)
+
+    def test_file_stage(self):
+        self.assertEqual(file_stage("clock_period.txt"), "synth")
+        self.assertEqual(file_stage("mem_0.json"), "synth")
+        self.assertEqual(file_stage("synth_stat.txt"), "synth")
+        self.assertEqual(file_stage("route.guide"), "grt")
+        self.assertEqual(file_stage("5_1_grt.odb"), "grt")
+        self.assertEqual(file_stage("5_2_route.odb"), "route")
+        self.assertIsNone(file_stage("metadata.json"))
+
+    def test_copied_files(self):
+        copied = clone_flow_variant(
+            self.args, self.tmp_dir.name, "parent", "child", "place"
+        )
+        self.assertEqual(copied, 9)
+        self.assertEqual(
+            sorted(os.listdir(self.variant_dir("results", "child"))),
+            [
+                "1_1_yosys_canonicalize.rtlil",
+                "1_2_yosys.v",
+                "2_floorplan.odb",
+                "clock_period.txt",
+                "mem.json",
+            ],
+        )
+        self.assertEqual(
+            sorted(os.listdir(self.variant_dir("reports", "child"))),
+            ["2_floorplan_final.rpt", "synth_stat.txt"],
+        )
+
+    @unittest.skipIf(shutil.which("make") is None, "make is not available")
+    def test_make_up_to_date(self):
+        with open(os.path.join(self.flow_dir, "Makefile"), "w") as f:
+            f.write(MAKEFILE)
+        # Written for the new variant before the clone
+        with open(os.path.join(self.flow_dir, "constraint.sdc"), "w") as f:
+            f.write("")
+        clone_flow_variant(self.args, self.tmp_dir.name, "parent", "child", "place")
+
+        def make_q(target):
+            return subprocess.run(
+                ["make", "-q", "FLOW_VARIANT=child", target],
+                cwd=self.flow_dir,
+                capture_output=True,
+            ).returncode
+
+        results = os.path.relpath(self.variant_dir("results", "child"), self.flow_dir)
+        self.assertEqual(make_q(os.path.join(results, "2_floorplan.odb")), 0)
+        self.assertEqual(make_q(os.path.join(results, "3_place.odb")), 1)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+#############################################################################
+##
+## Copyright (c) 2024, Precision Innovations Inc.
+## All rights reserved.
+##
+## BSD 3-Clause License
+##
+## Redistribution and use in source and binary forms, with or without
+## modification, are permitted provided that the following conditions are met:
+##
+## * Redistributions of source code must retain the above copyright notice, this
+##   list of conditions and the following disclaimer.
+##
+## * Redistributions in binary form must reproduce the above copyright notice,
+##   this list of conditions and the following disclaimer in the documentation
+##   and/or other materials provided with the distribution.
+##
+## * Neither the name of the copyright holder nor the names of its
+##   contributors may be used to endorse or promote products derived from
+##   this software without specific prior written permission.
+##
+## THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+## AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+## IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+## ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+## LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+## CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+## SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+## INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+## CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+## ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+## POSSIBILITY OF SUCH DAMAGE.
+###############################################################################
+
+import unittest
+import subprocess
+import os
+import json
+from .autotuner_test_utils import AutoTunerTestUtils, accepted_rc
+
+cur_dir = os.path.dirname(os.path.abspath(__file__))
+orfs_dir = os.path.join(cur_dir, "../../../flow")
+
+
+class BaseScreenSmokeTest(unittest.TestCase):
+    platform = ""
+    design = ""
+
+    def setUp(self):
+        self.config = os.path.join(
+            cur_dir,
+            f"../../../flow/designs/{self.platform}/{self.design}/autotuner.json",
+        )
+        core = os.cpu_count()
+        self.jobs = 4 if core >= 4 else core
+        self.experiment = f"smoke-test-screen-{self.platform}"
+        self.exec = AutoTunerTestUtils.get_exec_cmd()
+        self.command = (
+            f"{self.exec}"
+            f" --design {self.design}"
+            f" --platform {self.platform}"
+            f" --experiment {self.experiment}"
+            f" --config {self.config}"
+            f" --jobs {self.jobs}"
+            f" screen --method factorial"
+        )
+
+    def test_screen(self):
+        if not (self.platform and self.design):
+            raise unittest.SkipTest("Platform and design have to be defined")
+        out = subprocess.run(self.command, shell=True)
+        self.assertTrue(out.returncode in accepted_rc)
+        if out.returncode != 0:
+            return
+        pruned = os.path.join(
+            orfs_dir,
+            f"logs/{self.platform}/{self.design}",
+            f"{self.experiment}-screen",
+            "autotuner-screened.json",
+        )
+        with open(pruned) as f:
+            contents = json.load(f)
+        with open(self.config) as f:
+            original = json.load(f)
+        self.assertEqual(set(contents.keys()), set(original.keys()))
+
+
+class asap7ScreenSmokeTest(BaseScreenSmokeTest):
+    platform = "asap7"
+    design = "gcd"
+
+
+class sky130hdScreenSmokeTest(BaseScreenSmokeTest):
+    platform = "sky130hd"
+    design = "gcd"
+
+
+class ihpsg13g2ScreenSmokeTest(BaseScreenSmokeTest):
+    platform = "ihp-sg13g2"
+    design = "gcd"
+
+
+if __name__ == "__main__":
+    unittest.main()
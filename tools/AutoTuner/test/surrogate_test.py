@@ -0,0 +1,62 @@
+import unittest
+
+from ax.core.base_trial import TrialStatus
+from ax.service.ax_client import AxClient, ObjectiveProperties
+from autotuner.ax_search import BatchAxSearch
+from autotuner.surrogate import SurrogateFilter
+
+ERROR_METRIC = 9e99
+
+
+class SurrogateFilterTest(unittest.TestCase):
+    def setUp(self):
+        self.ax_client = AxClient(random_seed=42, verbose_logging=False)
+        self.ax_client.create_experiment(
+            name="surrogate_test",
+            parameters=[{"name": "x", "type": "range", "bounds": [0.0, 1.0]}],
+            objectives={"minimum": ObjectiveProperties(minimize=True)},
+        )
+        self.surrogate = SurrogateFilter(
+            BatchAxSearch(seed=42, ax_client=self.ax_client),
+            error_metric=ERROR_METRIC,
+            min_trials=2,
+            exploration=0.0,
+            max_candidates=4,
+            seed=42,
+        )
+        # As set by the ConcurrencyLimiter of the tune run
+        self.surrogate.set_max_concurrency(4)
+
+    def trial_statuses(self):
+        return [t.status for t in self.ax_client.experiment.trials.values()]
+
+    def test_rejected_trials_abandoned(self):
+        # Only the neighbourhood of x = 0 succeeds, every candidate is poor
+        self.surrogate.history = [({"x": 0.0}, 1.0, 0.0, False)] + [
+            ({"x": x}, ERROR_METRIC, 0.0, True) for x in [0.2, 0.4, 0.6, 0.8, 1.0]
+        ]
+        config = self.surrogate.suggest("trial_1")
+
+        self.assertIsNotNone(config)
+        self.assertGreater(self.surrogate.num_rejected, 0)
+        statuses = self.trial_statuses()
+        self.assertEqual(
+            statuses.count(TrialStatus.ABANDONED), self.surrogate.num_rejected
+        )
+        # Only the accepted candidate is pending in the experiment
+        self.assertEqual(statuses.count(TrialStatus.RUNNING), 1)
+
+        self.surrogate.on_trial_complete("trial_1", result={"minimum": 2.0})
+        self.assertEqual(self.trial_statuses().count(TrialStatus.RUNNING), 0)
+
+    def test_drc_violations_rejected(self):
+        # The incumbent is DRC clean and the rest of the space is not
+        self.surrogate.history = [({"x": 0.0}, 1.0, 0.0, False)] + [
+            ({"x": x}, 1.0, 10.0, False) for x in [0.2, 0.4, 0.6, 0.8, 1.0]
+        ]
+        self.surrogate.suggest("trial_1")
+        self.assertGreater(self.surrogate.num_rejected, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()